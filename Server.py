@@ -1,37 +1,70 @@
 # server.py
 # HTTP/1.1 기반 오목 서버
 
+import argparse
+import asyncio
 import json
+import multiprocessing
+import os
+import queue
+import shutil
 import socket
+import tempfile
 import threading
+import time
 import uuid
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+from urllib.parse import parse_qs
 
-from game import OmokGame, BLACK, WHITE
+import ai
+import cluster
+import wire
+from feed import StateFeed, parse_address
+from httpbuf import RecvBuffer
+from ratelimit import ALLOWED, OVERLOADED, RateLimiter, parse_limit
+from journal import JournalWriter
+from metrics import TimedLock, metrics
+from recovery import CHECKPOINT_INTERVAL, Checkpointer, WriteAheadLog, load_state
+from sessions import SESSION_TIMEOUT, SessionStore
+from game import BLACK, WHITE, BOARD_SIZE, WIN_LENGTH, ENGINES, MIN_BOARD_SIZE, MAX_BOARD_SIZE, OmokGame
+from room import DEFAULT_ROOM_ID, Room, new_token, room_id_from_token, event_listeners, version_listeners, wal_listeners
 
 HOST = "0.0.0.0" #외부 에서 접속 가능
 PORT = 6000 #포트 번호
 MAX_HEADER_BYTES = 16 * 1024
 ENCODING = "utf-8"
+KEEPALIVE_TIMEOUT = 15 # keep-alive 연결에서 다음 요청을 기다리는 최대 시간(초)
+MAX_KEEPALIVE_REQUESTS = 1000 # 한 연결에서 처리할 최대 요청 수, 넘으면 연결을 닫는다
 
-# 전역 게임 상태와 동기화를 위한 락 (게임 상태 기억하기)
-game = OmokGame()
-lock = threading.Lock()  #서버의 중요한 처리 구간을 한 번에 하나만 실행하게 만드는 장치
-player_slots = { #흑백 자리에 누가 앉을지
-    BLACK: None,
-    WHITE: None,
-}
-token_colors = {} #black, white, none
-token_names = {} # 이름
-chat_messages = [] #서버가 저장하고 있는 채팅내역
-MAX_CHAT = 100 # 서버가 보관하는 채팅 개수
-restart_votes = set() # 다시하기 누른 플레이어 들의 토큰 목록
+# 방 목록, 방마다 자기 게임 상태와 락을 가진다 (room.py)
+# rooms_lock은 방을 만들 때만 잡는다. 게임 요청은 자기 방의 락만 잡는다
+rooms = {DEFAULT_ROOM_ID: Room(DEFAULT_ROOM_ID, "lobby")}
+rooms_lock = TimedLock(metrics, "rooms")
+next_room_id = DEFAULT_ROOM_ID + 1
+ROOM_ID_STEP = 1 # 다음 방 번호까지의 간격, 워커 모드에서는 워커 수 (방 번호 % 워커 수 = 그 방을 가진 워커)
+worker = None # --workers 모드면 이 프로세스의 cluster.Cluster
+game_class = OmokGame # 새 방이 쓸 보드 구현, --engine 옵션으로 바꾼다
+wal = None # --state-dir를 주면 recovery.WriteAheadLog, 방 생성도 여기에 남긴다
+state_feed = None # --feed를 주면 feed.StateFeed, 관전자에게 UDP로 변경을 보낸다
+rate_limiter = None # --rate-limit/--ip-rate-limit/--max-in-flight 를 주면 ratelimit.RateLimiter
+default_rules = {} # 규칙을 지정하지 않은 방의 보드 크기/승리 조건, --size/--win-length/--exact 옵션으로 바꾼다
+MAX_ROOMS = 10000 # 한 프로세스가 동시에 가질 수 있는 최대 방 개수 (빈 방은 세션 만료 시간이 지나면 정리된다)
+MAX_NAME_LENGTH = 50 # 방 이름, 플레이어 이름 최대 글자 수
+MAX_LONG_POLL = 25 # /state long-poll 최대 대기 시간(초), KEEPALIVE_TIMEOUT 보다 짧게
+EVENT_HEARTBEAT = 10 # /events 스트림에서 이벤트가 없을 때 연결 확인용 주석을 보내는 간격(초)
+BOT_WORKERS = 2 # 봇 탐색을 돌리는 프로세스 수, --bot-workers 옵션으로 바꾼다
+
+SERVER_EPOCH = uuid.uuid4().hex[:8] # 서버 실행마다 바뀌는 값, 재시작 후 예전 ETag가 맞아떨어지지 않게
 
 HTTP_STATUS_TEXT = {
     200: "OK",
+    304: "Not Modified",
     400: "Bad Request",
     404: "Not Found",
     405: "Method Not Allowed",
+    429: "Too Many Requests",
     500: "Internal Server Error",
+    503: "Service Unavailable",
 }
 
 # HTTP 에러 응답을 만들기 위한 사용자 정의 예외 클래스
@@ -45,6 +78,15 @@ class HttpError(Exception):
         super().__init__(message)
 
 
+# 이미 인코딩된 body(또는 304처럼 body 없는 응답)를 그대로 보낼 때 쓰는 응답
+class RawResponse:
+    def __init__(self, body, status=200, headers=None, content_type="application/json"):
+        self.body = body
+        self.status = status
+        self.headers = headers or []
+        self.content_type = content_type
+
+
 def color_to_name(color): # 색을 글자로 리턴하기 위한 함수
     if color == BLACK:
         return "BLACK"
@@ -53,52 +95,60 @@ def color_to_name(color): # 색을 글자로 리턴하기 위한 함수
     return "SPECTATOR"
 
 
-def assign_color_locked(): #자리가 비어있으면 자리 지정해주기
-    for color in (BLACK, WHITE): #흑을 먼저 지정해준다
-        if player_slots[color] is None:
-            return color
-    return None #만약 둘다 차있으면 관전자로 배정해준다.
-
+def create_room(name=None, rules=None): # 새 방을 만들어 등록한다
+    global next_room_id
+    with rooms_lock:
+        if len(rooms) >= MAX_ROOMS:
+            raise HttpError(503, "TOO_MANY_ROOMS")
+        room = Room(next_room_id, name, game_class, rules or default_rules)
+        rooms[room.room_id] = room
+        next_room_id += ROOM_ID_STEP
+        if wal is not None:
+            wal.append({"op": "room", "room": room.room_id, "name": room.name, "rules": room.game.rules})
+    print(f"[SERVER] room created: id={room.room_id} name={room.name} rules={room.game.rules}")
+    return room
 
-def build_state_payload(): # 게임 상태 응답 포장용
-    return {"ok": True, "state": build_state_locked()}
 
+def close_room(room): # 빈 방을 rooms에서 뺀다, 그 사이 누가 들어왔으면 False
+    with rooms_lock:
+        with room.lock:
+            if room.occupied_locked() or room.closed:
+                return False
+            room.closed = True
+            rooms.pop(room.room_id, None)
+            if wal is not None:
+                wal.append({"op": "close_room", "room": room.room_id})
+    print(f"[SERVER] room closed: id={room.room_id} name={room.name}")
+    return True
 
-def players_ready_locked(): # 플레이어 2명이면 시작
-    return player_slots[BLACK] is not None and player_slots[WHITE] is not None
 
+def get_room(room_id): # 방 번호 -> Room, 없으면 404
+    room = rooms.get(room_id)
+    if room is None:
+        raise HttpError(404, "ROOM_NOT_FOUND")
+    return room
 
-def players_info_locked(): #흑백 들어와있는지 확인
-    return {
-        "black": player_slots[BLACK] is not None,
-        "white": player_slots[WHITE] is not None,
-        "ready": players_ready_locked(),
-    }
 
-
-def build_state_locked(): #게임 상태 저장, 플레이어, 채팅, 재시작
-    state = game.get_state()
-    state["players"] = players_info_locked()
-    state["chat"] = chat_messages[-MAX_CHAT:]
-    state["restart"] = restart_info_locked()
-    return state
+def room_for_token(token): # 토큰 앞부분의 방 번호로 방을 찾는다, 등록된 토큰이면 세션 시각 갱신
+    if not token:
+        raise HttpError(400, "TOKEN_REQUIRED")
+    room = rooms.get(room_id_from_token(token))
+    if room is None:
+        raise HttpError(400, "INVALID_TOKEN")
+    if token in room.token_colors:
+        sessions.touch(token)
+    return room
 
 
-def add_chat_locked(name, msg):
-    if not msg: #빈 채팅 입력시 무시
-        return
-    chat_messages.append({"name": name, "msg": msg})
-    if len(chat_messages) > MAX_CHAT * 2: #너무 로그 너무 쌓이면 앞부분 날리기
-        del chat_messages[:-MAX_CHAT]
+def room_for_params(params): # ?room= 또는 ?token= 으로 방 찾기, 둘 다 없으면 기본 방
+    token = params.get("token")
+    if token:
+        return room_for_token(token)
+    return get_room(parse_int_param(params, "room", DEFAULT_ROOM_ID))
 
 
-def restart_info_locked(): #다시 시작 하기 누가 눌렀는 확인하기 위한 함수
-    black_token = player_slots.get(BLACK)
-    white_token = player_slots.get(WHITE)
-    return {
-        "black": black_token in restart_votes if black_token else False,
-        "white": white_token in restart_votes if white_token else False,
-    }
+def build_state_payload(room, since=None): # 게임 상태 응답 포장용
+    return {"ok": True, "state": room.build_state_locked(since)}
 
 # 클라이언트가 보낸 body를 JSON 형식으로 파싱하여 dict로 변환
 # JSON 형식이 잘못되면 INVALID_JSON 에러 발생
@@ -110,33 +160,202 @@ def parse_json_body(body):
     except json.JSONDecodeError:
         raise HttpError(400, "INVALID_JSON")
 
+# Content-Type이 wire.BINARY_TYPE이면 바이너리 body, 아니면 JSON
+def parse_request_body(body, headers):
+    if not wire.is_binary((headers or {}).get("content-type")):
+        return parse_json_body(body)
+    if not body:
+        return {}
+    try:
+        data = wire.decode(body)
+    except ValueError:
+        raise HttpError(400, "INVALID_BODY")
+    if not isinstance(data, dict):
+        raise HttpError(400, "INVALID_BODY")
+    return data
+
+def parse_query(query): # "since=3&timeout=10" -> {"since": "3", "timeout": "10"}
+    return {key: values[0] for key, values in parse_qs(query).items()}
+
+
+def parse_int_param(params, name, default=None):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, "INVALID_PARAM", {"param": name})
+
+
+def parse_float_param(params, name, default=None):
+    value = params.get(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, "INVALID_PARAM", {"param": name})
+
+# 클라이언트가 가진 상태 위치 (쿼리스트링이나 JSON body 어디서 오든 정수로)
+# moves_since: 가진 수 개수, game: game_id, chat_since: 받은 채팅 총 개수
+def parse_delta_params(source):
+    since = {}
+    for name in ("moves_since", "game", "chat_since"):
+        value = source.get(name)
+        if value is None:
+            continue
+        try:
+            since[name] = int(value)
+        except (TypeError, ValueError):
+            raise HttpError(400, "INVALID_PARAM", {"param": name})
+    return since
+
+# 방 규칙 (보드 크기, 승리 조건), 주지 않은 값은 서버 기본값
+def parse_rules(body):
+    rules = dict(default_rules)
+    for name in ("size", "win_length"):
+        if name in body:
+            value = body[name]
+            if not isinstance(value, int) or isinstance(value, bool):
+                raise HttpError(400, "INVALID_PARAM", {"param": name})
+            rules[name] = value
+    if "exact" in body:
+        if not isinstance(body["exact"], bool):
+            raise HttpError(400, "INVALID_PARAM", {"param": "exact"})
+        rules["exact"] = body["exact"]
+    size = rules.get("size", BOARD_SIZE)
+    if not MIN_BOARD_SIZE <= size <= MAX_BOARD_SIZE:
+        raise HttpError(400, "INVALID_BOARD_SIZE", {"min": MIN_BOARD_SIZE, "max": MAX_BOARD_SIZE})
+    if not 3 <= rules.get("win_length", WIN_LENGTH) <= size:
+        raise HttpError(400, "INVALID_WIN_LENGTH", {"min": 3, "max": size})
+    return rules
+
+# 방 만들기, 이름과 규칙(size, win_length, exact)은 선택
+def handle_create_room(body):
+    name = body.get("name")
+    if name is not None and not isinstance(name, str):
+        raise HttpError(400, "INVALID_NAME")
+    room = create_room(name[:MAX_NAME_LENGTH] if name else None, parse_rules(body))
+    with room.lock:
+        return {"ok": True, "room": room.info_locked()}
+
+# 방 목록, 방마다 자기 락을 잠깐씩만 잡는다
+# 워커 모드면 다른 워커들의 방도 물어봐서 합친다
+def handle_list_rooms():
+    infos = local_room_infos()
+    if worker is not None:
+        for index in worker.others():
+            try:
+                infos += worker.query(index, {"op": "rooms"})["rooms"]
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"[SERVER] worker {index} did not answer: {exc!r}")
+        infos.sort(key=lambda info: info["id"])
+    return {"ok": True, "rooms": infos}
+
+
+def local_room_infos(): # 이 프로세스가 가진 방들
+    infos = []
+    for room in list(rooms.values()):
+        with room.lock:
+            infos.append(room.info_locked())
+    return infos
+
+
+def handle_worker_query(request): # 다른 워커가 보낸 질의 (cluster.Cluster.query)
+    if request.get("op") == "rooms":
+        return {"ok": True, "rooms": local_room_infos()}
+    return {"ok": False, "msg": "UNKNOWN_QUERY"}
+
+
+# 워커 모드에서 이 요청을 처리해야 하는 워커 번호
+# 토큰이 있으면 토큰의 방, room이 있으면 그 방, 둘 다 없으면 기본 방을 가진 워커
+# 방과 상관없는 요청(방 만들기/목록)은 받은 워커가, /metrics와 /sessions는 ?worker= 로 지정한 워커가 처리한다
+def owner_of_request(method, path, headers, body):
+    base, _, query = path.partition("?")
+    params = parse_query(query)
+    try:
+        if base in ("/metrics", "/sessions"):
+            return parse_int_param(params, "worker", worker.index) % worker.count
+        if base == "/rooms":
+            return worker.index
+        if method == "POST":
+            params = parse_request_body(body, headers)
+            if not isinstance(params, dict):
+                return worker.index
+        token = params.get("token")
+        if token:
+            room_id = room_id_from_token(token)
+            return worker.index if room_id is None else worker.owner(room_id)
+        return worker.owner(parse_int_param(params, "room", DEFAULT_ROOM_ID))
+    except HttpError: # 잘못된 요청, 받은 워커가 그대로 오류를 돌려준다
+        return worker.index
+
+
+def build_raw_request(method, path, headers, body): # 파싱한 요청을 다른 워커에게 넘길 bytes로 다시 만든다
+    lines = [f"{method} {path} HTTP/1.1"] + [f"{key}: {value}" for key, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("iso-8859-1") + body
+
+
+# 다른 워커가 처리할 요청이면 연결(fd)째 그 워커에게 넘기고 True, 이 프로세스가 처리할 요청이면 False
+# 넘기지 못하면 503 (그 워커가 다시 뜨는 중 등)
+# pending: 이 요청 뒤에 이미 받아 둔 bytes (파이프라이닝된 다음 요청들), 같이 넘긴다
+def hand_off_request(fd, method, path, headers, body, pending=b""):
+    owner = owner_of_request(method, path, headers, body)
+    if owner == worker.index:
+        return False
+    try:
+        worker.hand_off(owner, fd, build_raw_request(method, path, headers, body) + pending)
+    except OSError as exc:
+        print(f"[SERVER] hand-off to worker {owner} failed: {exc!r}")
+        raise HttpError(503, "WORKER_UNAVAILABLE")
+    metrics.inc("omok_handoffs_total")
+    return True
+
 # 새로 들어온 유저에게 색을 배정하고, 토큰을 만들어 저장한 뒤,
 # 현재 게임 상태와 함께 그 정보를 돌려주는 함수
+# body의 room으로 방을 고른다 (없으면 기본 방)
 def handle_join(body):
     name = body.get("name") or "player" # 이름이 없으면 player 햘당
-    with lock: 
-        color = assign_color_locked()
-        token = uuid.uuid4().hex # 플레이어 식별을 위한 토큰 생성
-        token_colors[token] = color
-        token_names[token] = name
+    if not isinstance(name, str):
+        raise HttpError(400, "INVALID_NAME")
+    name = name[:MAX_NAME_LENGTH] # 이름은 이벤트, WAL, journal에 그대로 남으므로 길이를 제한한다
+    room = get_room(parse_int_param(body, "room", DEFAULT_ROOM_ID))
+    with room.lock:
+        if room.closed: # 방을 찾은 뒤 정리됨
+            raise HttpError(404, "ROOM_NOT_FOUND")
+        color = room.assign_color_locked()
+        token = new_token(room.room_id) # 플레이어 식별을 위한 토큰 생성, 방 번호가 들어있다
+        room.token_colors[token] = color
+        room.token_names[token] = name
         if color in (BLACK, WHITE):
-            player_slots[color] = token
-        state = build_state_locked()
-    print(f"[SERVER] join: name={name} color={color_to_name(color)} token={token[:6]}...")
-    return { # 클라이언트에 응답 
+            room.player_slots[color] = token
+        room.emit_event_locked("join", {
+            "name": name,
+            "color": color_to_name(color),
+            "players": room.players_info_locked(),
+        }, {"op": "join", "token": token, "name": name, "color": color})
+        state = room.build_state_locked()
+    sessions.touch(token)
+    print(f"[SERVER] join: room={room.room_id} name={name} color={color_to_name(color)} token={token[:6]}...")
+    resp = { # 클라이언트에 응답 
         "ok": True,
         "color": color_to_name(color),
         "token": token,
+        "room": room.room_id,
+        "rules": state["rules"],
         "state": state,
     }
+    if color is None and state_feed is not None and state_feed.groups(): # 관전자는 UDP 피드로 따라올 수 있다
+        resp["feed"] = state_feed.groups()
+    return resp
 
 #오목판에서 돌을 두는 것을 제어하는 역할을 하는 함수
 def handle_move(body):
     token = body.get("token") #토큰이 있어야 하며
-    if not token:
-        raise HttpError(400, "TOKEN_REQUIRED")
+    room = room_for_token(token)
 
-    color = token_colors.get(token) #유효한 토큰이어야 한다
+    color = room.token_colors.get(token) #유효한 토큰이어야 한다
     if color is None:
         raise HttpError(400, "INVALID_TOKEN")
     if color not in (BLACK, WHITE): #관전자는 돌을 둘 수 없다
@@ -147,111 +366,450 @@ def handle_move(body):
     if not isinstance(x, int) or not isinstance(y, int):
         raise HttpError(400, "INVALID_COORD")
 
-    with lock: #이 안에서만 게임을 변경한다
-        if not players_ready_locked(): #흑백 둘다 있어야하며
-            state = build_state_locked()
+    since = parse_delta_params(body)
+    game = room.game
+    with room.lock: #이 안에서만 게임을 변경한다
+        if not room.players_ready_locked(): #흑백 둘다 있어야하며
+            state = room.build_state_locked(since)
             raise HttpError(400, "WAITING_FOR_OPPONENT", {"state": state})
 
         if game.winner is not None: #누가 이겼으면 수를 더 둘 수 없음
-            state = build_state_locked()
+            state = room.build_state_locked(since)
             raise HttpError(400, "GAME_ALREADY_OVER", {"state": state})
 
         if game.current_turn != color:
-            state = build_state_locked() #내 턴인지 확인하기
+            state = room.build_state_locked(since) #내 턴인지 확인하기
             raise HttpError(400, "NOT_YOUR_TURN", {"state": state})
 
-        ok, msg = game.place_stone(x, y) #실제로 돌 두기
-        state = build_state_locked() #변경된 사항을 전달하기, 이를 클라이언트에게도 전달
+        ok, msg = play_move_locked(room, color, x, y)
+        state = room.build_state_locked(since) #변경된 사항을 전달하기, 이를 클라이언트에게도 전달
 
     return {"ok": ok, "msg": msg, "state": state}
 
+
+def play_move_locked(room, color, x, y): # 실제로 돌 두기 + 이벤트, 사람/봇 공통
+    game = room.game
+    ok, msg = game.place_stone(x, y)
+    if ok:
+        room.emit_event_locked("move", {
+            "x": x,
+            "y": y,
+            "color": color,
+            "turn": game.current_turn,
+            "winner": game.winner,
+            "move_count": game.move_count,
+        }, {"op": "move", "x": x, "y": y})
+        if game.winner is not None: # 승리 또는 무승부
+            # 이 이벤트도 버전을 올리므로 WAL에 남긴다 (복구 후 버전이 하나 모자라면 since를 가진 클라이언트가 다음 변경을 놓친다)
+            room.emit_event_locked("win", {"winner": game.winner, "result": msg}, {"op": "win"})
+    return ok, msg
+
 # 현재 게임 상태를 알려주는 함수
-def handle_state():
-    with lock:
-        return build_state_payload()
+# since가 있으면 버전이 since보다 커질 때까지 (최대 timeout초) 기다렸다가 응답한다 (long-poll)
+# moves_since/game/chat_since를 주면 그 이후 바뀐 부분만 보낸다
+def handle_state(params, headers=None):
+    room = room_for_params(params)
+    since, timeout, delta_since = parse_state_params(params)
+    with room.lock:
+        if since is not None:
+            room.state_changed.wait_for(lambda: room.state_version > since, timeout)
+        return build_state_response_locked(room, delta_since, headers or {})
+
+
+def state_etag_locked(room, binary=False): # 상태 버전이 같으면 내용도 같다 (형식마다 다른 ETag)
+    return f'"{SERVER_EPOCH}-{room.room_id}-{room.state_version}{"-b" if binary else ""}"'
+
+
+# /state 응답: 클라이언트의 If-None-Match가 현재 버전이면 body 없이 304,
+# 전체 상태는 버전마다(형식마다) 한 번만 인코딩한 bytes를 재사용한다
+# Accept에 wire.BINARY_TYPE이 있으면 바이너리로 보낸다
+def build_state_response_locked(room, delta_since, headers):
+    binary = wire.accepts_binary(headers)
+    etag = state_etag_locked(room, binary)
+    etag_header = [f"ETag: {etag}", "Vary: Accept"]
+    content_type = wire.BINARY_TYPE if binary else "application/json"
+    if headers.get("if-none-match") == etag:
+        return RawResponse(b"", 304, etag_header)
+    if delta_since:
+        payload = build_state_payload(room, delta_since)
+        body = wire.encode(payload) if binary else json.dumps(payload).encode(ENCODING)
+        return RawResponse(body, 200, etag_header, content_type)
+    return RawResponse(room.state_body_locked(binary), 200, etag_header, content_type)
+
+def parse_state_params(params): # /state 쿼리 -> (since, timeout, delta 위치)
+    since = parse_int_param(params, "since")
+    timeout = parse_float_param(params, "timeout", MAX_LONG_POLL)
+    timeout = max(0.0, min(timeout, MAX_LONG_POLL))
+    return since, timeout, parse_delta_params(params)
 
 # 플레이어 나가기 처리용
 def handle_quit(body):
     token = body.get("token")
-    if not token:
-        raise HttpError(400, "TOKEN_REQUIRED")
-
-    with lock:
-        color = token_colors.pop(token, None) # del해버리면 이후 player_slot이나 상태를 출력할수 없으므로 pop해서 저장
-        name = token_names.pop(token, None)
-        restart_votes.discard(token)
-        if color in (BLACK, WHITE) and player_slots[color] == token:
-            player_slots[color] = None #나가는 플레이어의 색깔 자리를 비워줌, ex) 흑이 나가면 다음에 들어오는 사람이 흑이됨,
-            # 참고로 관전자가 자동으로 플레이어가 되지는 않음
-    if name:
-        print(f"[SERVER] quit: name={name} color={color_to_name(color)} token={token[:6]}...")
+    room = room_for_token(token)
+    sessions.remove(token)
+    with room.lock:
+        remove_token_locked(room, token, "quit")
     return {"ok": True, "msg": "BYE"}
 
+
+def remove_token_locked(room, token, reason): # /quit 또는 세션 만료, 자리와 토큰 정리
+    color = room.token_colors.pop(token, None) # del해버리면 이후 player_slot이나 상태를 출력할수 없으므로 pop해서 저장
+    name = room.token_names.pop(token, None)
+    room.restart_votes.discard(token)
+    room.bots.pop(token, None)
+    if color in (BLACK, WHITE) and room.player_slots[color] == token:
+        room.player_slots[color] = None #나가는 플레이어의 색깔 자리를 비워줌, ex) 흑이 나가면 다음에 들어오는 사람이 흑이됨,
+        # 참고로 관전자가 자동으로 플레이어가 되지는 않음
+    if name is None:
+        return
+    room.emit_event_locked("quit", {
+        "name": name,
+        "color": color_to_name(color),
+        "reason": reason,
+        "players": room.players_info_locked(),
+        "restart": room.restart_info_locked(),
+    }, {"op": "quit", "token": token})
+    print(f"[SERVER] {reason}: room={room.room_id} name={name} color={color_to_name(color)} token={token[:6]}...")
+
+
+def expire_session(token): # SessionStore가 오래 조용한 토큰마다 호출
+    room = rooms.get(room_id_from_token(token))
+    if room is None:
+        return
+    with room.lock:
+        if token not in room.bots:
+            remove_token_locked(room, token, "timeout")
+
+
+empty_rooms = {} # 방 번호 -> 사람이 없는 것을 처음 본 시각 (reap_idle_rooms만 쓴다)
+
+
+def reap_idle_rooms(): # 세션 만료 검사 때마다 호출, 사람 없이 세션 만료 시간만큼 지난 방을 정리한다 (기본 방 제외)
+    now = time.monotonic()
+    for room in list(rooms.values()):
+        if room.room_id == DEFAULT_ROOM_ID:
+            continue
+        with room.lock:
+            occupied = room.occupied_locked()
+        if occupied:
+            empty_rooms.pop(room.room_id, None)
+        elif now - empty_rooms.setdefault(room.room_id, now) >= sessions.timeout:
+            close_room(room)
+    for room_id in [room_id for room_id in empty_rooms if room_id not in rooms]:
+        del empty_rooms[room_id]
+
+
+sessions = SessionStore(SESSION_TIMEOUT, expire_session, on_sweep=reap_idle_rooms)
+
+
+def handle_sessions(): # 세션 수 (살아있는 세션, 지금까지 만료된 세션)
+    return dict(sessions.stats(), ok=True)
+
+
+def handle_metrics(): # Prometheus 텍스트 형식
+    return RawResponse(metrics.render().encode(ENCODING), 200, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def collect_server_metrics(): # scrape 할 때만 계산하는 값들
+    stats = sessions.stats()
+    return [
+        ("omok_threads", "gauge", "Live Python threads", [((), threading.active_count())]),
+        ("omok_rooms", "gauge", "Rooms hosted by this process", [((), len(rooms))]),
+        ("omok_sessions_live", "gauge", "Tokens seen within the session timeout", [((), stats["live"])]),
+        ("omok_sessions_reaped_total", "counter", "Sessions expired for inactivity", [((), stats["reaped"])]),
+    ]
+
+
+metrics.collectors.append(collect_server_metrics)
+
+ROUTES = {"/join", "/move", "/quit", "/state", "/chat", "/restart", "/events", "/rooms", "/bot", "/sessions", "/metrics"}
+
+
+def route_label(path): # metrics 라벨/제한 설정에 쓰는 라우트 이름
+    route = path.partition("?")[0]
+    if route not in ROUTES: # 아무 경로나 라벨로 만들면 시계열이 끝없이 늘어난다
+        route = "other"
+    return route
+
+
+def record_request(method, path, status, started): # 라우트별 요청 수/상태 코드/지연시간
+    labels = (("method", method), ("route", route_label(path)))
+    metrics.inc("omok_requests_total", labels + (("status", str(status)),))
+    metrics.observe("omok_request_seconds", labels, time.perf_counter() - started)
+
+# 요청을 받아도 되는지 rate_limiter에 묻는다, 방 락을 잡기 전에 (route_request 전에) 부른다
+# 제한에 걸리면 바로 보낼 429/503 응답, 받아도 되면 None (처리가 끝나면 rate_limiter.release())
+def admit_request(method, path, headers, body, addr):
+    route = route_label(path)
+    token = request_token(method, path, headers, body) if rate_limiter.wants_token(route) else None
+    decision, wait = rate_limiter.admit(route, token, addr[0] if addr else None)
+    metrics.inc("omok_admission_total", (("route", route), ("decision", decision)))
+    if decision == ALLOWED:
+        return None
+    status, message = (503, "SERVER_BUSY") if decision == OVERLOADED else (429, "RATE_LIMITED")
+    payload = {"ok": False, "msg": message, "reason": decision, "retry_after": wait}
+    return RawResponse(json.dumps(payload).encode(ENCODING), status, [f"Retry-After: {wait}"])
+
+
+# 요청의 토큰 (GET은 쿼리, POST는 body), 없거나 살아있는 세션의 토큰이 아니면 None
+# 지어낸 토큰은 토큰별 제한을 받지 않고 IP별 제한만 받는다 (토큰을 바꿔 가며 제한을 피하지 못하게)
+def request_token(method, path, headers, body):
+    if method != "POST":
+        token = parse_query(path.partition("?")[2]).get("token")
+        return token if token and sessions.is_live(token) else None
+    try:
+        params = parse_request_body(body, headers)
+    except HttpError: # 깨진 body는 라우팅에서 400으로
+        return None
+    token = params.get("token") if isinstance(params, dict) else None
+    return token if isinstance(token, str) and sessions.is_live(token) else None
+
 # 채팅을 서버로 보내는 요청을 처리하는 함수
 def handle_chat(body):
     token = body.get("token")
-    if not token: # 누가 보낸지 알기(token확인)
-        raise HttpError(400, "TOKEN_REQUIRED")
+    room = room_for_token(token) # 누가 보낸지 알기(token확인)
     msg = body.get("msg") # 문자열인지 확인하기, 이상한 타(숫자, dict)등은 안됨.
     # 참고로 사용자가 입력하는 숫자는 어차피 문자열로 처리돼서 상관없음
     if not isinstance(msg, str): #타입 확인
         raise HttpError(400, "INVALID_MESSAGE")
-    if token not in token_names: # 토큰이 등록된 토큰인지
+    if token not in room.token_names: # 토큰이 등록된 토큰인지
         raise HttpError(400, "INVALID_TOKEN")
 
-    with lock:#실제 실행되는 부분
-        name = token_names.get(token, "player")#이름찾기, player가 기본값
-        add_chat_locked(name, msg[:200]) # 실제로 채팅을 저장하는 부분, 최대 200글자로 제한하기
-        chat = chat_messages[-MAX_CHAT:] # 채팅 로그 너무 길어지면 자르기
-    return {"ok": True, "chat": chat}
+    chat_since = parse_delta_params(body).get("chat_since") # 주면 그 id 이후 채팅만 돌려준다
+    with room.lock:#실제 실행되는 부분
+        name = room.token_names.get(token, "player")#이름찾기, player가 기본값
+        message = room.add_chat_locked(name, msg[:200]) # 실제로 채팅을 저장하는 부분, 최대 200글자로 제한하기
+        if message is not None:
+            room.emit_event_locked("chat", message, {"op": "chat", "name": name, "msg": message["msg"]})
+        chat = room.build_chat_state_locked(chat_since)
+    return dict(chat, ok=True)
 
 #재경기를 위한 로직
 def handle_restart(body):
     token = body.get("token")
-    if not token: #누가 시작했는지 알기 위해 토큰 검사
-        raise HttpError(400, "TOKEN_REQUIRED")
+    room = room_for_token(token) #누가 시작했는지 알기 위해 토큰 검사
 
-    with lock:# 서버혼자 작업시작
-        color = token_colors.get(token)
+    since = parse_delta_params(body)
+    game = room.game
+    with room.lock:# 서버혼자 작업시작
+        color = room.token_colors.get(token)
         if color not in (BLACK, WHITE):# 현재 플레이어만 재시작 가능하게
             raise HttpError(400, "NOT_A_PLAYER")
         if game.winner is None: # 게임이 끝난 상태여야 함
             raise HttpError(400, "GAME_NOT_FINISHED")
 
-        restart_votes.add(token)
-        votes = restart_info_locked()
+        room.restart_votes.add(token)
+        room.restart_votes.update(room.bots) # 봇은 항상 다시하기에 동의
+        votes = room.restart_info_locked()
         both_ready = votes["black"] and votes["white"]
 
+        mutation = {"op": "restart", "votes": sorted(room.restart_votes), "reset": both_ready}
         if both_ready: # 둘다 재시작 동의하면
             game.reset() #게임 재시작
-            restart_votes.clear()
-            state = build_state_locked()
+            room.restart_votes.clear()
             status = "RESTARTED"
+            room.emit_event_locked("restart", {
+                "status": status,
+                "restart": room.restart_info_locked(),
+                "game": dict(game.get_state(), board=[row[:] for row in game.board]), # 이벤트는 나중에 보내지므로 보드 복사
+            }, mutation)
         else:
-            state = build_state_locked() # 계속 기다리는 상태로 유지
-            status = "PENDING"
+            status = "PENDING" # 계속 기다리는 상태로 유지
+            room.emit_event_locked("restart", {"status": status, "restart": votes}, mutation)
+        state = room.build_state_locked(since)
 
-    name = token_names.get(token, "player")
+    name = room.token_names.get(token, "player")
     print(
-        f"[SERVER] restart requested by {name} ({color_to_name(color)}) status={status}"
+        f"[SERVER] restart requested by {name} ({color_to_name(color)}) room={room.room_id} status={status}"
     )
     return {"ok": True, "state": state, "status": status}
 
 
-def route_request(method, path, body): # 요청에 따라 적정한 함수로 연결
+# /events 요청의 응답, handle_client가 연결을 넘겨받아 이벤트가 생길 때마다 흘려보낸다
+class EventStream:
+    def __init__(self, room, since, token=None):
+        self.room = room
+        self.since = since # 클라이언트가 마지막으로 받은 이벤트 번호 (없으면 None)
+        self.token = token # 주면 이벤트/heartbeat를 보낼 때마다 그 세션을 살아있는 것으로 본다
+
+    def collect_locked(self, cursor): # cursor 이후의 이벤트 -> (새 cursor, 보낼 bytes 목록)
+        room = self.room
+        if self.token in room.token_colors:
+            sessions.touch(self.token)
+        if cursor is None or room.missed_events_locked(cursor):
+            # 처음 접속했거나 보관된 이벤트보다 뒤쳐졌으면 전체 상태부터 보낸다
+            cursor = room.state_version
+            return cursor, [format_event(cursor, "snapshot", {"state": room.build_state_locked()})]
+        events = [event for event in room.event_log if event[0] > cursor]
+        if events:
+            cursor = events[-1][0]
+        return cursor, [format_event(*event) for event in events] # 락 안에서 인코딩 (보드가 바뀌기 전에)
+
+    def chunks(self): # Server-Sent Events 형식의 bytes를 계속 만들어 낸다
+        room = self.room
+        cursor = self.since
+        while True:
+            with room.lock:
+                if cursor is not None:
+                    room.state_changed.wait_for(lambda: room.state_version > cursor, EVENT_HEARTBEAT)
+                cursor, chunks = self.collect_locked(cursor)
+            if not chunks:
+                yield HEARTBEAT_CHUNK # 연결이 살아있는지 확인용 주석
+                continue
+            yield from chunks
+
+
+HEARTBEAT_CHUNK = b": ping\n\n"
+
+
+def format_event(seq, kind, data):
+    return f"id: {seq}\nevent: {kind}\ndata: {json.dumps(data)}\n\n".encode(ENCODING)
+
+
+# ---------------------------------------------------------------------------
+# 봇: 빈 자리에 앉아서 자기 차례가 되면 ai.choose_move를 프로세스 풀에서 돌린다
+# 탐색하는 동안 방 락을 잡지 않고, 결과는 bot_mover 스레드가 락을 잡고 둔다
+# (수를 둔 뒤 판이 바뀌었으면 버리고 다시 계산)
+# ---------------------------------------------------------------------------
+
+bot_executor = None
+bot_executor_lock = threading.Lock()
+bot_results = queue.SimpleQueue() # (room, token, game_id, move_count, executor, retries, future)
+BOT_RETRIES = 1 # 풀이 망가져서 실패한 탐색을 새 풀로 다시 해 보는 횟수
+
+
+def get_bot_executor(): # 처음 봇을 앉힐 때 프로세스 풀과 bot_mover 스레드를 만든다
+    global bot_executor
+    with bot_executor_lock:
+        if bot_executor is None:
+            bot_executor = new_bot_executor()
+            threading.Thread(target=bot_mover, daemon=True).start()
+        return bot_executor
+
+
+def new_bot_executor():
+    # 풀은 첫 submit(방 락을 잡은 schedule_bot_locked) 때 프로세스를 띄운다
+    # fork면 다른 스레드가 잡고 있던 락까지 복사되므로 spawn으로 새 인터프리터를 띄운다
+    return ProcessPoolExecutor(max_workers=BOT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+
+def replace_broken_bot_executor(broken): # 워커 프로세스가 죽어 망가진 풀을 새 풀로 (이미 바꿨으면 그대로)
+    global bot_executor
+    with bot_executor_lock:
+        if bot_executor is broken:
+            bot_executor = new_bot_executor()
+    broken.shutdown(wait=False)
+
+
+def schedule_bot_locked(room, retries=0): # version_listeners에 등록, 버전이 오를 때마다 봇 차례인지 본다
+    if not room.bots or room.bot_thinking or bot_executor is None:
+        return
+    game = room.game
+    token = room.player_slots.get(game.current_turn)
+    if token not in room.bots or game.winner is not None or not room.players_ready_locked():
+        return
+    depth, time_limit = room.bots[token]
+    room.bot_thinking = True
+    executor = bot_executor
+    ticket = (room, token, game.game_id, game.move_count, executor, retries)
+    try:
+        future = executor.submit(ai.choose_move, game.rules, list(game.moves), depth, time_limit)
+    except RuntimeError as exc: # 망가진 풀 (BrokenProcessPool), 여기서 올라가면 이 버전을 올린 요청이 500이 된다
+        future = Future()
+        future.set_exception(exc)
+    future.add_done_callback(lambda done: bot_results.put(ticket + (done,)))
+
+
+version_listeners.append(schedule_bot_locked)
+
+
+def bot_mover(): # 탐색 결과를 받아서 방 락 안에서 둔다
+    while True:
+        room, token, game_id, move_count, executor, retries, future = bot_results.get()
+        try:
+            (x, y), depth, nodes = future.result()
+        except Exception as exc:
+            print(f"[SERVER] bot search failed: room={room.room_id} {exc!r}")
+            if isinstance(exc, BrokenExecutor): # 워커 프로세스가 죽은 것, 풀은 다른 방을 위해서라도 새로 만든다
+                replace_broken_bot_executor(executor)
+            with room.lock:
+                room.bot_thinking = False
+                if isinstance(exc, BrokenExecutor) and retries < BOT_RETRIES:
+                    schedule_bot_locked(room, retries + 1)
+                else: # 다시 해도 안 되면 봇을 내보낸다 (사람이 봇 차례에서 끝없이 기다리지 않게)
+                    remove_token_locked(room, token, "bot_error")
+            continue
+        with room.lock:
+            room.bot_thinking = False
+            game = room.game
+            color = room.token_colors.get(token)
+            if game.game_id == game_id and game.move_count == move_count and color == game.current_turn:
+                play_move_locked(room, color, x, y)
+            else: # 탐색하는 동안 판이 바뀜 (재시작, 나가기 등)
+                schedule_bot_locked(room)
+        print(f"[SERVER] bot move: room={room.room_id} ({x}, {y}) depth={depth} nodes={nodes}")
+
+
+# 빈 자리에 봇 앉히기, body: room, level(easy/normal/hard), depth, time (depth/time은 level보다 우선)
+def handle_add_bot(body):
+    room = get_room(parse_int_param(body, "room", DEFAULT_ROOM_ID))
+    depth = parse_int_param(body, "depth")
+    time_limit = parse_float_param(body, "time")
+    try:
+        settings = ai.level_settings(body.get("level"), depth, time_limit)
+    except ValueError as exc:
+        raise HttpError(400, str(exc))
+    get_bot_executor()
+    with room.lock:
+        if room.closed:
+            raise HttpError(404, "ROOM_NOT_FOUND")
+        color = room.assign_color_locked()
+        if color is None:
+            raise HttpError(400, "ROOM_FULL")
+        token = new_token(room.room_id)
+        name = f"bot-{body.get('level') or ai.DEFAULT_LEVEL}"
+        room.token_colors[token] = color
+        room.token_names[token] = name
+        room.player_slots[color] = token
+        room.bots[token] = settings
+        room.emit_event_locked("join", { # 봇 차례면 여기서 바로 탐색이 시작된다
+            "name": name,
+            "color": color_to_name(color),
+            "players": room.players_info_locked(),
+        }, {"op": "join", "token": token, "name": name, "color": color, "bot": list(settings)})
+        state = room.build_state_locked()
+    print(f"[SERVER] bot joined: room={room.room_id} color={color_to_name(color)} depth={settings[0]} time={settings[1]}")
+    return {"ok": True, "color": color_to_name(color), "room": room.room_id, "state": state}
+
+
+def route_request(method, path, body, headers=None): # 요청에 따라 적정한 함수로 연결
+    path, _, query = path.partition("?") # 쿼리스트링 분리
+    params = parse_query(query)
     if method == "POST" and path == "/join":
-        return handle_join(parse_json_body(body))
+        return handle_join(parse_request_body(body, headers))
     if method == "POST" and path == "/move":
-        return handle_move(parse_json_body(body))
+        return handle_move(parse_request_body(body, headers))
     if method == "POST" and path == "/quit":
-        return handle_quit(parse_json_body(body))
+        return handle_quit(parse_request_body(body, headers))
     if method == "POST" and path == "/chat":
-        return handle_chat(parse_json_body(body))
+        return handle_chat(parse_request_body(body, headers))
     if method == "POST" and path == "/restart":
-        return handle_restart(parse_json_body(body))
+        return handle_restart(parse_request_body(body, headers))
     if method == "GET" and path == "/state":
-        return handle_state()
-    if path not in {"/join", "/move", "/quit", "/state", "/chat", "/restart"}:
+        return handle_state(params, headers)
+    if method == "GET" and path == "/events":
+        return EventStream(room_for_params(params), parse_int_param(params, "since"), params.get("token"))
+    if method == "GET" and path == "/rooms":
+        return handle_list_rooms()
+    if method == "POST" and path == "/rooms":
+        return handle_create_room(parse_request_body(body, headers))
+    if method == "POST" and path == "/bot":
+        return handle_add_bot(parse_request_body(body, headers))
+    if method == "GET" and path == "/sessions":
+        return handle_sessions()
+    if method == "GET" and path == "/metrics":
+        return handle_metrics()
+    if path not in ROUTES:
         raise HttpError(404, "NOT_FOUND")
     raise HttpError(405, "METHOD_NOT_ALLOWED")
 
@@ -262,19 +820,22 @@ def route_request(method, path, body): # 요청에 따라 적정한 함수로 
 # \r\n
 # {"x":5,"y":7,"token":"abc"}
 # 이런식으로 들어옴
-def read_http_request(conn):
-    data = b""
-    while b"\r\n\r\n" not in data: # 헤더와 본문 나누기
-        chunk = conn.recv(4096) #클라이언트가 보낸 글자를 읽는다
-        if not chunk:
-            break
-        data += chunk
-        if len(data) > MAX_HEADER_BYTES: #헤더가 너무 크면 차단하기
-            raise HttpError(400, "HEADER_TOO_LARGE")
-    if b"\r\n\r\n" not in data: # 헤더가 제대로 안왔으면 에러
-        raise HttpError(400, "INVALID_HTTP_REQUEST")
-
-    header_bytes, body = data.split(b"\r\n\r\n", 1) #헤더와 바디를 나눈다
+# keep-alive 연결에서 클라이언트가 요청 없이 연결을 닫으면 None을 돌려준다
+# reader: 연결마다 하나인 httpbuf.RecvBuffer, 요청 뒤에 이어서 온 bytes(파이프라이닝)는 다음 호출에서 읽는다
+def read_http_request(reader):
+    try:
+        header_bytes = reader.read_head(MAX_HEADER_BYTES) #헤더 끝(빈 줄)까지, 헤더가 너무 크면 차단하기
+        if header_bytes is None: # 요청 사이에 연결이 정상 종료됨
+            return None
+        method, path, headers = parse_request_head(header_bytes)
+        #바디 길이 만큼 추가로 받기
+        body = reader.read_body(parse_content_length(headers))
+    except ValueError as exc: # HEADER_TOO_LARGE, INCOMPLETE_HEADER, INCOMPLETE_BODY
+        raise HttpError(400, str(exc))
+    return method, path, headers, body
+
+
+def parse_request_head(header_bytes): # 요청줄 + 헤더 -> (method, path, headers)
     header_text = header_bytes.decode("iso-8859-1") #헤더 텍스트 파싱
     lines = header_text.split("\r\n")
     if not lines or len(lines[0].split()) < 3: #http 요청의 첫줄이 최소한 method path version을 지키고 있는지 확인하는 안전장치
@@ -282,7 +843,7 @@ def read_http_request(conn):
         raise HttpError(400, "INVALID_REQUEST_LINE")
 
     request_line = lines[0]
-    method, path, _ = request_line.split(maxsplit=2) #method, path 추출
+    method, path, version = request_line.split(maxsplit=2) #method, path, version 추출
 
     headers = {} #헤더를 딕셔너리로 변환
     for line in lines[1:]:
@@ -292,60 +853,575 @@ def read_http_request(conn):
             continue
         key, value = line.split(":", 1)
         headers[key.strip().lower()] = value.strip()
-    #바디 길이 만큼 추가로 받기
-    content_length = int(headers.get("content-length", "0") or "0")
-    while len(body) < content_length:
-        chunk = conn.recv(4096)
-        if not chunk:
-            break
-        body += chunk
-    if len(body) < content_length:
-        raise HttpError(400, "INCOMPLETE_BODY")
-
-    return method.upper(), path, body[:content_length]
+    if version.strip().upper() == "HTTP/1.0": # HTTP/1.0은 기본이 연결 종료
+        headers.setdefault("connection", "close")
+    return method.upper(), path, headers
+
+
+def parse_content_length(headers):
+    try:
+        length = int(headers.get("content-length", "0") or "0")
+    except ValueError:
+        raise HttpError(400, "INVALID_CONTENT_LENGTH")
+    if length < 0:
+        raise HttpError(400, "INVALID_CONTENT_LENGTH")
+    return length
+
+
+def wants_keep_alive(headers): # 클라이언트가 연결 유지를 원하는지 (HTTP/1.1 기본값은 유지)
+    return headers.get("connection", "").lower() != "close"
 
 #서버가 만든 데이터 → HTTP 규칙에 맞는 문자열로 만들어서 보낸다
-def send_http_response(conn, status, payload):
-    body = json.dumps(payload).encode(ENCODING)
+def send_http_response(conn, status, payload, keep_alive=False, binary=False):
+    conn.sendall(build_http_response(status, payload, keep_alive, binary))
+
+
+# 응답 전체를 bytes로 (스레드/asyncio 공용), binary면 dict를 JSON 대신 wire 형식으로
+def build_http_response(status, payload, keep_alive=False, binary=False):
+    extra_headers = []
+    if isinstance(payload, RawResponse): # 이미 인코딩된 응답
+        status, body, extra_headers = payload.status, payload.body, payload.headers
+        content_type = payload.content_type
+    elif binary:
+        body = wire.encode(payload)
+        content_type = wire.BINARY_TYPE
+    else:
+        body = json.dumps(payload).encode(ENCODING)
+        content_type = "application/json"
     status_text = HTTP_STATUS_TEXT.get(status, "") # 미리 저장해논 상태를 불러온다
-    headers = [
-        f"HTTP/1.1 {status} {status_text}",
-        "Content-Type: application/json",
-        f"Content-Length: {len(body)}",
-        "Connection: close",
-        "",
-        "",
-    ]
-    conn.sendall("\r\n".join(headers).encode(ENCODING) + body)
+    headers = [f"HTTP/1.1 {status} {status_text}"]
+    if status != 304: # 304는 body가 없다
+        headers.append(f"Content-Type: {content_type}")
+        headers.append(f"Content-Length: {len(body)}")
+    headers += extra_headers
+    if keep_alive: # 연결을 유지하면 클라이언트에게 유지 조건을 알려준다
+        headers.append("Connection: keep-alive")
+        headers.append(f"Keep-Alive: timeout={KEEPALIVE_TIMEOUT}, max={MAX_KEEPALIVE_REQUESTS}")
+    else:
+        headers.append("Connection: close")
+    headers += ["", ""]
+    return "\r\n".join(headers).encode(ENCODING) + body
 
-# 요청 읽고 답장을 보내는
-def handle_client(conn, addr):
+# 이벤트 스트림은 길이를 알 수 없으므로 Content-Length 없이 보내고 끝나면 연결을 닫는다
+EVENT_STREAM_HEAD = "\r\n".join([
+    "HTTP/1.1 200 OK",
+    "Content-Type: text/event-stream",
+    "Cache-Control: no-cache",
+    "Connection: close",
+    "",
+    "",
+]).encode(ENCODING)
+
+
+def send_event_stream(conn, stream):
+    conn.sendall(EVENT_STREAM_HEAD)
+    for chunk in stream.chunks():
+        conn.sendall(chunk)
+
+# 한 연결에서 요청을 계속 읽고 답장을 보낸다 (HTTP/1.1 keep-alive)
+# 클라이언트가 닫거나, KEEPALIVE_TIMEOUT 동안 조용하거나, 요청 수가 상한에 닿으면 연결을 닫는다
+# pending: 다른 워커가 연결과 함께 넘겨준, 이미 읽은 요청 bytes
+def handle_client(conn, addr, pending=b""):
+    served = 0
+    metrics.inc("omok_connections_total")
+    metrics.inc("omok_connections_active")
+    reader = RecvBuffer(conn, pending)
     try:
-        method, path, body = read_http_request(conn)
-        response = route_request(method, path, body) # 실제 게임 정보
-        send_http_response(conn, 200, response)
-    except HttpError as err:
-        send_http_response(conn, err.status, err.payload)
-    except Exception as exc:
-        print(f"[SERVER] internal error for {addr}: {exc}")
-        send_http_response(conn, 500, {"ok": False, "msg": "SERVER_ERROR"})
+        while served < MAX_KEEPALIVE_REQUESTS:
+            try:
+                request = read_http_request(reader)
+            except socket.timeout: # 유휴 시간 초과
+                break
+            except HttpError as err: # 요청 형식이 깨지면 이후 바이트를 믿을 수 없으므로 닫는다
+                send_http_response(conn, err.status, err.payload)
+                break
+            if request is None: # 클라이언트가 연결을 닫음
+                break
+
+            method, path, headers, body = request
+            if worker is not None:
+                try:
+                    if hand_off_request(conn.fileno(), method, path, headers, body, reader.pending()): # 이후 이 연결은 그 워커가 처리
+                        break
+                except HttpError as err:
+                    send_http_response(conn, err.status, err.payload)
+                    break
+            served += 1
+            keep_alive = wants_keep_alive(headers) and served < MAX_KEEPALIVE_REQUESTS
+            started = time.perf_counter()
+            payload = None if rate_limiter is None else admit_request(method, path, headers, body, addr)
+            if payload is not None: # 제한에 걸림, 방 락을 건드리지 않고 바로 거절
+                status = payload.status
+            else:
+                try:
+                    status, payload = 200, route_request(method, path, body, headers) # 실제 게임 정보
+                except HttpError as err:
+                    status, payload = err.status, err.payload
+                except Exception as exc:
+                    print(f"[SERVER] internal error for {addr}: {exc}")
+                    status, payload = 500, {"ok": False, "msg": "SERVER_ERROR"}
+                finally:
+                    if rate_limiter is not None:
+                        rate_limiter.release()
+            record_request(method, path, payload.status if isinstance(payload, RawResponse) else status, started)
+            if isinstance(payload, EventStream): # 이후로 이 연결은 이벤트 전용
+                send_event_stream(conn, payload)
+                break
+            send_http_response(conn, status, payload, keep_alive, wire.accepts_binary(headers))
+            if not keep_alive:
+                break
+    except OSError: # 클라이언트가 중간에 끊은 경우 등
+        pass
     finally:
         conn.close()
+        metrics.inc("omok_connections_active", amount=-1)
+        metrics.retire_thread() # 이 스레드의 카운터를 공용으로 합치고 정리
 
 
-def main():
+def adopt_connection(conn, pending): # 다른 워커가 넘겨준 연결, 받아 둔 요청부터 처리한다
+    conn.settimeout(KEEPALIVE_TIMEOUT)
+    try:
+        addr = conn.getpeername()
+    except OSError: # 그 사이 클라이언트가 끊음
+        conn.close()
+        return
+    threading.Thread(target=handle_client, args=(conn, addr, pending), daemon=True).start()
+
+
+def serve_threaded(host, port): # 연결마다 스레드 하나 (기본 모드)
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s: #소캣: 통신 창, with 써서 프로그램 끝나면 소캣 닫힘
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) #오류 방지용
-        s.bind((HOST, PORT)) #소캣을 host:port에 연결
+        if worker is not None: # 워커들이 같은 포트에서 받는다
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        s.bind((host, port)) #소캣을 host:port에 연결
         s.listen() #연결 요청 받는 모드로 전환
-        print(f"[SERVER] HTTP listening on {HOST}:{PORT}")
+        if worker is not None:
+            worker.serve(adopt_connection, handle_worker_query)
+        print(f"[SERVER] HTTP listening on {host}:{port} (threaded{worker_label()})")
 
         while True: #서버 무한루프 돌리기
             conn, addr = s.accept()#누군가 접속하면
-            conn.settimeout(10)# 근데 응답 없으면 끊어버리기
+            conn.settimeout(KEEPALIVE_TIMEOUT)# 근데 응답 없으면 끊어버리기
             t = threading.Thread(target=handle_client, args=(conn, addr), daemon=True) #비유적으로 손님 받을 직원을 만드는 과정
             t.start() #실제로 작업 시작
 
 
+# ---------------------------------------------------------------------------
+# asyncio 모드: 이벤트 루프 하나가 모든 연결을 처리한다
+# 라우팅/handle_* 함수는 그대로 쓰고, 기다려야 하는 요청(long-poll, /events)만
+# 스레드를 막지 않도록 버전 변경 알림을 await 한다
+# ---------------------------------------------------------------------------
+
+_async_waiters = {} # 방 번호 -> 버전 변경을 기다리는 future들 (이벤트 루프 스레드에서만 만진다)
+
+
+def _wake_async_waiters(room_id):
+    for waiter in _async_waiters.pop(room_id, ()):
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+async def wait_version_async(room, since, timeout): # room.state_version > since 가 되거나 timeout까지 대기
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while room.state_version <= since:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        waiter = loop.create_future()
+        _async_waiters.setdefault(room.room_id, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter, remaining)
+        except asyncio.TimeoutError:
+            return
+        finally:
+            waiters = _async_waiters.get(room.room_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del _async_waiters[room.room_id]
+
+
+async def route_request_async(method, path, body, headers=None):
+    base, _, query = path.partition("?")
+    if method == "GET" and base == "/state": # long-poll은 루프를 막지 않고 기다린다
+        params = parse_query(query)
+        room = room_for_params(params)
+        since, timeout, delta_since = parse_state_params(params)
+        if since is not None:
+            await wait_version_async(room, since, timeout)
+        with room.lock:
+            return build_state_response_locked(room, delta_since, headers or {})
+    return route_request(method, path, body, headers)
+
+
+class HttpConnection(asyncio.BufferedProtocol):
+    # asyncio 모드의 연결 하나: 스레드 모드와 같은 httpbuf.RecvBuffer에 이벤트 루프가 바로 recv_into 한다
+    # 요청 처리는 connection_made에서 시작하는 handle_client_async task가 한다
+    def __init__(self, pending=b""):
+        self.buffer = RecvBuffer(None, pending)
+        self.transport = None
+        self.closed = False # 상대가 보내기를 끝냈거나 연결이 끊김
+        self.data_waiter = None # 새 bytes를 기다리는 future
+        self.drain_waiter = None # 보내기 버퍼가 빠지기를 기다리는 future
+        self.task = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.task = asyncio.get_running_loop().create_task(handle_client_async(self))
+
+    def get_buffer(self, sizehint):
+        return self.buffer.writable()
+
+    def buffer_updated(self, nbytes):
+        self.buffer.commit(nbytes)
+        self._wake_reader()
+
+    def eof_received(self): # 상대가 보내기만 닫았을 수 있으니 응답을 보낼 때까지 연결은 열어 둔다
+        self.closed = True
+        self._wake_reader()
+        return True
+
+    def connection_lost(self, exc):
+        self.closed = True
+        self._wake_reader()
+        if self.drain_waiter is not None and not self.drain_waiter.done():
+            self.drain_waiter.set_exception(ConnectionResetError("connection lost"))
+
+    def pause_writing(self):
+        self.drain_waiter = asyncio.get_running_loop().create_future()
+
+    def resume_writing(self):
+        if self.drain_waiter is not None and not self.drain_waiter.done():
+            self.drain_waiter.set_result(None)
+        self.drain_waiter = None
+
+    def _wake_reader(self):
+        if self.data_waiter is not None and not self.data_waiter.done():
+            self.data_waiter.set_result(None)
+
+    async def _wait_data(self):
+        self.data_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.data_waiter
+        finally:
+            self.data_waiter = None
+
+    async def read_head(self, limit): # RecvBuffer.read_head의 asyncio 버전
+        while True:
+            head = self.buffer.take_head(limit)
+            if head is not None:
+                return head
+            if self.closed:
+                if not len(self.buffer):
+                    return None
+                raise ValueError("INCOMPLETE_HEADER")
+            await self._wait_data()
+
+    async def read_body(self, length):
+        while True:
+            body = self.buffer.take_body(length)
+            if body is not None:
+                return body
+            if self.closed:
+                raise ValueError("INCOMPLETE_BODY")
+            await self._wait_data()
+
+    def write(self, data):
+        self.transport.write(data)
+
+    async def drain(self):
+        if self.transport.is_closing():
+            raise ConnectionResetError("connection closed")
+        if self.drain_waiter is not None:
+            await self.drain_waiter
+
+    def close(self):
+        self.transport.close()
+
+
+async def read_http_request_async(conn): # read_http_request의 asyncio 버전
+    try:
+        header_bytes = await conn.read_head(MAX_HEADER_BYTES)
+        if header_bytes is None: # 요청 사이에 연결이 정상 종료됨
+            return None
+        method, path, headers = parse_request_head(header_bytes)
+        body = await conn.read_body(parse_content_length(headers))
+    except ValueError as exc: # HEADER_TOO_LARGE, INCOMPLETE_HEADER, INCOMPLETE_BODY
+        raise HttpError(400, str(exc))
+    return method, path, headers, body
+
+
+async def send_event_stream_async(conn, stream):
+    conn.write(EVENT_STREAM_HEAD)
+    await conn.drain()
+    room = stream.room
+    cursor = stream.since
+    while True:
+        if cursor is not None:
+            await wait_version_async(room, cursor, EVENT_HEARTBEAT)
+        with room.lock:
+            cursor, chunks = stream.collect_locked(cursor)
+        conn.write(b"".join(chunks) or HEARTBEAT_CHUNK)
+        await conn.drain()
+
+
+async def adopt_connection_async(sock, pending): # adopt_connection의 asyncio 버전
+    loop = asyncio.get_running_loop()
+    try: # 넘겨받은 bytes를 RecvBuffer에 미리 넣어 두면 task가 시작하자마자 그것부터 처리한다
+        await loop.connect_accepted_socket(lambda: HttpConnection(pending), sock)
+    except OSError:
+        sock.close()
+
+
+def schedule_adopt_async(loop, sock, pending): # 워커 사이 스레드에서 호출, 루프 스레드에서 받는다
+    asyncio.run_coroutine_threadsafe(adopt_connection_async(sock, pending), loop)
+
+
+async def handle_client_async(conn): # handle_client의 asyncio 버전
+    addr = conn.transport.get_extra_info("peername")
+    served = 0
+    metrics.inc("omok_connections_total")
+    metrics.inc("omok_connections_active")
+    try:
+        while served < MAX_KEEPALIVE_REQUESTS:
+            try:
+                request = await asyncio.wait_for(read_http_request_async(conn), KEEPALIVE_TIMEOUT)
+            except asyncio.TimeoutError: # 유휴 시간 초과
+                break
+            except HttpError as err:
+                conn.write(build_http_response(err.status, err.payload))
+                await conn.drain()
+                break
+            if request is None:
+                break
+
+            method, path, headers, body = request
+            if worker is not None:
+                try:
+                    # 이미 받아 둔 다음 요청(파이프라이닝)은 RecvBuffer에 있으니 같이 넘긴다
+                    sock = conn.transport.get_extra_info("socket")
+                    if hand_off_request(sock.fileno(), method, path, headers, body, conn.buffer.pending()):
+                        break
+                except HttpError as err:
+                    conn.write(build_http_response(err.status, err.payload))
+                    await conn.drain()
+                    break
+            served += 1
+            keep_alive = wants_keep_alive(headers) and served < MAX_KEEPALIVE_REQUESTS
+            started = time.perf_counter()
+            payload = None if rate_limiter is None else admit_request(method, path, headers, body, addr)
+            if payload is not None:
+                status = payload.status
+            else:
+                try:
+                    status, payload = 200, await route_request_async(method, path, body, headers)
+                except HttpError as err:
+                    status, payload = err.status, err.payload
+                except Exception as exc:
+                    print(f"[SERVER] internal error for {addr}: {exc}")
+                    status, payload = 500, {"ok": False, "msg": "SERVER_ERROR"}
+                finally:
+                    if rate_limiter is not None:
+                        rate_limiter.release()
+            record_request(method, path, payload.status if isinstance(payload, RawResponse) else status, started)
+            if isinstance(payload, EventStream):
+                await send_event_stream_async(conn, payload)
+                break
+            conn.write(build_http_response(status, payload, keep_alive, wire.accepts_binary(headers)))
+            await conn.drain()
+            if not keep_alive:
+                break
+    except OSError:
+        pass
+    finally:
+        conn.close()
+        metrics.inc("omok_connections_active", amount=-1)
+
+
+async def serve_async(host, port):
+    loop = asyncio.get_running_loop()
+    # 다른 스레드에서 버전이 올라도 루프 스레드에서 대기자를 깨우도록
+    version_listeners.append(lambda room: loop.call_soon_threadsafe(_wake_async_waiters, room.room_id))
+    server = await loop.create_server(HttpConnection, host, port, reuse_port=worker is not None)
+    if worker is not None:
+        worker.serve(lambda sock, pending: schedule_adopt_async(loop, sock, pending), handle_worker_query)
+    print(f"[SERVER] HTTP listening on {host}:{port} (asyncio{worker_label()})")
+    async with server:
+        await server.serve_forever()
+
+
+def worker_label(): # 시작 로그용
+    return "" if worker is None else f", worker {worker.index + 1}/{worker.count} pid={os.getpid()}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP Omok server")
+    parser.add_argument("--host", default=HOST, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=PORT, help="Port to listen on")
+    parser.add_argument(
+        "--mode",
+        choices=("threaded", "asyncio"),
+        default="threaded",
+        help="threaded: one thread per connection, asyncio: single event loop",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(ENGINES),
+        default="list",
+        help="Board implementation used by rooms (list: OmokGame, bitboard: BitboardOmokGame)",
+    )
+    parser.add_argument("--size", type=int, default=None, help="Default board size for new rooms")
+    parser.add_argument("--win-length", type=int, default=None, help="Stones in a row needed to win (6 for connect-6)")
+    parser.add_argument("--exact", action="store_true", help="Only exactly win-length in a row wins (no overlines)")
+    parser.add_argument("--journal", metavar="DIR", help="Append every game event to binary journal files in DIR")
+    parser.add_argument("--state-dir", metavar="DIR", help="Snapshot + write-ahead log directory; resumes live rooms on restart")
+    parser.add_argument(
+        "--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL, help="Seconds between snapshots (with --state-dir)"
+    )
+    parser.add_argument(
+        "--session-timeout", type=float, default=SESSION_TIMEOUT, help="Seconds without requests before a token is dropped"
+    )
+    parser.add_argument("--bot-workers", type=int, default=BOT_WORKERS, help="Processes used for bot search")
+    parser.add_argument(
+        "--feed",
+        metavar="HOST:PORT",
+        action="append",
+        default=[],
+        help="Send every room change as UDP datagrams to this multicast group or subscriber (repeatable)",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        metavar="ROUTE=RATE[/BURST]",
+        action="append",
+        default=[],
+        help="Per-token token bucket, e.g. /chat=2/5 (requests per second / burst); ROUTE * covers the other routes",
+    )
+    parser.add_argument(
+        "--ip-rate-limit",
+        metavar="ROUTE=RATE[/BURST]",
+        action="append",
+        default=[],
+        help="Per-client-IP token bucket, same format as --rate-limit (counted per worker with --workers)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=0,
+        help="Requests processed at once (long-polls included) before new ones get 503; 0 = no cap",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Server processes sharing the port (Linux); each owns the rooms with id %% workers == its index",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global game_class, default_rules, BOT_WORKERS, rate_limiter
+    args = parse_args(argv)
+    game_class = ENGINES[args.engine]
+    BOT_WORKERS = max(1, args.bot_workers)
+    try:
+        default_rules = parse_rules({
+            key: value for key, value in (
+                ("size", args.size), ("win_length", args.win_length), ("exact", args.exact),
+            ) if value is not None
+        })
+    except HttpError as exc:
+        raise SystemExit(f"invalid rules: {exc.payload}")
+    try:
+        feed_targets = [parse_address(target) for target in args.feed]
+    except ValueError as exc:
+        raise SystemExit(f"invalid --feed: {exc}")
+    try:
+        token_limits = {route: (rate, burst) for route, rate, burst in map(parse_limit, args.rate_limit)}
+        ip_limits = {route: (rate, burst) for route, rate, burst in map(parse_limit, args.ip_rate_limit)}
+    except ValueError as exc:
+        raise SystemExit(f"invalid rate limit: {exc}")
+    if token_limits or ip_limits or args.max_in_flight > 0:
+        rate_limiter = RateLimiter(token_limits, ip_limits, max(0, args.max_in_flight))
+    if args.workers <= 1:
+        run_server(args, feed_targets)
+        return
+    if not cluster.supported():
+        raise SystemExit("--workers needs SO_REUSEPORT, SCM_RIGHTS and fork (Linux)")
+    # 설정 확인은 fork 전에 끝낸다 (잘못된 옵션으로 워커가 죽고 다시 뜨기를 반복하지 않게)
+    directory = tempfile.mkdtemp(prefix="omok-workers-")
+    try:
+        cluster.supervise(
+            args.workers,
+            lambda index: run_server(args, feed_targets, cluster.Cluster(index, args.workers, directory)),
+        )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# 서버 하나를 돌린다, this_worker가 있으면 워커 모드 (fork 된 자식 프로세스 안)
+# 워커마다 자기 방만 가지므로 --state-dir, --journal 은 워커별 하위 폴더를 쓴다
+def run_server(args, feed_targets, this_worker=None):
+    global next_room_id, wal, state_feed, worker, ROOM_ID_STEP
+    worker = this_worker
+    state_dir, journal_dir = args.state_dir, args.journal
+    rooms.clear()
+    if worker is not None:
+        ROOM_ID_STEP = worker.count
+        next_room_id = worker.first_room_id(DEFAULT_ROOM_ID)
+        if state_dir:
+            state_dir = os.path.join(state_dir, f"worker-{worker.index}")
+        if journal_dir:
+            journal_dir = os.path.join(journal_dir, f"worker-{worker.index}")
+    if worker is None or worker.owner(DEFAULT_ROOM_ID) == worker.index: # 기본 방은 그 번호를 가진 워커에만
+        rooms[DEFAULT_ROOM_ID] = Room(DEFAULT_ROOM_ID, "lobby", game_class, default_rules)
+    checkpointer = None
+    if state_dir:
+        os.makedirs(state_dir, exist_ok=True)
+        started = time.perf_counter()
+        restored, segment = load_state(state_dir, rooms, game_class)
+        last_room_id = max(rooms, default=DEFAULT_ROOM_ID)
+        next_room_id = last_room_id + 1 if worker is None else worker.first_room_id(last_room_id)
+        wal = WriteAheadLog(state_dir, segment)
+        wal_listeners.append(wal.on_mutation)
+        checkpointer = Checkpointer(state_dir, rooms, wal, args.checkpoint_interval)
+        checkpointer.checkpoint() # 복구한 상태를 바로 스냅샷으로, 예전 WAL은 정리된다
+        checkpointer.start()
+        print(f"[SERVER] restored {restored} rooms from {state_dir} in {time.perf_counter() - started:.3f}s")
+        if any(room.bots for room in rooms.values()): # 복구된 봇이 자기 차례면 다시 두기 시작
+            get_bot_executor()
+            for room in rooms.values():
+                with room.lock:
+                    schedule_bot_locked(room)
+    sessions.timeout = args.session_timeout
+    for room in rooms.values(): # 복구된 토큰도 지금부터 만료 시간을 잰다
+        for token in room.token_colors:
+            if token not in room.bots:
+                sessions.touch(token)
+    sessions.start()
+    if feed_targets:
+        state_feed = StateFeed(feed_targets, rooms)
+        event_listeners.append(state_feed.on_event)
+        state_feed.start()
+        print(f"[SERVER] UDP feed: {', '.join(args.feed)}")
+    journal = None
+    if journal_dir:
+        journal = JournalWriter(journal_dir)
+        event_listeners.append(journal.on_event)
+        print(f"[SERVER] journal: {journal_dir}")
+    try:
+        if args.mode == "asyncio":
+            asyncio.run(serve_async(args.host, args.port))
+        else:
+            serve_threaded(args.host, args.port)
+    finally:
+        if checkpointer is not None:
+            checkpointer.stop()
+        if state_feed is not None:
+            state_feed.stop()
+        if journal is not None: # 버퍼에 남은 레코드까지 쓰고 종료
+            event_listeners.remove(journal.on_event)
+            journal.close()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,221 @@
+# ai.py
+# 서버에 앉힐 수 있는 오목 봇
+# OmokGame 위에서 alpha-beta (negamax) + 반복 심화 탐색, 돌 근처 칸만 후보로 본다
+# choose_move는 다른 프로세스(ProcessPoolExecutor)에서 돌리기 위한 함수라 인자와 결과가 전부 pickle 가능한 값이다
+import time
+
+from game import BLACK, WHITE, EMPTY, DIRECTIONS, OmokGame, TranspositionTable, EXACT, LOWER, UPPER
+
+# 난이도: (최대 깊이, 한 수에 쓰는 시간(초))
+LEVELS = {
+    "easy": (1, 0.3),
+    "normal": (3, 1.0),
+    "hard": (6, 3.0),
+}
+DEFAULT_LEVEL = "normal"
+MAX_DEPTH = 8
+MAX_TIME = 10.0
+CANDIDATE_RADIUS = 2 # 이미 놓인 돌에서 이 거리 안의 빈 칸만 후보
+MAX_CANDIDATES = 12 # 한 노드에서 펼치는 최대 후보 수 (점수 높은 순)
+WIN_SCORE = 10 ** 18
+
+_window_tables = {} # (size, win_length) -> (창 목록, 칸별 창 번호 목록)
+
+
+def window_table(size, win_length):
+    # 창(window) = 한 줄 위의 연속한 win_length칸, 한 색깔 돌만 있는 창이 위협이 된다
+    # cell_windows[y * size + x] = 그 칸을 포함하는 창 번호들
+    key = (size, win_length)
+    table = _window_tables.get(key)
+    if table is None:
+        windows = []
+        cell_windows = [[] for _ in range(size * size)]
+        for y in range(size):
+            for x in range(size):
+                for dx, dy in DIRECTIONS:
+                    end_x = x + dx * (win_length - 1)
+                    end_y = y + dy * (win_length - 1)
+                    if not (0 <= end_x < size and 0 <= end_y < size):
+                        continue
+                    cells = [(y + dy * k) * size + x + dx * k for k in range(win_length)]
+                    for cell in cells:
+                        cell_windows[cell].append(len(windows))
+                    windows.append(cells)
+        table = (windows, cell_windows)
+        _window_tables[key] = table
+    return table
+
+
+class Searcher:
+    # OmokGame의 place_stone/undo로 수를 두고 빼면서, 창마다 흑/백 돌 개수를 같이 갱신한다
+    # 평가값(흑 기준) = 한 색깔만 있는 창마다 돌 개수에 따른 점수의 합, 돌 하나 둘 때마다 그 칸의 창만 다시 계산
+    def __init__(self, game, tt_bits=16):
+        self.game = game
+        self.size = game.size
+        self.length = game.win_length
+        self.windows, self.cell_windows = window_table(self.size, self.length)
+        self.counts = {BLACK: [0] * len(self.windows), WHITE: [0] * len(self.windows)}
+        self.weights = [0] + [4 ** k for k in range(1, self.length + 1)] # 돌 k개 창의 점수
+        self.score = 0
+        self.tt = TranspositionTable(tt_bits)
+        self.nodes = 0
+        self.deadline = None
+        for x, y, color in game.moves: # 이미 둔 수들로 창 개수 채우기
+            self._add(y * self.size + x, color, 1)
+
+    def _window_score(self, index): # 흑 기준 창 점수
+        black = self.counts[BLACK][index]
+        white = self.counts[WHITE][index]
+        if black and white:
+            return 0
+        return self.weights[black] - self.weights[white]
+
+    def _add(self, cell, color, delta):
+        counts = self.counts[color]
+        for index in self.cell_windows[cell]:
+            self.score -= self._window_score(index)
+            counts[index] += delta
+            self.score += self._window_score(index)
+
+    def play(self, x, y):
+        color = self.game.current_turn
+        ok, msg = self.game.place_stone(x, y)
+        if ok:
+            self._add(y * self.size + x, color, 1)
+        return ok, msg
+
+    def unplay(self):
+        x, y, color = self.game.moves[-1]
+        self.game.undo()
+        self._add(y * self.size + x, color, -1)
+
+    def move_value(self, cell, color):
+        # 그 칸에 두었을 때 내 창이 늘어나는 만큼(공격) + 상대 창을 막는 만큼(수비), 후보 정렬용
+        mine = self.counts[color]
+        theirs = self.counts[WHITE if color == BLACK else BLACK]
+        weights = self.weights
+        value = 0
+        for index in self.cell_windows[cell]:
+            if not theirs[index]:
+                value += weights[mine[index] + 1]
+            if not mine[index]:
+                value += weights[theirs[index] + 1]
+        return value
+
+    def candidates(self):
+        game = self.game
+        size = self.size
+        if not game.moves:
+            return [(size // 2, size // 2)]
+        board = game.board
+        seen = set()
+        for x, y, _color in game.moves:
+            for ny in range(max(0, y - CANDIDATE_RADIUS), min(size, y + CANDIDATE_RADIUS + 1)):
+                for nx in range(max(0, x - CANDIDATE_RADIUS), min(size, x + CANDIDATE_RADIUS + 1)):
+                    if board[ny][nx] == EMPTY:
+                        seen.add(ny * size + nx)
+        color = game.current_turn
+        ranked = sorted(seen, key=lambda cell: self.move_value(cell, color), reverse=True)
+        return [(cell % size, cell // size) for cell in ranked[:MAX_CANDIDATES]]
+
+    def evaluate(self): # 지금 둘 차례인 쪽 기준 점수 (negamax)
+        return self.score if self.game.current_turn == BLACK else -self.score
+
+    def negamax(self, depth, alpha, beta):
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.perf_counter() > self.deadline:
+            raise TimeoutError
+        if depth == 0:
+            return self.evaluate(), None
+
+        key = self.game.hash
+        entry = self.tt.lookup(key)
+        tt_move = None
+        if entry is not None:
+            entry_depth, value, flag, tt_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value, tt_move
+                if flag == LOWER and value >= beta:
+                    return value, tt_move
+                if flag == UPPER and value <= alpha:
+                    return value, tt_move
+
+        moves = self.candidates()
+        if tt_move in moves: # 이전 깊이에서 가장 좋았던 수부터
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+        if not moves: # 둘 곳이 없음 = 무승부
+            return 0, None
+
+        original_alpha = alpha
+        best_value = -WIN_SCORE - 1
+        best_move = moves[0]
+        for x, y in moves:
+            _ok, msg = self.play(x, y)
+            if msg == "WIN":
+                value = WIN_SCORE + depth # 빨리 이기는 수를 더 좋게
+            elif msg == "DRAW":
+                value = 0
+            else:
+                try:
+                    value = -self.negamax(depth - 1, -beta, -alpha)[0]
+                except TimeoutError:
+                    self.unplay()
+                    raise
+            self.unplay()
+            if value > best_value:
+                best_value = value
+                best_move = (x, y)
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(key, depth, best_value, flag, best_move)
+        return best_value, best_move
+
+    def search(self, max_depth, time_limit): # 반복 심화: 시간이 다 되면 마지막으로 끝낸 깊이의 결과
+        self.deadline = time.perf_counter() + time_limit
+        self.tt.new_search()
+        best_move = self.candidates()[0]
+        reached = 0
+        for depth in range(1, max_depth + 1):
+            try:
+                value, move = self.negamax(depth, -WIN_SCORE * 2, WIN_SCORE * 2)
+            except TimeoutError:
+                break
+            if move is not None:
+                best_move = move
+            reached = depth
+            if abs(value) >= WIN_SCORE: # 이기거나 지는 수순을 찾았으면 더 볼 필요 없음
+                break
+        return best_move, reached
+
+
+def choose_move(rules, moves, depth, time_limit):
+    """Pick a move for the side to play after ``moves``; returns ((x, y), depth reached, nodes)."""
+    game = OmokGame(**rules)
+    for x, y, _color in moves:
+        game.place_stone(x, y)
+    searcher = Searcher(game)
+    move, reached = searcher.search(depth, time_limit)
+    return move, reached, searcher.nodes
+
+
+def level_settings(level=None, depth=None, time_limit=None): # 난이도 이름/직접 지정 -> (깊이, 시간)
+    if level is not None and level not in LEVELS:
+        raise ValueError("INVALID_LEVEL")
+    base_depth, base_time = LEVELS[level or DEFAULT_LEVEL]
+    depth = base_depth if depth is None else depth
+    time_limit = base_time if time_limit is None else time_limit
+    if not 1 <= depth <= MAX_DEPTH:
+        raise ValueError("INVALID_DEPTH")
+    if not 0 < time_limit <= MAX_TIME:
+        raise ValueError("INVALID_TIME")
+    return depth, time_limit
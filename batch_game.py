@@ -0,0 +1,223 @@
+# batch_game.py
+# 여러 판의 오목을 NumPy 배열 하나로 동시에 진행하는 배치 엔진 (봇 대회, 규칙 테스트용)
+# 한 번의 place_stones 호출로 모든 판에 한 수씩 두고, 승리/무승부/잘못된 수를 한꺼번에 판정한다
+# 규칙과 결과 메시지는 game.OmokGame과 같다
+import argparse
+import random
+import time
+
+import numpy as np
+
+from game import BOARD_SIZE, WIN_LENGTH, EMPTY, BLACK, WHITE, ENGINES, OmokGame
+
+# place_stones 결과 코드 -> OmokGame.place_stone 메시지
+OK = 0
+WIN = 1
+DRAW = 2
+OUT_OF_BOUNDS = 3
+ALREADY_OCCUPIED = 4
+GAME_ALREADY_OVER = 5
+RESULT_NAMES = ("OK", "WIN", "DRAW", "OUT_OF_BOUNDS", "ALREADY_OCCUPIED", "GAME_ALREADY_OVER")
+
+ONGOING = -1 # winner 배열에서 아직 끝나지 않은 판 (OmokGame의 None)
+
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1)) # 가로, 세로, 대각선 ↘, 대각선 ↗
+
+
+class BatchOmokGame:
+    def __init__(self, count, size=BOARD_SIZE, win_length=WIN_LENGTH):
+        self.count = count
+        self.size = size
+        self.win_length = win_length
+        self.pad = win_length - 1 # 보드 둘레에 빈 칸을 둘러서 경계 검사 없이 창을 읽는다
+        side = size + 2 * self.pad
+        self._side = side
+        self._padded = np.zeros((count, side, side), dtype=np.int8)
+        self._flat = self._padded.reshape(-1) # 같은 메모리를 1차원으로 본 것, 한 번의 gather로 읽기 위해
+        self.turn = np.full(count, BLACK, dtype=np.int8)
+        self.winner = np.full(count, ONGOING, dtype=np.int8)
+        self.move_count = np.zeros(count, dtype=np.int32)
+        # 방금 둔 칸 기준으로 네 방향 앞뒤 win_length-1칸까지의 1차원 오프셋, 모양 (4, 2*win_length-1)
+        steps = np.arange(-self.pad, self.pad + 1)
+        self._line_offsets = np.stack([steps * (dy * side + dx) for dx, dy in DIRECTIONS])
+
+    @property
+    def boards(self): # (count, size, size) 보기 전용 뷰, [판, y, x]
+        p = self.pad
+        return self._padded[:, p:p + self.size, p:p + self.size]
+
+    def reset(self, mask=None): # mask가 True인 판만 (없으면 전부) 새 판으로
+        if mask is None:
+            mask = np.ones(self.count, dtype=bool)
+        self._padded[mask] = EMPTY
+        self.turn[mask] = BLACK
+        self.winner[mask] = ONGOING
+        self.move_count[mask] = 0
+
+    def place_stones(self, xs, ys):
+        """Play one move on every board at once and return an int8 array of result codes."""
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        size = self.size
+        result = np.full(self.count, OK, dtype=np.int8)
+        boards = np.arange(self.count)
+
+        # OmokGame.place_stone과 같은 순서로 검사: 범위 -> 이미 돌 -> 이미 끝난 판
+        inside = (xs >= 0) & (xs < size) & (ys >= 0) & (ys < size)
+        result[~inside] = OUT_OF_BOUNDS
+        safe_x = np.where(inside, xs, 0) + self.pad
+        safe_y = np.where(inside, ys, 0) + self.pad
+        occupied = inside & (self._padded[boards, safe_y, safe_x] != EMPTY)
+        result[occupied] = ALREADY_OCCUPIED
+        finished = inside & ~occupied & (self.winner != ONGOING)
+        result[finished] = GAME_ALREADY_OVER
+
+        play = np.nonzero(inside & ~occupied & ~finished)[0]
+        if play.size == 0:
+            return result
+        px = safe_x[play]
+        py = safe_y[play]
+        colors = self.turn[play]
+        self._padded[play, py, px] = colors
+        self.move_count[play] += 1
+
+        won = self._wins_through(play, px, py, colors)
+        drawn = ~won & (self.move_count[play] == size * size)
+        self.winner[play[won]] = colors[won]
+        self.winner[play[drawn]] = 0
+        result[play[won]] = WIN
+        result[play[drawn]] = DRAW
+        moving_on = play[~won & ~drawn]
+        self.turn[moving_on] = np.where(self.turn[moving_on] == BLACK, WHITE, BLACK)
+        return result
+
+    def _wins_through(self, play, px, py, colors):
+        # 방금 둔 칸을 지나는 네 방향 선분(길이 2*win_length-1)을 한 번의 gather로 모두 꺼내서
+        # 길이 win_length 창의 합(누적합 차이)이 win_length인 창이 있으면 승리
+        length = self.win_length
+        centers = (play * self._side + py) * self._side + px
+        lines = self._flat[centers[:, None, None] + self._line_offsets] # (판, 방향, 칸)
+        mine = lines == colors[:, None, None]
+        running = np.zeros(mine.shape[:2] + (mine.shape[2] + 1,), dtype=np.int16)
+        np.cumsum(mine, axis=2, out=running[:, :, 1:])
+        windows = running[:, :, length:] - running[:, :, :-length]
+        return (windows == length).any(axis=(1, 2))
+
+    def find_lines(self, color):
+        """Full-board scan: bool array, True where a board holds win_length in a row of color."""
+        # 검증/통계용, 보드 전체를 네 방향으로 밀어 더해서(슬라이딩 윈도우 합) 찾는다
+        mine = (self.boards == color).astype(np.int8)
+        length = self.win_length
+        span = self.size - length + 1
+        found = np.zeros(self.count, dtype=bool)
+        horizontal = sum(mine[:, :, k:k + span] for k in range(length))
+        vertical = sum(mine[:, k:k + span, :] for k in range(length))
+        diagonal = sum(mine[:, k:k + span, k:k + span] for k in range(length))
+        anti = sum(mine[:, k:k + span, length - 1 - k:length - 1 - k + span] for k in range(length))
+        for sums in (horizontal, vertical, diagonal, anti):
+            found |= (sums == length).reshape(self.count, -1).any(axis=1)
+        return found
+
+    def random_moves(self, rng): # 판마다 아무 빈 칸이나 하나 (벤치마크/검증용)
+        scores = rng.random((self.count, self.size * self.size))
+        scores[self.boards.reshape(self.count, -1) != EMPTY] = -1.0
+        cells = scores.argmax(axis=1)
+        return cells % self.size, cells // self.size
+
+
+def cross_check(count=200, seed=0, game_class=OmokGame):
+    """Play random games in the batch engine and in game_class (an ENGINES board) side by side and compare every step."""
+    rng = np.random.default_rng(seed)
+    batch = BatchOmokGame(count)
+    games = [game_class() for _ in range(count)]
+    junk = random.Random(seed) # 가끔 잘못된 수도 섞어서 오류 처리도 같이 비교
+    while (batch.winner == ONGOING).any():
+        xs, ys = batch.random_moves(rng)
+        for i in range(count):
+            roll = junk.random()
+            if roll < 0.02:
+                xs[i] = -1
+            elif roll < 0.04 and games[i].moves:
+                xs[i], ys[i] = games[i].moves[0][:2]
+        codes = batch.place_stones(xs, ys)
+        for i, game in enumerate(games):
+            _ok, msg = game.place_stone(int(xs[i]), int(ys[i]))
+            if RESULT_NAMES[codes[i]] != msg:
+                raise AssertionError(f"board {i}: batch={RESULT_NAMES[codes[i]]} omok={msg}")
+            expected_winner = ONGOING if game.winner is None else game.winner
+            if batch.winner[i] != expected_winner or batch.turn[i] != game.current_turn:
+                raise AssertionError(f"board {i}: state mismatch after move {game.move_count}")
+    for i, game in enumerate(games):
+        if batch.boards[i].tolist() != game.board:
+            raise AssertionError(f"board {i}: final boards differ")
+    for color in (BLACK, WHITE):
+        expected = np.array([game.winner == color for game in games])
+        if ((batch.find_lines(color) & expected) != expected).any():
+            raise AssertionError("full-board scan missed a winning line")
+    return count
+
+
+def shuffled_cells(rng, count, size): # 판마다 모든 칸을 랜덤 순서로 (그 순서대로 두면 항상 빈 칸)
+    return rng.permuted(np.tile(np.arange(size * size), (count, 1)), axis=1)
+
+
+def benchmark(count, plies, seed=0): # 랜덤 대국 처리 속도 (games/sec)
+    # 끝난 판은 바로 새 판으로 바꿔서 배치가 항상 꽉 찬 상태로 plies번 진행한다
+    rng = np.random.default_rng(seed)
+    batch = BatchOmokGame(count)
+    boards = np.arange(count)
+    orders = shuffled_cells(rng, count, batch.size)
+    finished = 0
+    start = time.perf_counter()
+    for _ in range(plies):
+        cells = orders[boards, batch.move_count]
+        codes = batch.place_stones(cells % batch.size, cells // batch.size)
+        done = (codes == WIN) | (codes == DRAW)
+        if done.any():
+            finished += int(done.sum())
+            batch.reset(done)
+            orders[done] = shuffled_cells(rng, int(done.sum()), batch.size)
+    elapsed = time.perf_counter() - start
+    return finished, elapsed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Vectorized Omok batch engine benchmark")
+    parser.add_argument("--games", type=int, default=4096, help="Boards advanced in lockstep")
+    parser.add_argument("--plies", type=int, default=500, help="Batched moves to play")
+    parser.add_argument("--check", type=int, default=200, help="Boards to cross-check against each engine (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.check:
+        for name, game_class in sorted(ENGINES.items()):
+            checked = cross_check(args.check, args.seed, game_class)
+            print(f"cross-check: {checked} random games match {name} ({game_class.__name__})")
+
+    finished, elapsed = benchmark(args.games, args.plies, args.seed)
+    print(
+        f"batch: {finished} games finished in {args.plies} batched plies ({elapsed:.2f}s) "
+        f"-> {finished / elapsed:.0f} games/sec"
+    )
+
+    # 같은 랜덤 대국을 OmokGame 하나씩으로 돌린 기준값
+    rng = random.Random(args.seed)
+    sample = max(1, min(args.games, 500))
+    start = time.perf_counter()
+    for _ in range(sample):
+        game = OmokGame()
+        cells = [(x, y) for y in range(BOARD_SIZE) for x in range(BOARD_SIZE)]
+        rng.shuffle(cells)
+        for x, y in cells:
+            game.place_stone(x, y)
+            if game.winner is not None:
+                break
+    elapsed = time.perf_counter() - start
+    print(f"OmokGame: {sample} games in {elapsed:.2f}s -> {sample / elapsed:.0f} games/sec")
+
+
+if __name__ == "__main__":
+    main()
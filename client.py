@@ -2,20 +2,31 @@
 # HTTP 기반 pygame 오목 클라이언트
 #여기는 ui 코드
 import argparse
+import queue
 import socket
 import sys
+import threading
+import time
+from collections import OrderedDict
 
 import pygame
 
+from feed import iter_feed, open_feed_socket, parse_address
 from game import BOARD_SIZE, EMPTY, BLACK, WHITE
 from protocol import (
     set_server,
+    set_wire_format,
     join_server,
+    add_bot,
+    iter_events,
     request_state,
     submit_move,
     quit_game,
     send_chat,
     restart_game,
+    close_connections,
+    apply_state_delta,
+    merge_chat,
 )
 
 
@@ -27,6 +38,28 @@ TOP_OFFSET = 70  # space for header/status above the board
 BOARD_AREA = (BOARD_SIZE - 1) * CELL_SIZE + MARGIN * 2
 WIDTH = BOARD_AREA + CHAT_WIDTH
 HEIGHT = BOARD_AREA + TOP_OFFSET
+MAX_BOARD_PIXELS = 560 # 보드가 커져도 창이 화면을 넘지 않도록 칸 크기를 줄인다
+TEXT_CACHE_SIZE = 256 # 렌더링해 둔 글자 surface 개수
+
+
+def configure_layout(size): # 방 규칙의 보드 크기에 맞춰 화면 배치 다시 계산 (set_mode 전에 호출)
+    global BOARD_SIZE, CELL_SIZE, BOARD_AREA, WIDTH, HEIGHT
+    BOARD_SIZE = size
+    CELL_SIZE = max(20, min(40, MAX_BOARD_PIXELS // (size - 1)))
+    BOARD_AREA = (BOARD_SIZE - 1) * CELL_SIZE + MARGIN * 2
+    WIDTH = BOARD_AREA + CHAT_WIDTH
+    HEIGHT = BOARD_AREA + TOP_OFFSET
+    configure_regions()
+
+
+def configure_regions(): # 따로 다시 그리는 화면 영역 (헤더, 보드 + 그림자, 채팅)
+    global HEADER_REGION, BOARD_REGION, CHAT_REGION
+    HEADER_REGION = pygame.Rect(0, 0, BOARD_AREA + 8, TOP_OFFSET)
+    BOARD_REGION = pygame.Rect(0, TOP_OFFSET, BOARD_AREA + 8, BOARD_AREA)
+    CHAT_REGION = pygame.Rect(BOARD_AREA + 8, 0, WIDTH - BOARD_AREA - 8, HEIGHT)
+
+
+configure_regions()
 
 BOARD_COLOR = (210, 180, 140)
 BOARD_SHADOW = (165, 135, 100)
@@ -49,6 +82,227 @@ CHAT_TEXT = (35, 30, 25)
 CHAT_INPUT_BG = (255, 255, 255)
 CHAT_INPUT_BORDER = (140, 130, 120)
 
+EXPOSE_EVENTS = tuple(getattr(pygame, name) for name in ("VIDEOEXPOSE", "WINDOWEXPOSED") if hasattr(pygame, name))
+
+RETRY_DELAY = 1 # 이벤트 스트림이 끊긴 뒤 다시 연결하기 전 대기 시간(초)
+PING_INTERVAL = 5 # 보낼 명령이 없을 때 서버 응답 시간을 재는 주기(초)
+SLOW_REQUEST = 1.0 # 응답을 이보다 오래 기다리면 헤더에 기다린 시간을 표시(초)
+NET_OK = (60, 160, 80)
+NET_SLOW = (210, 150, 40)
+NET_DOWN = (200, 60, 50)
+LOCAL_CHAT_LIMIT = 100 # 클라이언트가 들고 있는 채팅 개수
+
+
+# 서버가 보내는 이벤트 하나를 로컬 state에 반영한다
+def apply_event(state, event):
+    kind = event["event"]
+    data = event["data"]
+    if kind == "snapshot": # 전체 상태
+        state = data["state"]
+    elif kind == "keyframe": # UDP 피드의 전체 상태, 채팅은 들어있지 않아서 가진 채팅을 그대로 둔다
+        chat = state.get("chat", []) if state else []
+        chat_count = state.get("chat_count", 0) if state else 0
+        state = dict(data["state"], chat=chat, chat_count=chat_count)
+    elif state is None: # 전체 상태를 받기 전에는 반영할 곳이 없음
+        return None
+    elif kind == "move":
+        state["board"][data["y"]][data["x"]] = data["color"]
+        state["turn"] = data["turn"]
+        state["winner"] = data["winner"]
+        state["move_count"] = data["move_count"]
+    elif kind == "win":
+        state["winner"] = data["winner"]
+    elif kind == "chat":
+        state["chat"] = merge_chat(state.get("chat", []), [data], LOCAL_CHAT_LIMIT)
+        state["chat_count"] = max(state.get("chat_count", 0), data["id"])
+    elif kind in ("join", "quit"):
+        state["players"] = data["players"]
+        if "restart" in data:
+            state["restart"] = data["restart"]
+    elif kind == "restart":
+        state["restart"] = data["restart"]
+        if "game" in data: # 재시작 성공 시 새 보드
+            state.update(data["game"])
+    state["version"] = event["id"]
+    return state
+
+
+# 백그라운드 스레드에서 /events 스트림을 받아 로컬 state를 갱신한다
+# 렌더 루프는 매 프레임 take()로 새 상태가 있는지만 확인하므로 네트워크 때문에 멈추지 않는다
+class EventListener(threading.Thread):
+    def __init__(self, state=None, room=None, token=None):
+        super().__init__(daemon=True)
+        self.room = room
+        self.token = token
+        self._lock = threading.Lock()
+        self._latest = None
+        self._state = copy_state(state) if state else None
+        self._last_id = state.get("version") if state else None
+        self.running = True
+
+    def run(self):
+        while self.running:
+            try:
+                for event in iter_events(self._last_id, self.room, self.token): # 끊기면 마지막 id부터 이어 받기
+                    if not self.running:
+                        return
+                    self._apply(event)
+            except (OSError, RuntimeError, ValueError) as exc:
+                print("Event stream error:", exc)
+            time.sleep(RETRY_DELAY)
+
+    def _apply(self, event):
+        state = apply_event(self._state, event)
+        self._last_id = event["id"]
+        if state is None:
+            return
+        self._state = state
+        with self._lock:
+            self._latest = copy_state(state) # 렌더 루프와 리스트를 공유하지 않도록 복사
+
+    def take(self): # 아직 가져가지 않은 새 상태가 있으면 돌려준다
+        with self._lock:
+            state, self._latest = self._latest, None
+        return state
+
+
+# 관전자용: /events 대신 UDP 피드(feed.py)를 받는다, 놓친 부분은 TCP /state로 채운다
+class FeedListener(EventListener):
+    def __init__(self, address, state=None, room=None, token=None):
+        super().__init__(state, room, token)
+        self.address = address # (host, port), 멀티캐스트 그룹이면 가입
+
+    def run(self):
+        while self.running:
+            try:
+                sock = open_feed_socket(*self.address)
+                try:
+                    for event in iter_feed(sock, self.room, self._fetch_state):
+                        if not self.running:
+                            return
+                        self._apply(event)
+                finally:
+                    sock.close()
+            except OSError as exc:
+                print("Feed error:", exc)
+            time.sleep(RETRY_DELAY)
+
+    def _fetch_state(self): # 데이터그램을 놓쳤을 때 TCP로 전체 상태
+        resp = request_state(room=self.room)
+        return resp.get("state") if resp.get("ok") else None
+
+
+def copy_state(state):
+    return dict(state, board=[row[:] for row in state["board"]], chat=list(state.get("chat", [])))
+
+
+def is_newer_state(new_state, old_state): # 늦게 도착한 예전 응답이 최신 상태를 덮지 않도록
+    if old_state is None:
+        return True
+    return new_state.get("version", 0) >= old_state.get("version", 0)
+
+
+# 서버로 보내는 요청(수, 채팅, 재시작)을 렌더 루프 대신 처리하는 스레드
+# 렌더 루프는 send()로 명령을 큐에 넣기만 하고, 결과는 매 프레임 take()로 가져간다 (기다리지 않음)
+# 응답이 늦게 와도 창이 멈추지 않고, 밀린 같은 종류의 명령(수, 재시작)은 마지막 것만 보낸다
+class NetworkWorker(threading.Thread):
+    def __init__(self, token, room=None):
+        super().__init__(daemon=True)
+        self.token = token
+        self.room = room
+        self.commands = queue.Queue()
+        self._lock = threading.Lock()
+        self._latest = None # 아직 가져가지 않은 가장 새 state (버전이 더 낮은 응답은 버린다)
+        self._chat = [] # 내가 보낸 채팅의 응답으로 받은 새 채팅, 이벤트보다 먼저 화면에 보이도록
+        self.rtt = None # 최근 응답 시간(초), 지수 이동 평균
+        self.error = None # 마지막 요청이 네트워크 오류였으면 그 메시지
+        self.sent_at = None # 응답을 기다리는 중인 요청을 보낸 시각
+        self.running = True
+
+    def send(self, kind, *args, have=None): # 렌더 루프에서 호출, 바로 돌아온다
+        self.commands.put((kind, args, have))
+
+    def stop(self):
+        self.running = False
+        self.commands.put(None)
+
+    def run(self):
+        while self.running:
+            try:
+                command = self.commands.get(timeout=PING_INTERVAL)
+            except queue.Empty: # 할 일이 없으면 연결 상태 확인 겸 상태 요청 (보통 304, 세션도 유지된다)
+                self._request(request_state, room=self.room, token=self.token)
+                continue
+            if command is None:
+                return
+            command = self._coalesce(command)
+            kind, args, have = command
+            if kind == "move":
+                resp = self._request(submit_move, self.token, *args, have=have)
+                if resp.get("status") is not None and not resp.get("ok"):
+                    print("Move rejected:", resp.get("msg"))
+            elif kind == "restart":
+                self._request(restart_game, self.token, have=have)
+            elif kind == "chat":
+                resp = self._request(send_chat, self.token, *args, have=have) # 내 채팅까지 새 채팅만 돌아온다
+                if not resp.get("ok"):
+                    print("Chat send failed:", resp.get("msg"))
+                elif resp.get("chat_delta"):
+                    with self._lock:
+                        self._chat.extend(resp["chat"])
+
+    def _coalesce(self, command): # 큐에 밀려 있는 같은 종류의 수/재시작 명령은 마지막 것만 남긴다
+        if command[0] == "chat":
+            return command
+        rest = []
+        while True:
+            try:
+                queued = self.commands.get_nowait()
+            except queue.Empty:
+                break
+            if queued is not None and queued[0] == command[0]:
+                command = queued
+            else:
+                rest.append(queued)
+        for queued in rest:
+            self.commands.put(queued)
+        return command
+
+    def _request(self, func, *args, **kwargs): # 응답 시간 재기 + 받은 state를 다음 프레임에 넘기기
+        have = kwargs.get("have")
+        self.sent_at = time.monotonic()
+        resp = func(*args, **kwargs)
+        elapsed = time.monotonic() - self.sent_at
+        self.sent_at = None
+        if resp.get("status") is None:
+            self.error = resp.get("msg")
+            return resp
+        self.error = None
+        self.rtt = elapsed if self.rtt is None else self.rtt * 0.7 + elapsed * 0.3
+        if resp.get("state"):
+            merged = apply_state_delta(have, resp["state"], LOCAL_CHAT_LIMIT)
+            if merged is not None:
+                with self._lock:
+                    if self._latest is None or is_newer_state(merged, self._latest):
+                        self._latest = merged
+        return resp
+
+    def take(self): # (새 state 또는 None, 새 채팅 목록)
+        with self._lock:
+            state, self._latest = self._latest, None
+            chat, self._chat = self._chat, []
+        return state, chat
+
+    def status(self): # 헤더에 보여줄 (글자, 색)
+        if self.sent_at is not None and time.monotonic() - self.sent_at > SLOW_REQUEST:
+            return f"waiting {time.monotonic() - self.sent_at:.0f}s", NET_SLOW
+        if self.error is not None:
+            return "offline", NET_DOWN
+        if self.rtt is None:
+            return "connecting", NET_SLOW
+        ms = round(self.rtt * 1000)
+        return f"{ms} ms", NET_OK if ms < 150 else NET_SLOW
+
 # 마우스로 좌표 클릭 -> 오목 좌표
 def coord_from_mouse(pos):
     mx, my = pos
@@ -57,163 +311,249 @@ def coord_from_mouse(pos):
     return x, y
 
 
-def draw_board(screen, state: dict, my_color_name: str, can_restart: bool, fonts): #오목판 그리기
-    board = state["board"]
-    players = state.get("players", {})
-    waiting = not players.get("ready", True)
-    chat_messages = state.get("chat", [])
+# 렌더링 캐시
+# - 배경 + 보드 + 격자선은 처음 한 번만 board_surface에 그려 두고 복사(blit)만 한다
+# - 돌은 색깔별로 미리 그린 스프라이트를 붙인다
+# - 글자는 (폰트, 내용, 색)으로 렌더링한 surface를 LRU로 보관한다
+# - 화면을 헤더/보드/채팅 영역으로 나누고, 바뀐 영역(보드는 바뀐 칸만)만 다시 그려서
+#   pygame.display.update(rects)로 그 부분만 화면에 반영한다 (아무것도 안 바뀌면 그리지 않는다)
+class TextCache:
+    def __init__(self, fonts, limit=TEXT_CACHE_SIZE):
+        self.fonts = fonts
+        self.limit = limit
+        self.surfaces = OrderedDict() # (폰트 이름, 글자, 색) -> surface, 최근에 쓴 것이 뒤로
+
+    def render(self, font_name, text, color):
+        key = (font_name, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.fonts[font_name].render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.limit: # 가장 오래 안 쓴 것부터 버린다
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+def make_stone_sprite(color): # 돌 하나 (투명 배경)
+    radius = CELL_SIZE // 2 - 4
+    sprite = pygame.Surface((radius * 2 + 2, radius * 2 + 2), pygame.SRCALPHA)
+    pygame.draw.circle(sprite, color, (radius + 1, radius + 1), radius)
+    return sprite.convert_alpha()
+
+
+def make_board_surface(): # 보드 영역의 변하지 않는 부분 (배경, 그림자, 판, 격자선)
+    surface = pygame.Surface(BOARD_REGION.size)
+    surface.fill(BACKGROUND)
+    board_rect = pygame.Rect(0, 0, BOARD_AREA, BOARD_AREA)
+    pygame.draw.rect(surface, BOARD_SHADOW, board_rect.move(6, 6), border_radius=10)
+    pygame.draw.rect(surface, BOARD_COLOR, board_rect, border_radius=10)
+    end = MARGIN + (BOARD_SIZE - 1) * CELL_SIZE
+    for i in range(BOARD_SIZE): # 선
+        pos = MARGIN + i * CELL_SIZE
+        pygame.draw.line(surface, LINE_COLOR, (pos, MARGIN), (pos, end), 1)
+        pygame.draw.line(surface, LINE_COLOR, (MARGIN, pos), (end, pos), 1)
+    return surface.convert()
+
+
+def status_text(state): # 헤더 두 번째 줄 (승패/대기/차례)
     winner = state["winner"]
+    if winner == BLACK:
+        return "Black wins!"
+    if winner == WHITE:
+        return "White wins!"
+    if winner == 0:
+        return "Draw!"
+    if not state.get("players", {}).get("ready", True):
+        return "Waiting for opponent..."
+    turn = "Black" if state["turn"] == BLACK else "White"
+    return f"Turn: {turn}"
+
+
+def restart_subtitle(state, my_color_name): # 게임이 끝났을 때 보드 가운데 안내 문구
     restart_info = state.get("restart", {})
+    my_key = my_color_name.lower()
+    other_key = "white" if my_key == "black" else "black"
+    my_req = restart_info.get(my_key, False)
+    opp_req = restart_info.get(other_key, False)
+    if my_req and not opp_req:
+        return "Restart requested. Waiting for opponent..."
+    if opp_req and not my_req:
+        return "Opponent wants a rematch. Press R to accept."
+    return "Press R or click Restart to play again."
+
+
+class Renderer:
+    # 영역마다 마지막으로 그린 내용(signature)을 기억했다가 달라진 영역만 다시 그린다
+    def __init__(self, screen, fonts):
+        self.screen = screen
+        self.text = TextCache(fonts)
+        self.board_surface = make_board_surface()
+        self.stones = {BLACK: make_stone_sprite(BLACK_COLOR), WHITE: make_stone_sprite(WHITE_COLOR)}
+        self.restart_rect = pygame.Rect(BOARD_AREA - 152, 12, 126, 24)
+        self.invalidate()
+
+    def invalidate(self): # 창이 가려졌다 다시 보이는 등, 다음 프레임에 전부 다시 그리기
+        self.header_drawn = None
+        self.overlay_drawn = None
+        self.cells = None # 마지막으로 그린 보드, [y][x]
+        self.chat_drawn = None
+        self.cleared = False
+
+    # 한 프레임, 재시작 버튼 위치를 돌려준다 (net_status: 헤더의 연결/응답 시간 표시 (글자, 색))
+    def draw(self, state, my_color_name, can_restart, chat_input, net_status=None):
+        dirty = []
+        if state is None:
+            if not self.cleared:
+                self.screen.fill(BACKGROUND)
+                dirty.append(self.screen.get_rect())
+                self.cleared = True
+                self.header_drawn = self.overlay_drawn = self.cells = None
+        else:
+            self.cleared = False
+            self.draw_header(state, my_color_name, can_restart, net_status, dirty)
+            self.draw_board(state, my_color_name, dirty)
+        self.draw_chat(state.get("chat", []) if state else [], chat_input, dirty)
+        if dirty:
+            pygame.display.update(dirty)
+        return self.restart_rect if state is not None else None
+
+    def draw_header(self, state, my_color_name, can_restart, net_status, dirty): # info + status bar
+        txt2 = status_text(state)
+        signature = (my_color_name, can_restart, txt2, net_status)
+        if signature == self.header_drawn:
+            return
+        self.header_drawn = signature
+        screen = self.screen
+        screen.fill(BACKGROUND, HEADER_REGION)
+        header_rect = pygame.Rect(12, 8, BOARD_AREA - 24, 32)
+        pygame.draw.rect(screen, INFO_BAR, header_rect, border_radius=8)
+        screen.blit(self.text.render("label", f"You are {my_color_name}", TEXT_MAIN), (header_rect.x + 12, header_rect.y + 6))
 
-    screen.fill(BACKGROUND)
-
-    board_rect = pygame.Rect(0, TOP_OFFSET, BOARD_AREA, BOARD_AREA)
-    pygame.draw.rect(screen, BOARD_SHADOW, board_rect.move(6, 6), border_radius=10)
-    pygame.draw.rect(screen, BOARD_COLOR, board_rect, border_radius=10)
-
-    board_origin_y = TOP_OFFSET + MARGIN
-
-    # 선
-    for i in range(BOARD_SIZE):
-        pygame.draw.line(
-            screen,
-            LINE_COLOR,
-            (MARGIN + i * CELL_SIZE, board_origin_y),
-            (MARGIN + i * CELL_SIZE, board_origin_y + (BOARD_SIZE - 1) * CELL_SIZE),
-            1,
+        btn_color = RESTART_ACTIVE if can_restart else RESTART_DISABLED
+        pygame.draw.rect(screen, btn_color, self.restart_rect, border_radius=6)
+        surface_btn = self.text.render("small", "Restart (R)" if can_restart else "Restart", (245, 245, 245))
+        screen.blit(surface_btn, surface_btn.get_rect(center=self.restart_rect.center))
+
+        if net_status is not None: # 재시작 버튼 왼쪽에 ● 응답 시간
+            net_text, net_color = net_status
+            net_surface = self.text.render("tiny", net_text, TEXT_DIM)
+            net_rect = net_surface.get_rect(midright=(self.restart_rect.left - 10, self.restart_rect.centery))
+            screen.blit(net_surface, net_rect)
+            pygame.draw.circle(screen, net_color, (net_rect.left - 8, net_rect.centery), 4)
+
+        screen.blit(self.text.render("label", txt2, TEXT_MAIN), (header_rect.x + 10, header_rect.bottom + 6))
+        dirty.append(HEADER_REGION)
+
+    def draw_board(self, state, my_color_name, dirty): #오목판 그리기
+        board = state["board"]
+        overlay = None
+        if state["winner"] is not None: # 승리 시 가운데에 나타내기
+            overlay = (status_text(state), restart_subtitle(state, my_color_name))
+
+        full = (
+            self.cells is None
+            or overlay != self.overlay_drawn
+            or len(self.cells) != len(board)
+            or (overlay is not None and board != self.cells) # 끝난 판 위의 돌은 오버레이 아래라 칸만 고칠 수 없다
         )
-        pygame.draw.line(
-            screen,
-            LINE_COLOR,
-            (MARGIN, board_origin_y + i * CELL_SIZE),
-            (MARGIN + (BOARD_SIZE - 1) * CELL_SIZE, board_origin_y + i * CELL_SIZE),
-            1,
+        if full:
+            self.screen.blit(self.board_surface, BOARD_REGION)
+            for y, row in enumerate(board):
+                for x, stone in enumerate(row):
+                    if stone != EMPTY:
+                        self.blit_stone(x, y, stone)
+            if overlay is not None:
+                self.draw_overlay(*overlay)
+            dirty.append(BOARD_REGION)
+        elif overlay is None: # 바뀐 칸만 (보통 방금 둔 돌 하나)
+            for y, (row, old_row) in enumerate(zip(board, self.cells)):
+                if row == old_row:
+                    continue
+                for x, (stone, old) in enumerate(zip(row, old_row)):
+                    if stone != old:
+                        dirty.append(self.redraw_cell(x, y, stone))
+        self.overlay_drawn = overlay
+        self.cells = [row[:] for row in board]
+
+    def cell_rect(self, x, y): # 화면 좌표에서 칸 하나를 덮는 사각형
+        return pygame.Rect(
+            MARGIN + x * CELL_SIZE - CELL_SIZE // 2,
+            TOP_OFFSET + MARGIN + y * CELL_SIZE - CELL_SIZE // 2,
+            CELL_SIZE,
+            CELL_SIZE,
         )
 
-    # 돌
-    for y in range(BOARD_SIZE):
-        for x in range(BOARD_SIZE):
-            stone = board[y][x]
-            if stone == EMPTY:
-                continue
-            color = BLACK_COLOR if stone == BLACK else WHITE_COLOR
-            pygame.draw.circle(
-                screen,
-                color,
-                (MARGIN + x * CELL_SIZE, board_origin_y + y * CELL_SIZE),
-                CELL_SIZE // 2 - 4,
-            )
-
-    # info + status bar
-    header_rect = pygame.Rect(12, 8, BOARD_AREA - 24, 32)
-    pygame.draw.rect(screen, INFO_BAR, header_rect, border_radius=8)
-
-    txt1 = f"You are {my_color_name}"
-    surface1 = fonts["label"].render(txt1, True, TEXT_MAIN)
-    screen.blit(surface1, (header_rect.x + 12, header_rect.y + 6))
-
-    restart_rect = pygame.Rect(header_rect.right - 140, header_rect.y + 4, 126, 24)
-    btn_label = "Restart (R)" if can_restart else "Restart"
-
-    def paint_restart():
-        btn_color = RESTART_ACTIVE if can_restart else RESTART_DISABLED
-        pygame.draw.rect(screen, btn_color, restart_rect, border_radius=6)
-        surface_btn = fonts["small"].render(btn_label, True, (245, 245, 245))
-        screen.blit(surface_btn, surface_btn.get_rect(center=restart_rect.center))
-
-    paint_restart()
-
-    if winner == BLACK: 
-        txt2 = "Black wins!"
-    elif winner == WHITE:
-        txt2 = "White wins!"
-    elif winner == 0:
-        txt2 = "Draw!"
-    elif waiting:
-        txt2 = "Waiting for opponent..."
-    else:
-        turn = "Black" if state["turn"] == BLACK else "White"
-        txt2 = f"Turn: {turn}"
+    def redraw_cell(self, x, y, stone): # 그 칸의 보드 배경을 다시 붙이고 돌을 올린다
+        rect = self.cell_rect(x, y)
+        self.screen.blit(self.board_surface, rect, rect.move(-BOARD_REGION.x, -BOARD_REGION.y))
+        if stone != EMPTY:
+            self.blit_stone(x, y, stone)
+        return rect
 
-    surface2 = fonts["label"].render(txt2, True, TEXT_MAIN)
-    screen.blit(surface2, (header_rect.x + 10, header_rect.bottom + 6))
+    def blit_stone(self, x, y, stone):
+        sprite = self.stones.get(stone)
+        if sprite is None:
+            return
+        self.screen.blit(sprite, sprite.get_rect(center=(MARGIN + x * CELL_SIZE, TOP_OFFSET + MARGIN + y * CELL_SIZE)))
 
-    # 승리 시 가운데에 나타내기
-    if winner is not None:
+    def draw_overlay(self, title, subtitle):
         overlay = pygame.Surface((BOARD_AREA, BOARD_AREA), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 140))
-        screen.blit(overlay, (0, TOP_OFFSET))
+        self.screen.blit(overlay, (0, TOP_OFFSET))
 
-        title_surface = fonts["banner"].render(txt2, True, (255, 255, 255))
-        title_rect = title_surface.get_rect(
-            center=(BOARD_AREA // 2, TOP_OFFSET + BOARD_AREA // 2 - 10)
-        )
-        screen.blit(title_surface, title_rect)
+        title_surface = self.text.render("banner", title, (255, 255, 255))
+        self.screen.blit(title_surface, title_surface.get_rect(center=(BOARD_AREA // 2, TOP_OFFSET + BOARD_AREA // 2 - 10)))
 
         # 재시작
-        my_key = my_color_name.lower()
-        other_key = "white" if my_key == "black" else "black"
-        my_req = restart_info.get(my_key, False)
-        opp_req = restart_info.get(other_key, False)
-
-        if my_req and not opp_req:
-            subtitle = "Restart requested. Waiting for opponent..."
-        elif opp_req and not my_req:
-            subtitle = "Opponent wants a rematch. Press R to accept."
-        else:
-            subtitle = "Press R or click Restart to play again."
-
-        subtitle_surface = fonts["banner_sub"].render(subtitle, True, (235, 235, 235))
-        subtitle_rect = subtitle_surface.get_rect(
-            center=(BOARD_AREA // 2, TOP_OFFSET + BOARD_AREA // 2 + 30)
+        subtitle_surface = self.text.render("banner_sub", subtitle, (235, 235, 235))
+        self.screen.blit(
+            subtitle_surface, subtitle_surface.get_rect(center=(BOARD_AREA // 2, TOP_OFFSET + BOARD_AREA // 2 + 30))
         )
-        screen.blit(subtitle_surface, subtitle_rect)
-
-        # bring the restart button above the overlay
-        paint_restart()
-
-    return chat_messages, waiting, restart_rect
-
-#채팅 UI 그리기
-def draw_chat(screen, chat_messages, input_text, fonts):
-    title_rect = pygame.Rect(BOARD_AREA + 10, 8, CHAT_WIDTH - 20, 26)
-    pygame.draw.rect(screen, CHAT_TITLE_BG, title_rect, border_radius=6)
-    title_surface = fonts["label"].render("Chat", True, TEXT_MAIN)
-    screen.blit(title_surface, (title_rect.x + 10, title_rect.y + 4))
-
-    area_x = BOARD_AREA + 10
-    area_y = title_rect.bottom + 6
-    area_w = CHAT_WIDTH - 20
-    area_h = HEIGHT - MARGIN * 2 - 50
-
-    chat_rect = pygame.Rect(area_x - 2, area_y - 2, area_w + 4, area_h + 4)
-    pygame.draw.rect(screen, CHAT_BG, chat_rect)
-    pygame.draw.rect(screen, CHAT_BORDER, chat_rect, 1)
-
-    font = fonts["small"]
-    # draw messages (latest at bottom)
-    line_y = area_y + area_h - 22
-    for msg in reversed(chat_messages[-20:]): #최근 20개를 역순으로 출력해서 스크롤 느낌을 만듦
-        text = f"{msg.get('name', '???')}: {msg.get('msg', '')}"
-        surface = font.render(text, True, CHAT_TEXT)
-        screen.blit(surface, (area_x + 4, line_y))
-        line_y -= 20
-        if line_y < area_y:
-            break
-
-    if not chat_messages:
-        placeholder = font.render("No messages yet. Say hi!", True, TEXT_DIM) # 채팅이 하나도 없을 경우 이 문구를 표시함
-        screen.blit(placeholder, (area_x + 4, area_y + 4))
-
-    # 입력창
-    input_rect = pygame.Rect(area_x - 2, HEIGHT - MARGIN - 40, area_w + 4, 32)
-    pygame.draw.rect(screen, CHAT_INPUT_BG, input_rect)
-    pygame.draw.rect(screen, CHAT_INPUT_BORDER, input_rect, 1)
-    input_surface = font.render(input_text, True, (0, 0, 0))
-    screen.blit(input_surface, (input_rect.x + 6, input_rect.y + 6))
-
-    hint = fonts["tiny"].render("Enter to send • Esc to quit", True, TEXT_DIM)
-    screen.blit(hint, (input_rect.x, input_rect.bottom + 4))
+
+    #채팅 UI 그리기
+    def draw_chat(self, chat_messages, input_text, dirty):
+        recent = chat_messages[-20:] #최근 20개를 역순으로 출력해서 스크롤 느낌을 만듦
+        signature = ([(msg.get("id"), msg.get("name"), msg.get("msg")) for msg in recent], input_text)
+        if signature == self.chat_drawn:
+            return
+        self.chat_drawn = signature
+        screen = self.screen
+        screen.fill(BACKGROUND, CHAT_REGION)
+        title_rect = pygame.Rect(BOARD_AREA + 10, 8, CHAT_WIDTH - 20, 26)
+        pygame.draw.rect(screen, CHAT_TITLE_BG, title_rect, border_radius=6)
+        screen.blit(self.text.render("label", "Chat", TEXT_MAIN), (title_rect.x + 10, title_rect.y + 4))
+
+        area_x = BOARD_AREA + 10
+        area_y = title_rect.bottom + 6
+        area_w = CHAT_WIDTH - 20
+        area_h = HEIGHT - MARGIN * 2 - 50
+
+        chat_rect = pygame.Rect(area_x - 2, area_y - 2, area_w + 4, area_h + 4)
+        pygame.draw.rect(screen, CHAT_BG, chat_rect)
+        pygame.draw.rect(screen, CHAT_BORDER, chat_rect, 1)
+
+        # draw messages (latest at bottom)
+        line_y = area_y + area_h - 22
+        for msg in reversed(recent):
+            text = f"{msg.get('name', '???')}: {msg.get('msg', '')}"
+            screen.blit(self.text.render("small", text, CHAT_TEXT), (area_x + 4, line_y))
+            line_y -= 20
+            if line_y < area_y:
+                break
+
+        if not chat_messages: # 채팅이 하나도 없을 경우 이 문구를 표시함
+            screen.blit(self.text.render("small", "No messages yet. Say hi!", TEXT_DIM), (area_x + 4, area_y + 4))
+
+        # 입력창
+        input_rect = pygame.Rect(area_x - 2, HEIGHT - MARGIN - 40, area_w + 4, 32)
+        pygame.draw.rect(screen, CHAT_INPUT_BG, input_rect)
+        pygame.draw.rect(screen, CHAT_INPUT_BORDER, input_rect, 1)
+        screen.blit(self.text.render("small", input_text, (0, 0, 0)), (input_rect.x + 6, input_rect.y + 6))
+
+        screen.blit(self.text.render("tiny", "Enter to send • Esc to quit", TEXT_DIM), (input_rect.x, input_rect.bottom + 4))
+        dirty.append(CHAT_REGION)
 
 #로컬로 돌릴때 편의를 위함. 자동으로 ip 찾기
 def detect_local_ip(): #사용자가 서버 주소를 안 치고 그냥 엔터 치면, 이 컴퓨터의 로컬 IP를 자동으로 찾아주는 역할
@@ -232,6 +572,16 @@ def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Pygame Omok client")
     parser.add_argument("--host", help="Server host/IP to connect to")
     parser.add_argument("--name", help="Player name to register with the server")
+    parser.add_argument("--room", type=int, help="Room id to join (default: the lobby room)")
+    parser.add_argument("--bot", choices=("easy", "normal", "hard"), help="Seat a server bot of this level as the opponent")
+    parser.add_argument(
+        "--feed",
+        metavar="HOST:PORT",
+        help="Spectate from the server's UDP feed on this multicast group/port (default: the group the server advertises)",
+    )
+    parser.add_argument(
+        "--wire", choices=("json", "binary"), default="binary", help="Message encoding (binary falls back to JSON on old servers)"
+    )
     return parser.parse_args(argv)
 
 
@@ -249,6 +599,7 @@ def main(argv=None):
             host = detect_local_ip()
             print(f"로컬 호스트를 {host}로 사용합니다.")
     set_server(host)
+    set_wire_format(args.wire)
 
     player_name = args.name
     if not player_name:
@@ -257,10 +608,15 @@ def main(argv=None):
             name_input = input(f"플레이어 이름 입력 ({PLAYER_NAME} 기본): ").strip()
         player_name = name_input if name_input else PLAYER_NAME
 
-    join_resp = join_server(player_name)
+    join_resp = join_server(player_name, args.room)
     if not join_resp.get("ok"):
         print("Failed to join server:", join_resp)
         return
+    if args.bot:
+        bot_resp = add_bot(join_resp.get("room"), args.bot)
+        if not bot_resp.get("ok"):
+            print("Failed to add bot:", bot_resp.get("msg"))
+    configure_layout(join_resp.get("rules", {}).get("size", BOARD_SIZE))
 
     pygame.init() #pygame 시작
     screen = pygame.display.set_mode((WIDTH, HEIGHT)) #화면 열기
@@ -274,6 +630,8 @@ def main(argv=None):
         "banner_sub": pygame.font.SysFont("bahnschrift", 26),
     }
 
+    renderer = Renderer(screen, fonts)
+
     token = join_resp.get("token")
     color_name = join_resp.get("color", "UNKNOWN")
     state = join_resp.get("state")
@@ -287,6 +645,16 @@ def main(argv=None):
     else:
         my_color = None #관전자
 
+    feed_address = args.feed or (join_resp.get("feed") or [None])[0]
+    if my_color is None and feed_address: # 관전자는 UDP 피드로 (서버가 관전자 수만큼 일하지 않도록)
+        listener = FeedListener(parse_address(feed_address), state, join_resp.get("room"), token)
+        print(f"Spectating via UDP feed {feed_address}")
+    else:
+        listener = EventListener(state, join_resp.get("room"), token)
+    listener.start()
+    worker = NetworkWorker(token, join_resp.get("room"))
+    worker.start()
+
     clock = pygame.time.Clock() #FPS 조절용
     running = True #메인루프 가동 여부
 
@@ -301,6 +669,9 @@ def main(argv=None):
             if event.type == pygame.QUIT: # 창 닫힐 경우
                 running = False
 
+            elif event.type in EXPOSE_EVENTS: # 가려졌던 창이 다시 보임, 전부 다시 그리기
+                renderer.invalidate()
+
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
@@ -309,17 +680,11 @@ def main(argv=None):
                 elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                     text = chat_input.strip()
                     if text: # 채팅 전송
-                        resp = send_chat(token, text)
-                        if not resp.get("ok"):
-                            print("Chat send failed:", resp)
-                        if resp.get("chat") and state is not None:
-                            state["chat"] = resp["chat"]
+                        worker.send("chat", text, have=state)
                     chat_input = ""
                 elif event.key == pygame.K_r:
                     if can_restart:
-                        resp = restart_game(token)
-                        if resp.get("state"):
-                            state = resp["state"]
+                        worker.send("restart", have=state)
                     else:
                         print("Restart is available after a finished game.")
                 else:
@@ -329,9 +694,7 @@ def main(argv=None):
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 if restart_rect and restart_rect.collidepoint(event.pos):
                     if can_restart: # 게임 다시시작
-                        resp = restart_game(token)
-                        if resp.get("state"):
-                            state = resp["state"]
+                        worker.send("restart", have=state)
                     continue
 
                 if state is None:
@@ -347,29 +710,25 @@ def main(argv=None):
 
                 x, y = coord_from_mouse(event.pos)
                 if 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE:
-                    resp = submit_move(token, x, y)
-                    if not resp.get("ok"):
-                        print("Move rejected:", resp)
-                    if resp.get("state"):
-                        state = resp["state"]
-
-        resp = request_state() #서버에 현재 상태 요청
-        if resp.get("ok") and resp.get("state"):
-            state = resp["state"] #state가 있으면 로컬 state를 그 값으로 바꿈 
-
-        chat_messages = []
-        if state is not None:
-            chat_messages, _waiting, restart_rect = draw_board(
-                screen, state, color_name, can_restart, fonts
-            )
-        else:
-            screen.fill(BACKGROUND)
-            restart_rect = None
-
-        draw_chat(screen, chat_messages, chat_input, fonts) #채팅 영역 그리기
-        pygame.display.flip() #실제 화면에 렌더링 결과 반영
-
+                    worker.send("move", x, y, have=state) # 결과는 worker.take()로
+
+        polled = listener.take() #백그라운드에서 받아 둔 최신 상태
+        if polled is not None and is_newer_state(polled, state):
+            state = polled #state가 있으면 로컬 state를 그 값으로 바꿈
+        answered, chat = worker.take() # 내가 보낸 요청의 응답 (더 새 것일 때만)
+        if answered is not None and is_newer_state(answered, state):
+            state = answered
+        if chat and state is not None: # 이벤트보다 먼저 화면에 보이도록 합치기
+            state = dict(state, chat=merge_chat(state.get("chat", []), chat, LOCAL_CHAT_LIMIT))
+            state["chat_count"] = max(state.get("chat_count", 0), chat[-1].get("id", 0))
+
+        # 바뀐 영역만 다시 그려서 화면에 반영 (idle이면 아무것도 하지 않음)
+        restart_rect = renderer.draw(state, color_name, can_restart, chat_input, worker.status())
+
+    listener.running = False
+    worker.stop()
     quit_game(token)
+    close_connections()
     pygame.quit()
 
 
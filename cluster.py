@@ -0,0 +1,203 @@
+# cluster.py
+# 서버를 워커 프로세스 여러 개로 돌리기 위한 부분 (리눅스 전용)
+# - 모든 워커가 SO_REUSEPORT로 같은 포트에서 연결을 받는다 (커널이 연결을 나눠 준다)
+# - 방 하나는 워커 하나만 가진다: 방 번호 % 워커 수 = 그 방을 가진 워커 번호
+#   토큰 앞부분에 방 번호가 있으므로, 요청만 보고 어느 워커가 처리해야 하는지 알 수 있다
+# - 다른 워커의 방 요청을 받으면 그 연결(소켓 fd)을 읽은 요청과 함께 그 워커에게 넘긴다 (SCM_RIGHTS)
+#   이후 그 연결의 요청은 넘겨받은 워커가 직접 처리한다, 방 상태는 프로세스 사이에 공유하지 않는다 (락 불필요)
+# - 워커끼리는 AF_UNIX SOCK_SEQPACKET 소켓으로 연결을 넘기거나 간단한 질의(방 목록 등)를 주고받는다
+#   메시지 = 종류 1바이트 + 내용:  F 넘겨받을 요청 bytes (+ fd),  Q 질의 JSON,  R 응답 JSON
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+MAX_MESSAGE = 128 * 1024 # 워커 사이 메시지 최대 크기 (넘기는 요청 하나가 이보다 크면 넘기지 못한다)
+CONNECT_RETRIES = 50 # 아직 뜨지 않은 워커에 연결을 다시 시도하는 횟수 (0.1초 간격)
+RESTART_DELAY = 1.0 # 죽은 워커를 다시 띄우기 전 대기 시간(초)
+QUERY_TIMEOUT = 5.0 # 다른 워커의 질의 응답을 기다리는 시간(초)
+
+
+def supported(): # 이 플랫폼에서 워커 모드를 쓸 수 있는지
+    return all(hasattr(socket, name) for name in ("SO_REUSEPORT", "SOCK_SEQPACKET", "send_fds", "recv_fds")) and hasattr(
+        os, "fork"
+    )
+
+
+class Cluster:
+    # 워커 프로세스 하나에서 본 클러스터 (자기 번호, 워커 수, 다른 워커와의 연결)
+    def __init__(self, index, count, directory):
+        self.index = index
+        self.count = count
+        self.directory = directory # 워커별 유닉스 소켓이 있는 폴더
+        self.peers = {} # 워커 번호 -> (소켓, 락), 처음 쓸 때 연결
+        self.peers_lock = threading.Lock()
+        self.handed_off = 0 # 다른 워커에게 넘긴 연결 수
+
+    def owner(self, room_id): # 그 방을 가진 워커 번호
+        return room_id % self.count
+
+    def first_room_id(self, after): # after보다 크면서 이 워커가 가질 첫 방 번호
+        room_id = after + 1
+        return room_id + (self.index - room_id) % self.count
+
+    def socket_path(self, index):
+        return os.path.join(self.directory, f"worker-{index}.sock")
+
+    def _peer(self, index):
+        with self.peers_lock:
+            peer = self.peers.get(index)
+            if peer is None:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+                for _ in range(CONNECT_RETRIES):
+                    try:
+                        sock.connect(self.socket_path(index))
+                        break
+                    except (FileNotFoundError, ConnectionRefusedError):
+                        time.sleep(0.1)
+                else:
+                    sock.close()
+                    raise ConnectionError(f"worker {index} is not running")
+                peer = self.peers[index] = (sock, threading.Lock())
+            return peer
+
+    def _drop_peer(self, index, sock): # 끊긴 연결은 버리고 다음에 다시 연결
+        with self.peers_lock:
+            if self.peers.get(index, (None,))[0] is sock:
+                del self.peers[index]
+        sock.close()
+
+    def _call(self, index, func): # 끊겼으면 한 번 다시 연결해서 시도
+        for attempt in range(2):
+            sock, lock = self._peer(index)
+            try:
+                with lock:
+                    return func(sock)
+            except OSError:
+                self._drop_peer(index, sock)
+                if attempt:
+                    raise
+
+    def hand_off(self, index, fd, request_bytes): # 연결을 그 워커에게 넘긴다 (이 프로세스는 자기 소켓을 닫으면 된다)
+        message = b"F" + request_bytes
+        if len(message) > MAX_MESSAGE:
+            raise OSError("REQUEST_TOO_LARGE_TO_HAND_OFF")
+        self._call(index, lambda sock: socket.send_fds(sock, [message], [fd]))
+        self.handed_off += 1
+
+    def query(self, index, request): # 다른 워커에게 질의하고 JSON 응답을 기다린다
+        message = b"Q" + json.dumps(request).encode("utf-8")
+
+        def ask(sock):
+            sock.sendall(message)
+            sock.settimeout(QUERY_TIMEOUT)
+            try:
+                reply = sock.recv(MAX_MESSAGE)
+            finally:
+                sock.settimeout(None)
+            if not reply.startswith(b"R"):
+                raise ConnectionError("BAD_REPLY")
+            return json.loads(reply[1:])
+
+        return self._call(index, ask)
+
+    def others(self):
+        return [index for index in range(self.count) if index != self.index]
+
+    # 다른 워커가 보내는 연결/질의를 받는 스레드를 띄운다
+    # on_connection(sock, request_bytes): 넘겨받은 연결, on_query(dict) -> dict: 질의 응답
+    def serve(self, on_connection, on_query):
+        path = self.socket_path(self.index)
+        if os.path.exists(path): # 죽었다 다시 뜬 워커
+            os.remove(path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        listener.bind(path)
+        listener.listen()
+
+        def accept_loop():
+            while True:
+                conn, _addr = listener.accept()
+                threading.Thread(target=self._peer_loop, args=(conn, on_connection, on_query), daemon=True).start()
+
+        threading.Thread(target=accept_loop, daemon=True).start()
+
+    def _peer_loop(self, conn, on_connection, on_query): # 다른 워커 하나와의 연결
+        with conn:
+            while True:
+                try:
+                    message, fds, _flags, _addr = socket.recv_fds(conn, MAX_MESSAGE, 1)
+                except OSError:
+                    return
+                if not message: # 상대 워커가 끝남
+                    return
+                kind, body = message[:1], message[1:]
+                if kind == b"F" and fds:
+                    on_connection(socket.socket(fileno=fds[0]), body)
+                    continue
+                for fd in fds: # 예상하지 못한 fd는 닫는다
+                    os.close(fd)
+                if kind == b"Q":
+                    try:
+                        reply = on_query(json.loads(body))
+                    except Exception as exc:
+                        reply = {"ok": False, "msg": f"QUERY_FAILED: {exc}"}
+                    conn.sendall(b"R" + json.dumps(reply).encode("utf-8"))
+
+
+def supervise(count, run_worker):
+    # 워커 count개를 fork 하고, 죽은 워커는 다시 띄운다, 종료 신호를 받으면 워커를 모두 끝낸다
+    # run_worker(index): 자식 프로세스에서 호출, 서버를 돌린다 (돌아오면 자식은 끝난다)
+    children = {} # pid -> 워커 번호
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0: # 자식
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(index)
+            except KeyboardInterrupt:
+                pass
+            except BaseException as exc:
+                print(f"[SERVER] worker {index} crashed: {exc!r}")
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    def stop(_signum=None, _frame=None):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    for index in range(count):
+        spawn(index)
+    print(f"[SERVER] supervisor pid={os.getpid()} started {count} workers")
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = children.pop(pid, None)
+            if index is None or stopping:
+                continue
+            print(f"[SERVER] worker {index} (pid {pid}) exited with status {status}, restarting")
+            time.sleep(RESTART_DELAY)
+            spawn(index)
+    except KeyboardInterrupt: # Ctrl+C는 워커들에게도 가지만, 확실히 끝낸다
+        stop()
+        while children:
+            try:
+                pid, _status = os.wait()
+            except ChildProcessError:
+                break
+            children.pop(pid, None)
@@ -0,0 +1,238 @@
+# feed.py
+# 관전자용 UDP 상태 피드
+# 서버는 방에 변화가 생길 때마다 데이터그램을 한 번만 보낸다 (멀티캐스트 그룹 또는 구독자 주소 목록으로)
+# 관전자가 몇 명이든 서버가 하는 일은 같으므로, LAN에서 한 판을 수백 명이 봐도 서버 부담이 거의 없다
+#
+# 데이터그램 = 헤더 <2s B I I B> (MAGIC, 버전, 방, seq, 종류) + 내용
+#   수:     고정 <B B B B B H>  x, y, 색, 다음 차례, 승자(255 = 없음), move_count
+#   그 외:  wire 형식으로 인코딩한 이벤트 data (입장/퇴장/채팅/재시작/승패)
+#   키프레임: wire 형식의 게임 상태 (보드, 차례, 플레이어, 재시작, 버전, 채팅 제외)
+# seq는 방의 state_version (SSE /events 의 id와 같다)
+# UDP는 잃어버리거나 순서가 바뀔 수 있으므로, 받는 쪽은 seq가 건너뛰면 TCP /state로 채우고
+# 그마저 안 되면 주기적으로 오는 키프레임으로 다시 맞춘다
+import queue
+import socket
+import struct
+import threading
+import time
+
+import wire
+from metrics import metrics
+
+MAGIC = b"OF"
+VERSION = 1
+HEADER = struct.Struct("<2sBIIB")
+MOVE_BODY = struct.Struct("<BBBBBH")
+NO_WINNER = 255
+MAX_DATAGRAM = 1400 # 이보다 큰 이벤트는 보내지 않는다 (받는 쪽은 seq 건너뜀으로 알고 TCP로 채운다)
+
+MOVE = 1
+WIN = 2
+JOIN = 3
+QUIT = 4
+CHAT = 5
+RESTART = 6
+KEYFRAME = 15
+KIND_CODES = {"move": MOVE, "win": WIN, "join": JOIN, "quit": QUIT, "chat": CHAT, "restart": RESTART, "keyframe": KEYFRAME}
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+
+KEYFRAME_INTERVAL = 1.0 # 바뀐 방의 키프레임을 보내는 주기(초)
+IDLE_KEYFRAME_INTERVAL = 10.0 # 바뀌지 않은 방도 이 주기로 키프레임을 보낸다 (새로 들어온 관전자용)
+MULTICAST_TTL = 1 # 멀티캐스트가 넘어갈 라우터 수, 1이면 같은 LAN 안에서만
+FEED_TIMEOUT = 15.0 # 이 시간 동안 데이터그램이 없으면 TCP로 상태를 확인한다(초)
+FALLBACK_INTERVAL = 0.5 # TCP /state 로 채우는 최소 간격(초)
+
+
+def parse_address(text): # "239.1.2.3:7000" -> ("239.1.2.3", 7000)
+    host, sep, port = text.rpartition(":")
+    if not sep or not host:
+        raise ValueError(f"expected HOST:PORT, got {text!r}")
+    return host, int(port)
+
+
+def is_multicast(host):
+    try:
+        return 224 <= int(host.split(".")[0]) <= 239
+    except ValueError:
+        return False
+
+
+def encode_datagram(room_id, seq, kind, data): # 이벤트 하나 -> bytes, 보내지 않는 이벤트면 None
+    code = KIND_CODES.get(kind)
+    if code is None:
+        return None
+    header = HEADER.pack(MAGIC, VERSION, room_id, seq, code)
+    if code == MOVE:
+        winner = NO_WINNER if data["winner"] is None else data["winner"]
+        return header + MOVE_BODY.pack(data["x"], data["y"], data["color"], data["turn"], winner, data["move_count"])
+    datagram = header + wire.encode(data)
+    if len(datagram) > MAX_DATAGRAM:
+        return None
+    return datagram
+
+
+def decode_datagram(datagram): # bytes -> (방, seq, 종류, data), 피드 데이터그램이 아니면 ValueError
+    if len(datagram) < HEADER.size:
+        raise ValueError("SHORT_DATAGRAM")
+    magic, version, room_id, seq, code = HEADER.unpack_from(datagram)
+    if magic != MAGIC or version != VERSION or code not in KIND_NAMES:
+        raise ValueError("NOT_A_FEED_DATAGRAM")
+    body = datagram[HEADER.size:]
+    if code == MOVE:
+        x, y, color, turn, winner, move_count = MOVE_BODY.unpack(body)
+        data = {
+            "x": x,
+            "y": y,
+            "color": color,
+            "turn": turn,
+            "winner": None if winner == NO_WINNER else winner,
+            "move_count": move_count,
+        }
+    else:
+        data = wire.decode(body)
+    return room_id, seq, KIND_NAMES[code], data
+
+
+def keyframe_state_locked(room): # 방 락 안에서, 채팅을 뺀 전체 상태 (데이터그램 하나에 들어가게)
+    state = room.build_state_locked({"chat_since": room.chat_count})
+    for key in ("chat", "chat_delta", "chat_count"):
+        state.pop(key, None)
+    return state
+
+
+class StateFeed:
+    # 서버 쪽, room.event_listeners에 on_event를 등록한다
+    # 방 락 안에서는 큐에 넣기만 하고, 인코딩과 전송은 보내는 스레드가 한다
+    def __init__(self, targets, rooms, keyframe_interval=KEYFRAME_INTERVAL, ttl=MULTICAST_TTL):
+        self.targets = list(targets) # [(host, port)], 멀티캐스트 그룹이나 구독자 주소
+        self.rooms = rooms
+        self.keyframe_interval = keyframe_interval
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1) # x.x.x.255 같은 브로드캐스트 주소도 허용
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.pending = queue.SimpleQueue() # (방 번호, seq, 종류, data)
+        self.keyframes = {} # 방 번호 -> (버전, 보낸 시각, 데이터그램)
+        self.running = True
+        self.thread = threading.Thread(target=self._send_loop, daemon=True)
+
+    def groups(self): # 관전자에게 알려줄 멀티캐스트 주소 ("group:port" 목록)
+        return [f"{host}:{port}" for host, port in self.targets if is_multicast(host)]
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def on_event(self, room, seq, kind, data): # room.event_listeners에 등록하는 콜백
+        self.pending.put((room.room_id, seq, kind, data))
+
+    def send(self, datagram):
+        for target in self.targets:
+            try:
+                self.sock.sendto(datagram, target)
+            except OSError: # 구독자 하나가 없어져도 나머지는 계속
+                metrics.inc("omok_feed_errors_total")
+                continue
+            metrics.inc("omok_feed_datagrams_total")
+            metrics.inc("omok_feed_bytes_total", amount=len(datagram))
+
+    def _send_loop(self):
+        next_keyframe = time.monotonic() + self.keyframe_interval
+        while self.running:
+            try:
+                room_id, seq, kind, data = self.pending.get(timeout=max(0.0, next_keyframe - time.monotonic()))
+            except queue.Empty:
+                pass
+            else:
+                datagram = encode_datagram(room_id, seq, kind, data)
+                if datagram is not None:
+                    self.send(datagram)
+            # 큐가 계속 차 있어도 (방이 많고 바쁠 때) 키프레임은 제 주기에 보낸다
+            if time.monotonic() >= next_keyframe:
+                self.send_keyframes()
+                next_keyframe = time.monotonic() + self.keyframe_interval
+
+    def send_keyframes(self): # 바뀐 방은 매번, 바뀌지 않은 방은 IDLE_KEYFRAME_INTERVAL마다
+        now = time.monotonic()
+        for room in list(self.rooms.values()):
+            previous = self.keyframes.get(room.room_id)
+            if previous is not None and previous[0] == room.state_version: # 락 없이 버전만 본다
+                if now - previous[1] < IDLE_KEYFRAME_INTERVAL:
+                    continue
+                version, _sent, datagram = previous
+            else:
+                with room.lock:
+                    version = room.state_version
+                    state = keyframe_state_locked(room)
+                datagram = encode_datagram(room.room_id, version, "keyframe", state)
+                if datagram is None:
+                    continue
+            self.keyframes[room.room_id] = (version, now, datagram)
+            self.send(datagram)
+
+
+def open_feed_socket(host, port): # 받는 쪽 소켓, 멀티캐스트 그룹이면 가입한다
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1) # 같은 컴퓨터의 관전자 여러 명이 같은 포트로
+    if is_multicast(host):
+        sock.bind(("", port))
+        membership = struct.pack("4s4s", socket.inet_aton(host), socket.inet_aton("0.0.0.0"))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+    else:
+        sock.bind((host, port))
+    return sock
+
+
+# 받는 쪽, protocol.iter_events와 같은 모양 {"id", "event", "data"}의 이벤트를 돌려주는 iterator
+# fetch_state(): TCP /state 로 전체 상태를 받아오는 함수 (실패하면 None), seq가 건너뛰면 이걸로 채운다
+# 키프레임은 "keyframe" 이벤트로 (채팅은 들어있지 않다)
+def iter_feed(sock, room_id, fetch_state=None):
+    last = None # 마지막으로 반영한 seq
+    last_fallback = 0.0
+
+    def fallback(): # TCP로 전체 상태, 너무 자주 하지 않는다
+        nonlocal last_fallback
+        now = time.monotonic()
+        if fetch_state is None or now - last_fallback < FALLBACK_INTERVAL:
+            return None
+        last_fallback = now
+        return fetch_state()
+
+    while True:
+        sock.settimeout(FALLBACK_INTERVAL if last is None else FEED_TIMEOUT) # 맞추는 중이면 TCP를 곧 다시 시도
+        try:
+            datagram = sock.recv(65535)
+        except socket.timeout: # 조용함, 피드가 끊겼을 수 있으니 TCP로 확인
+            state = fallback()
+            if state is not None and (last is None or state["version"] > last):
+                last = state["version"]
+                yield {"id": last, "event": "snapshot", "data": {"state": state}}
+            continue
+        try:
+            room, seq, kind, data = decode_datagram(datagram)
+        except (ValueError, struct.error):
+            continue
+        if room != room_id:
+            continue
+        if kind == "keyframe":
+            if last is None or seq > last: # 놓친 것이 있거나 처음, 키프레임으로 맞춘다
+                last = seq
+                yield {"id": seq, "event": "keyframe", "data": {"state": data}}
+            continue
+        if last is not None and seq <= last: # 이미 반영했거나 늦게 도착한 것
+            continue
+        if last is None or seq != last + 1: # 중간을 놓침
+            state = fallback()
+            if state is None: # TCP도 안 되면 다음 키프레임까지 기다린다
+                last = None
+                continue
+            last = state["version"]
+            yield {"id": last, "event": "snapshot", "data": {"state": state}}
+            if seq <= last:
+                continue
+            if seq != last + 1:
+                last = None
+                continue
+        last = seq
+        yield {"id": seq, "event": kind, "data": data}
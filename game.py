@@ -1,20 +1,89 @@
 # game.py
 # Omok (Gomoku) game logic and state container
+import random
 
-BOARD_SIZE = 15 #오목판 사이즈
+BOARD_SIZE = 15 #오목판 기본 사이즈
+WIN_LENGTH = 5 # 기본 승리 조건 (5목)
+MIN_BOARD_SIZE = 5
+MAX_BOARD_SIZE = 25
 
 # 비어있는거는 0, 검은돌 1, 흰돌 2
 EMPTY = 0
 BLACK = 1
 WHITE = 2
 
+DIRECTIONS = (
+    (1, 0),   # 오른쪽
+    (0, 1),   # 아래쪽
+    (1, 1),   # 대각선 오른쪽 아래 방향
+    (1, -1),  # 대각선 오른쪽 위 방향
+)
+
+_line_tables = {} # (size, win_length) -> 줄 테이블, 같은 규칙의 게임끼리 공유
+_zobrist_tables = {} # size -> Zobrist 키 테이블
+_bit_line_tables = {} # (size, win_length) -> 칸마다 네 방향 줄 마스크, BitboardOmokGame용
+ZOBRIST_SEED = 0x0A0C # 고정 시드, 프로세스가 달라도 같은 국면이면 같은 해시
+
+
+def line_table(size, win_length):
+    # 칸마다 그 칸을 지나는 네 방향 줄을 미리 계산해 둔다
+    # table[y * size + x] = [(앞쪽 칸들, 뒤쪽 칸들), ...] 방향별로, 각 쪽은 가까운 칸부터 최대 win_length칸
+    # (win_length칸까지 봐야 exact 규칙에서 장목(overline)을 구분할 수 있다)
+    key = (size, win_length)
+    table = _line_tables.get(key)
+    if table is None:
+        table = []
+        for y in range(size):
+            for x in range(size):
+                lines = []
+                for dx, dy in DIRECTIONS:
+                    forward = []
+                    backward = []
+                    for step in range(1, win_length + 1):
+                        if 0 <= x + dx * step < size and 0 <= y + dy * step < size:
+                            forward.append((x + dx * step, y + dy * step))
+                        if 0 <= x - dx * step < size and 0 <= y - dy * step < size:
+                            backward.append((x - dx * step, y - dy * step))
+                    lines.append((tuple(forward), tuple(backward)))
+                table.append(tuple(lines))
+        _line_tables[key] = table
+    return table
+
+
+def zobrist_table(size):
+    # 칸마다 [0, 흑 키, 백 키] (색깔 번호로 인덱스), 64비트 랜덤 값
+    # 국면 해시 = 놓인 돌들의 키를 전부 XOR 한 값, 돌 하나 놓거나 빼면 XOR 한 번으로 갱신된다
+    # 흑부터 번갈아 두므로 차례는 돌 개수로 정해져 따로 넣지 않는다
+    table = _zobrist_tables.get(size)
+    if table is None:
+        rng = random.Random(ZOBRIST_SEED + size)
+        table = [(0, rng.getrandbits(64), rng.getrandbits(64)) for _ in range(size * size)]
+        _zobrist_tables[size] = table
+    return table
+
 
 class OmokGame:
-    def __init__(self):
+    # size: 보드 한 변, win_length: 몇 개를 이어야 이기는지 (5목, 6목 ...)
+    # exact: True면 정확히 win_length개일 때만 승리 (장목은 승리 아님)
+    def __init__(self, size=BOARD_SIZE, win_length=WIN_LENGTH, exact=False):
+        if not MIN_BOARD_SIZE <= size <= MAX_BOARD_SIZE:
+            raise ValueError("INVALID_BOARD_SIZE")
+        if not 3 <= win_length <= size:
+            raise ValueError("INVALID_WIN_LENGTH")
+        self.size = size
+        self.win_length = win_length
+        self.exact = exact
+        self.lines = line_table(size, win_length)
+        self.zobrist = zobrist_table(size)
+        self.game_id = 0 # reset 할 때마다 1씩 증가, 클라이언트가 다른 판의 수순을 섞지 않도록
         self.reset() # 시작시 초기화
 
+    @property
+    def rules(self): # 클라이언트가 화면을 그리는 데 필요한 보드 규칙
+        return {"size": self.size, "win_length": self.win_length, "exact": self.exact}
+
     def in_bounds(self, x, y): #x,y가 보드 내부인지 검사하기
-        return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE #BOARD_SIZE 15를 기준으로
+        return 0 <= x < self.size and 0 <= y < self.size
 
     def place_stone(self, x, y):
         
@@ -27,53 +96,70 @@ class OmokGame:
         if self.winner is not None: # 만약 승자가 이미 있으면
             return False, "GAME_ALREADY_OVER"
 
-        self.board[y][x] = self.current_turn  #배열이므로 [y][x]로 해야함 주의 (0,0)~(14,14)까지 있음
-        self.move_count += 1
+        self.board[y][x] = self.current_turn  #배열이므로 [y][x]로 해야함 주의 (0,0)~(size-1,size-1)까지 있음
+        self._record_move(x, y)
 
         if self.check_win(x, y): #승리 체크
             self.winner = self.current_turn
             return True, "WIN"
 
-        if self.move_count == BOARD_SIZE * BOARD_SIZE: #칸이 꽉차면
+        if self.move_count == self.size * self.size: #칸이 꽉차면
             self.winner = 0  # 무승부
             return True, "DRAW"
 
         self.current_turn = WHITE if self.current_turn == BLACK else BLACK #위의 if상황들이 모두 아닌경우에 실행, 턴 넘기기
         return True, "OK"
 
+    def _record_move(self, x, y): # place_stone 공통 부분 (돌을 놓은 뒤): 수순 기록, 해시 갱신
+        self.moves.append((x, y, self.current_turn)) # 둔 순서대로 기록
+        self.move_count += 1
+        self.hash ^= self.zobrist[y * self.size + x][self.current_turn]
+        if self.redo_moves and not self._redoing:
+            self.redo_moves = [] # 새 수를 두면 되돌렸던 수들은 버린다
+
+    def undo(self): # 마지막 수 되돌리기, (성공여부, 메시지)
+        if not self.moves:
+            return False, "NO_MOVES"
+        x, y, color = self.moves.pop()
+        self.clear_cell(x, y, color)
+        self.move_count -= 1
+        self.hash ^= self.zobrist[y * self.size + x][color]
+        self.current_turn = color # 그 수를 둔 사람 차례로 돌아간다
+        self.winner = None # 마지막 수 전에는 끝나지 않은 판이었다
+        self.redo_moves.append((x, y))
+        return True, "OK"
+
+    def redo(self): # undo로 되돌린 수 다시 두기
+        if not self.redo_moves:
+            return False, "NO_MOVES"
+        x, y = self.redo_moves.pop()
+        self._redoing = True
+        try:
+            return self.place_stone(x, y)
+        finally:
+            self._redoing = False
+
+    def clear_cell(self, x, y, color): # undo용, 보드 구현마다 다르다
+        self.board[y][x] = EMPTY
+
     def check_win(self, x, y): #승리 체크하기
         color = self.board[y][x]
         if color == EMPTY: # 안전 장치
             return False
 
-        directions = [
-            (1, 0),   # 오른쪽
-            (0, 1),   # 아래쪽
-            (1, 1),   # 대각선 오른쪽 아래 방향
-            (1, -1),  # 대각선 오른쪽 위 방향
-        ]
-
-        for dx, dy in directions:
+        # 미리 계산한 줄 테이블로 (x, y)를 지나는 네 방향만 본다, 보드 크기와 상관없이 O(win_length)
+        board = self.board
+        for forward, backward in self.lines[y * self.size + x]:
             count = 1 # 방금 둔걸 하나로 치고 시작 (1로 초기화)
-            # dx=1 dy=0
-            # dx=0 dy=1
-            # dx=1 dy=1
-            # dx=1 dy=-1
-            #순서로 꺼내기
-
-            nx, ny = x + dx, y + dy
-            while self.in_bounds(nx, ny) and self.board[ny][nx] == color:
+            for nx, ny in forward:
+                if board[ny][nx] != color:
+                    break
                 count += 1
-                nx += dx
-                ny += dy
-
-            nx, ny = x - dx, y - dy #반대 방향으로도 검사하기
-            while self.in_bounds(nx, ny) and self.board[ny][nx] == color:
+            for nx, ny in backward: #반대 방향으로도 검사하기
+                if board[ny][nx] != color:
+                    break
                 count += 1
-                nx -= dx
-                ny -= dy
-
-            if count >= 5: #총 5개이상이면
+            if count == self.win_length or (count > self.win_length and not self.exact):
                 return True
 
         return False
@@ -84,11 +170,205 @@ class OmokGame:
             "turn": self.current_turn,
             "winner": self.winner,
             "move_count": self.move_count,
+            "game_id": self.game_id,
+            "rules": self.rules,
         }
 
+    def moves_since(self, count): # count번째 수 이후에 둔 수들 [(x, y, color), ...]
+        return self.moves[count:]
+
     def reset(self):
         """Restart the match with a clean board and counters."""
-        self.board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)] #처음 시작하면 모든 칸 EMPTY
+        self.board = [[EMPTY for _ in range(self.size)] for _ in range(self.size)] #처음 시작하면 모든 칸 EMPTY
         self.current_turn = BLACK # 시작은 흑이 먼저
         self.winner = None # 승자는 없는 상태로 시작
         self.move_count = 0 #둔 돌 0 개로 시작
+        self.moves = [] # 수순 기록 (x, y, color), undo 스택이기도 하다
+        self.redo_moves = [] # undo로 되돌린 수 (x, y), redo 하면 여기서 꺼낸다
+        self._redoing = False
+        self.hash = 0 # 빈 보드의 Zobrist 해시
+        self.game_id += 1
+
+
+# 비트보드 엔진: OmokGame과 같은 place_stone / get_state 규칙을 지키면서
+# 색깔마다 보드 전체를 파이썬 int 하나의 비트로 들고 있는다
+# 칸 (x, y)는 y * stride + x 번째 비트이고 (stride = size + 1), 각 줄 끝에 항상 비어있는 패딩 칸을 하나 둬서
+# 가로/대각선으로 시프트할 때 다음 줄로 넘어가 이어지는 일이 없게 한다
+# 네 방향(가로, 세로, 대각선 ↘, 대각선 ↙)은 시프트 크기 1, stride, stride + 1, stride - 1
+
+
+def run_starts(bits, shift, length): # shift 방향으로 length개 연속인 줄의 시작 비트들 (시프트 & 마스크)
+    runs = bits
+    covered = 1
+    while covered * 2 <= length: # 2개, 4개, 8개 ... 연속으로 두 배씩 늘린다
+        runs &= runs >> (covered * shift)
+        covered *= 2
+    if covered < length:
+        runs &= runs >> ((length - covered) * shift)
+    return runs
+
+
+def bit_line_table(size, win_length):
+    # line_table의 비트보드판: table[y * size + x] = 방향마다 (시프트, 줄 마스크, 시작 마스크)
+    # 줄 마스크 = (x, y)를 지나는 그 방향 줄에서 앞뒤 win_length - 1칸까지 (보드 밖은 빠진다)
+    # 시작 마스크 = (x, y)를 포함하는 win_length칸 줄이 시작할 수 있는 칸, 뒤로 win_length - 1칸까지
+    key = (size, win_length)
+    table = _bit_line_tables.get(key)
+    if table is None:
+        stride = size + 1
+        table = []
+        for y in range(size):
+            for x in range(size):
+                lines = []
+                for (dx, dy), shift in zip(DIRECTIONS, (1, stride, stride + 1, stride - 1)):
+                    if dy < 0: # 비트 순서가 앞으로 가도록 ↗ 대신 ↙ (시프트 stride - 1)
+                        dx, dy = -dx, -dy
+                    line = starts = 0
+                    for step in range(-(win_length - 1), win_length):
+                        nx, ny = x + dx * step, y + dy * step
+                        if 0 <= nx < size and 0 <= ny < size:
+                            line |= 1 << (ny * stride + nx)
+                            if step <= 0:
+                                starts |= 1 << (ny * stride + nx)
+                    lines.append((shift, line, starts))
+                table.append(tuple(lines))
+        _bit_line_tables[key] = table
+    return table
+
+
+class BitboardOmokGame(OmokGame):
+    def __init__(self, size=BOARD_SIZE, win_length=WIN_LENGTH, exact=False):
+        self.stride = size + 1
+        self.bit_lines = bit_line_table(size, win_length)
+        self._board = None # board 속성 캐시, 돌이 바뀌면 버린다
+        super().__init__(size, win_length, exact)
+
+    @property
+    def board(self): # 기존 코드/클라이언트용 2차원 리스트, 돌이 바뀐 뒤 처음 볼 때만 비트에서 만든다 (고쳐 쓰지 말 것)
+        if self._board is None:
+            black, white = self.bits[BLACK], self.bits[WHITE]
+            stride = self.stride
+            self._board = [
+                [BLACK if black >> (y * stride + x) & 1 else WHITE if white >> (y * stride + x) & 1 else EMPTY
+                 for x in range(self.size)]
+                for y in range(self.size)
+            ]
+        return self._board
+
+    def place_stone(self, x, y):
+        if not self.in_bounds(x, y):
+            return False, "OUT_OF_BOUNDS"
+
+        bit = 1 << (y * self.stride + x)
+        if (self.bits[BLACK] | self.bits[WHITE]) & bit:
+            return False, "ALREADY_OCCUPIED"
+
+        if self.winner is not None:
+            return False, "GAME_ALREADY_OVER"
+
+        bits = self.bits[self.current_turn] = self.bits[self.current_turn] | bit
+        self._board = None
+        self._record_move(x, y)
+
+        if self._line_win(bits, y * self.size + x):
+            self.winner = self.current_turn
+            return True, "WIN"
+
+        if self.move_count == self.size * self.size:
+            self.winner = 0
+            return True, "DRAW"
+
+        self.current_turn = WHITE if self.current_turn == BLACK else BLACK
+        return True, "OK"
+
+    def check_win(self, x, y):
+        # 승리 줄이 있다면 방금 둔 (x, y)를 지나므로, 그 돌 색깔의 비트 중 (x, y)를 지나는 줄 마스크 안만 본다
+        # 마스크 안 돌이 length개보다 적으면 시프트 없이 바로 넘어간다 (대부분의 수)
+        bit = 1 << (y * self.stride + x)
+        bits = self.bits[BLACK]
+        if not bits & bit:
+            bits = self.bits[WHITE]
+            if not bits & bit:
+                return False
+        return self._line_win(bits, y * self.size + x)
+
+    def _line_win(self, bits, cell): # bits(한 색깔)에 cell을 지나는 승리 줄이 있는지
+        length = self.win_length
+        for shift, mask, start_mask in self.bit_lines[cell]:
+            line = bits & mask
+            if line.bit_count() < length:
+                continue
+            starts = run_starts(line, shift, length) & start_mask
+            if self.exact and starts:
+                # 앞 칸과 length칸 뒤가 내 돌이 아니어야 정확히 length개 (마스크 밖까지 봐야 하므로 전체 비트로)
+                starts &= ~(bits << shift) & ~(bits >> (length * shift))
+            if starts:
+                return True
+        return False
+
+    def clear_cell(self, x, y, color):
+        self.bits[color] &= ~(1 << (y * self.stride + x))
+        self._board = None
+
+    def reset(self):
+        """Restart in O(1): only the two colour bitboards and counters are replaced."""
+        self.bits = [0, 0, 0] # 인덱스 = 색깔 (EMPTY 자리는 쓰지 않음)
+        self._board = None
+        self.current_turn = BLACK
+        self.winner = None
+        self.move_count = 0
+        self.moves = []
+        self.redo_moves = []
+        self._redoing = False
+        self.hash = 0
+        self.game_id += 1
+
+
+# 치환표(transposition table): Zobrist 해시 -> 탐색 결과
+# 크기가 2의 거듭제곱인 슬롯 배열이고 hash의 아래 비트로 슬롯을 고른다 (메모리 상한이 고정)
+# 슬롯이 겹치면 더 깊게 탐색한 결과를 남기되, 지난 탐색(generation)에서 남은 것은 바로 덮어쓴다
+EXACT = 0 # value가 정확한 값
+LOWER = 1 # value 이상 (beta cut)
+UPPER = 2 # value 이하 (alpha를 못 넘음)
+
+
+class TranspositionTable:
+    def __init__(self, bits=16):
+        self.mask = (1 << bits) - 1
+        self.slots = [None] * (1 << bits) # (key, depth, value, flag, best_move, generation)
+        self.generation = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self): # 새 탐색을 시작할 때 호출, 이전 결과는 교체 우선순위가 낮아진다
+        self.generation += 1
+
+    def lookup(self, key): # (depth, value, flag, best_move) 또는 None
+        entry = self.slots[key & self.mask]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[1:5]
+
+    def store(self, key, depth, value, flag, best_move=None):
+        index = key & self.mask
+        old = self.slots[index]
+        if old is not None and old[0] != key and old[5] == self.generation and old[1] > depth:
+            return False # 이번 탐색에서 더 깊게 본 다른 국면이 있으면 남겨둔다
+        self.slots[index] = (key, depth, value, flag, best_move, self.generation)
+        self.stores += 1
+        return True
+
+    def clear(self):
+        self.slots = [None] * len(self.slots)
+        self.hits = 0
+        self.stores = 0
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
+
+
+ENGINES = { # 서버 --engine 옵션으로 고르는 보드 구현
+    "list": OmokGame,
+    "bitboard": BitboardOmokGame,
+}
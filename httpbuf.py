@@ -0,0 +1,211 @@
+# httpbuf.py
+# 연결 하나에 붙여 쓰는 HTTP 수신 버퍼 (서버/클라이언트 공용)
+# - bytearray 하나에 recv_into로 바로 받는다 (data += chunk 처럼 받을 때마다 지금까지 받은 것을 복사하지 않는다)
+# - 헤더 끝(\r\n\r\n)은 새로 받은 부분에서만 찾는다
+# - 메시지 하나를 꺼내고 남은 bytes는 버리지 않고 다음 메시지에 쓴다 (HTTP/1.1 파이프라이닝)
+# python httpbuf.py 로 예전 방식(bytes 이어 붙이기 + split)과 요청당 파싱 비용을 비교한다
+import argparse
+import time
+
+HEAD_END = b"\r\n\r\n"
+INITIAL_SIZE = 8192
+IDLE_SIZE = 64 * 1024 # 다 비었을 때 버퍼가 이보다 크면 처음 크기로 줄인다 (큰 body 하나 때문에 계속 잡고 있지 않게)
+
+
+class RecvBuffer:
+    # 잘못된 메시지는 ValueError("HEADER_TOO_LARGE" / "INCOMPLETE_HEADER" / "INCOMPLETE_BODY")
+    # 소켓 오류/timeout은 그대로 올라간다
+    def __init__(self, sock, initial=b"", size=INITIAL_SIZE):
+        self.sock = sock
+        self.buffer = bytearray(max(size, len(initial) * 2))
+        self.buffer[:len(initial)] = initial
+        self.start = 0 # 아직 꺼내지 않은 데이터 [start, end)
+        self.end = len(initial)
+        self.scanned = 0 # 헤더 끝을 이미 찾아본 위치
+
+    def __len__(self): # 받아 두고 아직 꺼내지 않은 바이트 수
+        return self.end - self.start
+
+    def pending(self): # 받아 두고 아직 꺼내지 않은 bytes (연결을 다른 워커에 넘길 때 같이 넘긴다)
+        return bytes(self.buffer[self.start:self.end])
+
+    def writable(self): # 다음에 받을 자리 (memoryview), asyncio BufferedProtocol.get_buffer도 이걸 돌려준다
+        if self.start == self.end: # 다 꺼냈으면 처음부터 다시 쓴다
+            self.start = self.end = self.scanned = 0
+            if len(self.buffer) > IDLE_SIZE:
+                self.buffer = bytearray(INITIAL_SIZE)
+        if self.end == len(self.buffer):
+            if self.start: # 앞쪽 빈 공간으로 당긴다
+                size = self.end - self.start
+                self.buffer[:size] = self.buffer[self.start:self.end]
+                self.scanned -= self.start
+                self.start, self.end = 0, size
+            else: # 꽉 찼으면 두 배로
+                self.buffer.extend(bytes(len(self.buffer)))
+        return memoryview(self.buffer)[self.end:]
+
+    def commit(self, received): # writable()에 received 바이트를 받았다
+        self.end += received
+
+    def _fill(self): # recv_into 한 번, 받은 바이트 수 (0 = 상대가 닫음)
+        with self.writable() as view:
+            received = self.sock.recv_into(view)
+        self.commit(received)
+        return received
+
+    def take_head(self, limit): # 받아 둔 것 중에 헤더가 끝났으면 빈 줄 앞까지의 bytes, 아직이면 None (소켓은 안 건드린다)
+        index = self.buffer.find(HEAD_END, max(self.start, self.scanned - 3), self.end) if self.end > self.start else -1
+        if index >= 0:
+            head = bytes(memoryview(self.buffer)[self.start:index])
+            self.start = self.scanned = index + 4
+            return head
+        self.scanned = self.end
+        if self.end - self.start > limit:
+            raise ValueError("HEADER_TOO_LARGE")
+        return None
+
+    def take_body(self, length): # 받아 둔 것이 length 바이트 이상이면 꺼낸다, 아직이면 None
+        if self.end - self.start < length:
+            return None
+        body = bytes(memoryview(self.buffer)[self.start:self.start + length])
+        self.start += length
+        self.scanned = max(self.scanned, self.start)
+        return body
+
+    def read_head(self, limit): # 헤더 끝까지 꺼낸다 -> 빈 줄 앞까지의 bytes, 메시지 사이에서 연결이 닫혔으면 None
+        while True:
+            head = self.take_head(limit)
+            if head is not None:
+                return head
+            if not self._fill():
+                if self.start == self.end:
+                    return None
+                raise ValueError("INCOMPLETE_HEADER")
+
+    def read_body(self, length): # body length 바이트를 꺼낸다
+        while True:
+            body = self.take_body(length)
+            if body is not None:
+                return body
+            if not self._fill():
+                raise ValueError("INCOMPLETE_BODY")
+
+
+# ---------------------------------------------------------------------------
+# 벤치마크: 같은 요청들을 예전 방식과 RecvBuffer로 파싱하는 데 드는 시간 (네트워크 없이)
+# ---------------------------------------------------------------------------
+
+class _ReplaySocket: # 미리 만든 bytes를 chunk 크기씩 돌려주는 가짜 소켓
+    def __init__(self, data, chunk=4096):
+        self.data = memoryview(data)
+        self.offset = 0
+        self.chunk = chunk
+
+    def recv(self, size):
+        end = self.offset + min(size, self.chunk)
+        piece = self.data[self.offset:end].tobytes()
+        self.offset += len(piece)
+        return piece
+
+    def recv_into(self, view):
+        size = min(len(view), self.chunk, len(self.data) - self.offset)
+        view[:size] = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return size
+
+
+def _legacy_read_request(conn): # 예전 Server.read_http_request의 읽기 부분 (남은 bytes는 버려진다)
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    if not data:
+        return None
+    header_bytes, body = data.split(b"\r\n\r\n", 1)
+    content_length = _content_length(header_bytes)
+    while len(body) < content_length:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        body += chunk
+    return header_bytes, body[:content_length]
+
+
+def _buffered_read_request(reader):
+    head = reader.read_head(1 << 20)
+    if head is None:
+        return None
+    return head, reader.read_body(_content_length(head))
+
+
+def _content_length(head):
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            return int(value)
+    return 0
+
+
+def sample_requests(body_size):
+    move = b'{"token": "00000001a1b2c3d4e5f60718293a4b5c", "x": 7, "y": 9}'
+    state = b"GET /state?token=00000001a1b2c3d4e5f60718293a4b5c&since=41&delta=1 HTTP/1.1\r\n"
+    state += b"Host: localhost:6000\r\nAccept: application/x-omok\r\nConnection: keep-alive\r\n\r\n"
+    big = b'{"msg": "' + b"x" * body_size + b'"}'
+    return {
+        "move": _post(b"/move", move),
+        "state": state,
+        f"chat-{len(big) // 1024}k": _post(b"/chat", big),
+    }
+
+
+def _post(path, body):
+    return (
+        b"POST " + path + b" HTTP/1.1\r\nHost: localhost:6000\r\nContent-Type: application/json\r\n"
+        + b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: keep-alive\r\n\r\n" + body
+    )
+
+
+def benchmark(count, body_size, chunk):
+    results = []
+    for name, request in sample_requests(body_size).items():
+        rounds = max(1, count // max(1, len(request) // 1024))
+        started = time.perf_counter()
+        for _ in range(rounds): # 예전 방식은 남은 bytes를 버리므로 요청마다 새 연결
+            assert _legacy_read_request(_ReplaySocket(request, chunk)) is not None
+        legacy = (time.perf_counter() - started) / rounds
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            assert _buffered_read_request(RecvBuffer(_ReplaySocket(request, chunk))) is not None
+        buffered = (time.perf_counter() - started) / rounds
+
+        reader = RecvBuffer(_ReplaySocket(request * rounds, chunk)) # 한 연결에 파이프라이닝
+        started = time.perf_counter()
+        parsed = 0
+        while _buffered_read_request(reader) is not None:
+            parsed += 1
+        pipelined = (time.perf_counter() - started) / rounds
+        assert parsed == rounds
+        results.append((name, len(request), legacy, buffered, pipelined))
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP request parsing microbenchmark (legacy vs RecvBuffer)")
+    parser.add_argument("--count", type=int, default=20000, help="Requests parsed per case (fewer for large bodies)")
+    parser.add_argument("--body", type=int, default=256 * 1024, help="Body size of the large request case")
+    parser.add_argument("--chunk", type=int, default=4096, help="Bytes returned by each recv")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"{'request':<10} {'bytes':>8} {'legacy us':>10} {'buffer us':>10} {'pipelined us':>13}")
+    for name, size, legacy, buffered, pipelined in benchmark(args.count, args.body, args.chunk):
+        print(f"{name:<10} {size:>8} {legacy * 1e6:>10.2f} {buffered * 1e6:>10.2f} {pipelined * 1e6:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+# journal.py
+# 모든 방의 이벤트(수, 입장, 퇴장, 채팅, 재시작, 승패)를 바이너리로 이어 쓰는 기록 파일
+# 끝난 판도 game.reset()으로 사라지지 않고 남으므로 나중에 다시 보거나 통계를 낼 수 있다
+#
+# 파일 = 헤더(MAGIC + 버전) + 레코드들, 레코드는 앞 1바이트가 종류
+#   수:   고정 18바이트 <B I I I B B B H>  종류, 방, seq, game_id, x, y, 색, 몇 번째 수
+#   승패: 고정 14바이트 <B I I I B>      종류, 방, seq, game_id, 승자(0 = 무승부)
+#   그 외(입장/퇴장/채팅/재시작): <B I I I H> + JSON  종류, 방, seq, game_id, 길이, 내용
+#   방:   같은 형식, 내용은 {"rules": 보드 규칙}, 파일마다 방이 처음 나오기 전에 한 번 (다시 둘 때 규칙을 알기 위해)
+# seq는 방의 state_version (이벤트 번호)
+# 한 판이 여러 파일에 나뉠 수 있으므로 (파일 크기 제한, 서버 재시작) 다시 두기는 디렉터리 단위로 한다
+# 쓰기는 메모리 버퍼에 모았다가 백그라운드 스레드가 한꺼번에 쓰고 flush 한다 (방 락 안에서 디스크를 기다리지 않도록)
+# 읽기는 파일을 mmap 해서 필요한 레코드만 꺼낸다 (파일 전체를 메모리에 올리지 않는다)
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections import namedtuple
+
+from game import OmokGame
+
+MAGIC = b"OMKJ"
+VERSION = 2
+FILE_HEADER = MAGIC + bytes([VERSION])
+
+MOVE = 1
+WIN = 2
+JOIN = 3
+QUIT = 4
+CHAT = 5
+RESTART = 6
+ROOM = 7
+KIND_CODES = {"move": MOVE, "win": WIN, "join": JOIN, "quit": QUIT, "chat": CHAT, "restart": RESTART, "room": ROOM}
+KIND_NAMES = {code: kind for kind, code in KIND_CODES.items()}
+
+MOVE_RECORD = struct.Struct("<BIIIBBBH")
+WIN_RECORD = struct.Struct("<BIIIB")
+VAR_HEADER = struct.Struct("<BIIIH")
+MAX_PAYLOAD = 0xFFFF
+MAX_TEXT = 1000 # 문자열 필드는 이 글자 수까지만 남긴다 (인코딩한 뒤 자르면 JSON이 깨진다)
+
+FLUSH_INTERVAL = 0.5 # 버퍼를 파일에 쓰는 주기(초)
+MAX_BUFFER_BYTES = 256 * 1024 # 이만큼 쌓이면 주기를 기다리지 않고 쓴다
+MAX_FILE_BYTES = 64 * 1024 * 1024 # 파일 하나의 최대 크기, 넘으면 다음 번호 파일로
+FILE_PATTERN = "journal-{:06d}.bin"
+
+Record = namedtuple("Record", "kind room seq game_id data offset")
+
+
+def encode_record(kind, room_id, seq, game_id, data): # 이벤트 하나 -> bytes, 기록하지 않는 이벤트면 None
+    code = KIND_CODES.get(kind)
+    if code == MOVE:
+        return MOVE_RECORD.pack(MOVE, room_id, seq, game_id, data["x"], data["y"], data["color"], data["move_count"])
+    if code == WIN:
+        return WIN_RECORD.pack(WIN, room_id, seq, game_id, data["winner"])
+    if code is None:
+        return None
+    if code == RESTART: # 투표 중(PENDING)인 재시작은 판에 영향이 없어서 남기지 않는다
+        if data.get("status") != "RESTARTED":
+            return None
+        data = {"status": data["status"]}
+    elif code in (JOIN, QUIT):
+        data = {"name": data.get("name"), "color": data.get("color")}
+    data = {key: value[:MAX_TEXT] if isinstance(value, str) else value for key, value in data.items()}
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(payload) > MAX_PAYLOAD: # 그래도 길이 칸에 안 들어가면 남기지 않는다
+        return None
+    return VAR_HEADER.pack(code, room_id, seq, game_id, len(payload)) + payload
+
+
+def decode_record(buf, offset): # buf[offset:]의 레코드 하나 -> (Record, 다음 offset)
+    code = buf[offset]
+    if code == MOVE:
+        _code, room_id, seq, game_id, x, y, color, move_count = MOVE_RECORD.unpack_from(buf, offset)
+        data = {"x": x, "y": y, "color": color, "move_count": move_count}
+        end = offset + MOVE_RECORD.size
+    elif code == WIN:
+        _code, room_id, seq, game_id, winner = WIN_RECORD.unpack_from(buf, offset)
+        data = {"winner": winner}
+        end = offset + WIN_RECORD.size
+    elif code in KIND_NAMES:
+        _code, room_id, seq, game_id, length = VAR_HEADER.unpack_from(buf, offset)
+        start = offset + VAR_HEADER.size
+        end = start + length
+        if end > len(buf):
+            raise ValueError("TRUNCATED_RECORD")
+        try:
+            data = json.loads(bytes(buf[start:end]).decode("utf-8"))
+        except ValueError: # 내용이 깨졌어도 길이는 맞으므로 다음 레코드는 읽을 수 있다, data None으로
+            data = None
+    else:
+        raise ValueError(f"UNKNOWN_RECORD_KIND {code}")
+    return Record(KIND_NAMES[code], room_id, seq, game_id, data, offset), end
+
+
+def journal_files(directory): # 번호 순서대로
+    names = sorted(n for n in os.listdir(directory) if n.startswith("journal-") and n.endswith(".bin"))
+    return [os.path.join(directory, name) for name in names]
+
+
+class JournalWriter:
+    def __init__(self, directory, flush_interval=FLUSH_INTERVAL, max_file_bytes=MAX_FILE_BYTES, sync=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.sync = sync # True면 flush마다 fsync (전원이 나가도 남게)
+        self.lock = threading.Lock() # pending 버퍼만 지킨다, 방 락 안에서 잡히므로 디스크 I/O는 이 락 밖에서
+        self.flushed = threading.Condition(self.lock)
+        self.file_lock = threading.Lock() # 파일 쓰기 (꺼낸 순서대로 하나씩)
+        self.pending = [] # 아직 파일에 쓰지 않은 레코드 bytes
+        self.pending_bytes = 0
+        self.records = 0
+        self.room_headers = {} # 방 번호 -> 방 레코드 bytes, 새 파일을 열 때마다 맨 앞에 다시 쓴다
+        self.closed = False
+        existing = journal_files(directory)
+        last = int(os.path.basename(existing[-1])[8:-4]) if existing else 0
+        self.file_number = last + 1 # 재시작하면 항상 새 번호 파일에 쓴다
+        self.file = None
+        self._open_next(b"")
+        self.thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self.thread.start()
+
+    def _open_next(self, room_headers): # file_lock 안에서
+        if self.file is not None:
+            self.file.close()
+        path = os.path.join(self.directory, FILE_PATTERN.format(self.file_number))
+        self.file_number += 1
+        self.file = open(path, "ab")
+        headers = FILE_HEADER + room_headers # 파일 하나만 읽어도 그 안의 방 규칙을 알 수 있게
+        self.file.write(headers)
+        self.file_bytes = self.header_bytes = len(headers)
+
+    # 방 락 안에서 불려도 되도록 버퍼에만 넣는다
+    # rules를 주면 이 방이 처음 나올 때 방 레코드를 먼저 넣는다
+    def append(self, kind, room_id, seq, game_id, data, rules=None):
+        record = encode_record(kind, room_id, seq, game_id, data)
+        if record is None:
+            return
+        with self.lock:
+            if rules is not None and room_id not in self.room_headers:
+                header = encode_record("room", room_id, seq, game_id, {"rules": rules})
+                self.room_headers[room_id] = header
+                self._push_locked(header)
+            self._push_locked(record)
+
+    def _push_locked(self, record):
+        self.pending.append(record)
+        self.pending_bytes += len(record)
+        if self.pending_bytes >= MAX_BUFFER_BYTES:
+            self.flushed.notify_all()
+
+    def on_event(self, room, seq, kind, data): # room.event_listeners에 등록하는 콜백
+        self.append(kind, room.room_id, seq, room.game.game_id, data, room.game.rules)
+
+    def _flush_loop(self):
+        closed = False
+        while not closed:
+            with self.lock:
+                self.flushed.wait_for(lambda: self.closed or self.pending_bytes >= MAX_BUFFER_BYTES, self.flush_interval)
+                closed = self.closed
+            self._write_pending()
+
+    def _write_pending(self): # 버퍼는 락 안에서 바꿔치기만 하고, 쓰기/flush/fsync는 락 밖에서
+        with self.file_lock:
+            with self.lock:
+                if not self.pending:
+                    return
+                batch = self.pending
+                self.pending = []
+                self.pending_bytes = 0
+                room_headers = b"".join(self.room_headers.values())
+            data = b"".join(batch)
+            self.records += len(batch)
+            if self.file_bytes + len(data) > self.max_file_bytes and self.file_bytes > self.header_bytes:
+                self._open_next(room_headers)
+            self.file.write(data)
+            self.file.flush()
+            if self.sync:
+                os.fsync(self.file.fileno())
+            self.file_bytes += len(data)
+
+    def flush(self): # 지금까지 append한 것을 바로 파일에 쓰기
+        self._write_pending()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.flushed.notify_all()
+        self.thread.join() # 남은 버퍼는 flush 스레드가 마지막으로 쓴다
+        with self.file_lock:
+            self.file.close()
+
+
+class JournalReader:
+    # 파일 하나를 mmap 해서 읽는다, 레코드는 필요할 때 그 위치에서 바로 디코딩
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if size and self.buf[:len(FILE_HEADER)] != FILE_HEADER:
+            self.close()
+            raise ValueError("NOT_A_JOURNAL")
+        self._game_index = None
+        self._rules = None
+
+    def __iter__(self): # 레코드를 앞에서부터 하나씩, 끝부분이 덜 써진 레코드면 거기서 멈춘다 (내용이 깨진 레코드는 건너뛴다)
+        buf = self.buf
+        offset = len(FILE_HEADER)
+        end = len(buf)
+        while offset < end:
+            try:
+                record, offset = decode_record(buf, offset)
+            except (ValueError, struct.error):
+                return
+            if record.data is not None:
+                yield record
+
+    def read_at(self, offset): # 레코드 위치로 바로 읽기 (random access)
+        return decode_record(self.buf, offset)[0]
+
+    def game_index(self):
+        # (방, game_id) -> 그 판 첫 레코드 위치
+        # 위치는 array('Q')에 모아서 판이 아주 많아도 레코드 객체를 메모리에 쌓지 않는다
+        # 방 레코드는 판에 속하지 않고, 방 번호 -> 규칙으로 따로 모은다
+        if self._game_index is None:
+            keys = {}
+            offsets = array("Q")
+            rules = {}
+            for record in self:
+                if record.kind == "room":
+                    rules.setdefault(record.room, record.data["rules"])
+                    continue
+                key = (record.room, record.game_id)
+                if key not in keys:
+                    keys[key] = len(offsets)
+                    offsets.append(record.offset)
+            self._game_index = (keys, offsets)
+            self._rules = rules
+        return self._game_index
+
+    def room_rules(self, room_id): # 방 레코드에 남은 보드 규칙, 없으면 None (방 레코드가 없던 예전 기록)
+        self.game_index()
+        return self._rules.get(room_id)
+
+    def games(self): # 이 파일에 들어있는 (방, game_id) 목록
+        return list(self.game_index()[0])
+
+    def game_records(self, room_id, game_id): # 이 파일에 있는 한 판의 레코드들 (그 판 시작 위치부터 읽는다)
+        keys, offsets = self.game_index()
+        index = keys.get((room_id, game_id))
+        if index is None:
+            return
+        buf = self.buf
+        offset = offsets[index]
+        while offset < len(buf):
+            try:
+                record, offset = decode_record(buf, offset)
+            except (ValueError, struct.error):
+                return
+            if record.room != room_id or record.kind == "room" or record.data is None:
+                continue
+            if record.game_id != game_id:
+                return
+            yield record
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_records(directory): # 디렉터리의 모든 journal 파일을 순서대로
+    for path in journal_files(directory):
+        with JournalReader(path) as reader:
+            yield from reader
+
+
+def room_rules(directory, room_id): # 기록에 남은 그 방의 보드 규칙, 없으면 None
+    for path in journal_files(directory):
+        with JournalReader(path) as reader:
+            rules = reader.room_rules(room_id)
+        if rules is not None:
+            return rules
+    return None
+
+
+def game_records(directory, room_id, game_id): # 한 판의 레코드들, 여러 파일에 나뉘어 있어도 파일 순서대로 이어서
+    for path in journal_files(directory):
+        with JournalReader(path) as reader:
+            if (room_id, game_id) in reader.game_index()[0]:
+                yield from reader.game_records(room_id, game_id)
+
+
+# 한 판을 처음부터 다시 두어 본 게임 객체, 규칙을 주지 않으면 기록에 남은 그 방의 규칙으로
+# 수마다 남긴 번호와 색이 이어지지 않으면 (판의 앞부분이 든 파일이 없는 등) 엉뚱한 보드 대신 ValueError
+def replay(directory, room_id, game_id, game_class=OmokGame, **rules):
+    game = game_class(**(rules or room_rules(directory, room_id) or {}))
+    for record in game_records(directory, room_id, game_id):
+        if record.kind != "move":
+            continue
+        if record.data["move_count"] != game.move_count + 1:
+            raise ValueError("GAME_START_MISSING" if game.move_count == 0 else "MOVES_MISSING")
+        if record.data["color"] != game.current_turn:
+            raise ValueError("COLOR_MISMATCH")
+        ok, msg = game.place_stone(record.data["x"], record.data["y"])
+        if not ok:
+            raise ValueError(f"INVALID_MOVE {msg}")
+    return game
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect an Omok game journal")
+    parser.add_argument("directory", help="Journal directory written by Server.py --journal")
+    parser.add_argument("--room", type=int, help="Room id of the game to replay")
+    parser.add_argument("--game", type=int, help="game_id of the game to replay (with --room)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.room is not None and args.game is not None:
+        print(f"rules: {room_rules(args.directory, args.room) or 'not recorded (defaults)'}")
+        for record in game_records(args.directory, args.room, args.game):
+            print(record.seq, record.kind, record.data)
+        try:
+            game = replay(args.directory, args.room, args.game)
+        except ValueError as exc:
+            raise SystemExit(f"cannot replay: {exc}")
+        print(f"replayed: moves={game.move_count} winner={game.winner}")
+        return
+
+    counts = {kind: 0 for kind in KIND_CODES}
+    games = set()
+    for record in iter_records(args.directory):
+        counts[record.kind] += 1
+        if record.kind == "win":
+            games.add((record.room, record.game_id))
+    print(f"records: {sum(counts.values())} " + " ".join(f"{kind}={n}" for kind, n in counts.items()))
+    print(f"finished games: {len(games)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+# loadtest.py
+# 서버를 로컬에 띄우고 가짜 클라이언트 여러 명으로 부하를 주는 벤치마크
+# 플레이어는 두 명씩 방 하나에 들어가 번갈아 두고(생각 시간 포함), 끝나면 재시작, 가끔 채팅
+# 관전자는 long-poll(/state?since=)로 상태를 따라간다
+# 라우트별 처리량, 지연시간 p50/p95/p99, 오류율, 서버 RSS 변화를 출력하고 --json으로 저장한다
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import protocol
+from protocol import (
+    apply_state_delta,
+    create_room,
+    join_server,
+    request_state,
+    restart_game,
+    send_chat,
+    set_server,
+    set_wire_format,
+    submit_move,
+)
+
+POLL_TIMEOUT = 2 # 관전자/상대 차례일 때 long-poll 대기 시간(초)
+CHAT_CHANCE = 0.05 # 한 번 둘 때마다 채팅을 보낼 확률
+RSS_INTERVAL = 1.0 # 서버 메모리 측정 주기(초)
+
+
+class Recorder:
+    # 스레드마다 자기 리스트에 쌓고, 끝날 때 합친다 (측정이 병목이 되지 않도록 락 없음)
+    def __init__(self):
+        self.local = threading.local()
+        self.all = []
+        self.lock = threading.Lock()
+
+    def _samples(self):
+        samples = getattr(self.local, "samples", None)
+        if samples is None:
+            samples = self.local.samples = []
+            with self.lock:
+                self.all.append(samples)
+        return samples
+
+    def call(self, route, func, *args, **kwargs): # 요청 하나를 재고 응답을 그대로 돌려준다
+        start = time.perf_counter()
+        resp = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        status = resp.get("status")
+        self._samples().append((route, elapsed, status))
+        return resp
+
+    def merged(self):
+        with self.lock:
+            return [sample for samples in self.all for sample in samples]
+
+
+def percentile(sorted_values, fraction): # nearest-rank
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def merge_state(state, resp):
+    if not resp.get("state"):
+        return state
+    merged = apply_state_delta(state, resp["state"])
+    if merged is None or merged.get("version", 0) < state.get("version", 0):
+        return state
+    return merged
+
+
+def pick_move(state, rng): # 가운데 근처 빈 칸 아무거나 (실제 대국처럼 돌이 모이게)
+    board = state["board"]
+    size = len(board)
+    center = size // 2
+    spread = 2 + state.get("move_count", 0) // 8
+    for _ in range(50):
+        x = min(size - 1, max(0, center + rng.randint(-spread, spread)))
+        y = min(size - 1, max(0, center + rng.randint(-spread, spread)))
+        if board[y][x] == 0:
+            return x, y
+    empty = [(x, y) for y in range(size) for x in range(size) if board[y][x] == 0]
+    return rng.choice(empty)
+
+
+def play(recorder, room, name, deadline, think, seed):
+    rng = random.Random(seed)
+    resp = recorder.call("join", join_server, name, room)
+    if not resp.get("ok"):
+        return
+    token = resp["token"]
+    my_color = {"BLACK": 1, "WHITE": 2}.get(resp["color"])
+    state = resp["state"]
+    while time.time() < deadline:
+        if state["winner"] is not None:
+            state = merge_state(state, recorder.call("restart", restart_game, token, have=state))
+        elif state["players"]["ready"] and state["turn"] == my_color:
+            time.sleep(rng.expovariate(1 / think) if think > 0 else 0)
+            x, y = pick_move(state, rng)
+            state = merge_state(state, recorder.call("move", submit_move, token, x, y, have=state))
+            if rng.random() < CHAT_CHANCE:
+                recorder.call("chat", send_chat, token, f"gg {name}", have=state)
+            continue
+        resp = recorder.call( # long-poll은 기다린 시간까지 지연으로 잡히므로 "poll"로 따로 센다
+            "poll", request_state, since=state["version"], timeout=POLL_TIMEOUT, have=state, room=room
+        )
+        state = merge_state(state, resp)
+        if resp.get("status") is None: # 네트워크 오류면 잠깐 쉬었다가
+            time.sleep(0.1)
+
+
+def spectate(recorder, room, deadline):
+    state = recorder.call("state", request_state, room=room).get("state")
+    while time.time() < deadline:
+        if state is None:
+            time.sleep(0.1)
+            state = recorder.call("state", request_state, room=room).get("state")
+            continue
+        resp = recorder.call( # long-poll은 기다린 시간까지 지연으로 잡히므로 "poll"로 따로 센다
+            "poll", request_state, since=state["version"], timeout=POLL_TIMEOUT, have=state, room=room
+        )
+        state = merge_state(state, resp)
+
+
+def read_rss(pid): # 리눅스 /proc에서 RSS(KiB), 못 읽으면 None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def sample_rss(pid, samples, stop, started):
+    while not stop.wait(RSS_INTERVAL):
+        rss = read_rss(pid)
+        if rss is not None:
+            samples.append((round(time.time() - started, 1), rss))
+
+
+def start_server(args):
+    cmd = [sys.executable, "-u", "Server.py", "--port", str(args.port), "--mode", args.mode, "--engine", args.engine]
+    cmd += ["--workers", str(args.workers)]
+    proc = subprocess.Popen(
+        cmd, cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    set_server("127.0.0.1", args.port)
+    for _ in range(50): # 서버가 뜰 때까지
+        if request_state().get("status") == 200:
+            return proc
+        time.sleep(0.1)
+    proc.kill()
+    raise SystemExit("server did not start")
+
+
+def summarize(samples, duration):
+    routes = {}
+    for route, elapsed, status in samples:
+        routes.setdefault(route, []).append((elapsed, status))
+    report = {}
+    for route, values in sorted(routes.items()):
+        latencies = sorted(elapsed for elapsed, _status in values)
+        errors = sum(1 for _elapsed, status in values if status is None or status >= 500)
+        rejected = sum(1 for _elapsed, status in values if status is not None and 400 <= status < 500)
+        report[route] = {
+            "requests": len(values),
+            "rps": round(len(values) / duration, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2),
+            "errors": errors,
+            "rejected": rejected, # 4xx (NOT_YOUR_TURN 등), 서버 오류와 따로 센다
+            "error_rate": round(errors / len(values), 4),
+        }
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for the HTTP Omok server")
+    parser.add_argument("--players", type=int, default=20, help="Simulated players (two per room)")
+    parser.add_argument("--spectators", type=int, default=20, help="Simulated long-polling spectators")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds to run")
+    parser.add_argument("--think", type=float, default=0.2, help="Mean seconds a player thinks before moving")
+    parser.add_argument("--mode", choices=("threaded", "asyncio"), default="threaded")
+    parser.add_argument("--engine", choices=("list", "bitboard"), default="list")
+    parser.add_argument("--port", type=int, default=6300)
+    parser.add_argument("--host", help="Use an already running server instead of starting one")
+    parser.add_argument("--wire", choices=("json", "binary"), default="json", help="Message encoding used by the fake clients")
+    parser.add_argument("--workers", type=int, default=1, help="Server processes to start (Server.py --workers)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    set_wire_format(args.wire)
+    proc = None
+    if args.host:
+        set_server(args.host, args.port)
+    else:
+        proc = start_server(args)
+    protocol.MAX_IDLE_CONNECTIONS = args.players + args.spectators + 4 # 가짜 클라이언트마다 keep-alive 연결 하나
+
+    recorder = Recorder()
+    rooms = []
+    for index in range((args.players + 1) // 2):
+        if args.workers > 1: # 방은 연결을 받은 워커에 생기므로, 새 연결로 만들어 워커들에 흩어지게
+            protocol.close_connections()
+        resp = create_room(f"load-{index}")
+        if not resp.get("ok"):
+            raise SystemExit(f"create room failed: {resp}")
+        rooms.append(resp["room"]["id"])
+
+    rss_samples = []
+    stop = threading.Event()
+    started = time.time()
+    deadline = started + args.duration
+    if proc is not None and args.workers <= 1: # 워커 모드면 proc은 감독 프로세스라 의미가 없다
+        threading.Thread(target=sample_rss, args=(proc.pid, rss_samples, stop, started), daemon=True).start()
+
+    threads = []
+    for index in range(args.players):
+        room = rooms[index // 2]
+        worker = threading.Thread(
+            target=play, args=(recorder, room, f"p{index}", deadline, args.think, args.seed + index), daemon=True
+        )
+        threads.append(worker)
+    for index in range(args.spectators):
+        room = rooms[index % len(rooms)] if rooms else None
+        threads.append(threading.Thread(target=spectate, args=(recorder, room, deadline), daemon=True))
+    for worker in threads:
+        worker.start()
+    for worker in threads:
+        worker.join(args.duration + POLL_TIMEOUT + 10)
+    elapsed = time.time() - started
+    stop.set()
+    if proc is not None:
+        proc.terminate()
+        proc.wait()
+    protocol.close_connections()
+
+    samples = recorder.merged()
+    results = {
+        "config": {
+            "players": args.players,
+            "spectators": args.spectators,
+            "duration": args.duration,
+            "think": args.think,
+            "mode": args.mode,
+            "engine": args.engine,
+            "wire": args.wire,
+            "workers": args.workers,
+        },
+        "elapsed": round(elapsed, 2),
+        "total_requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "routes": summarize(samples, elapsed),
+        "rss_kib": rss_samples,
+    }
+
+    print(f"{results['total_requests']} requests in {elapsed:.1f}s -> {results['throughput_rps']} req/s")
+    print(f"{'route':<8} {'reqs':>7} {'rps':>8} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'err':>5} {'4xx':>5}")
+    for route, row in results["routes"].items():
+        print(
+            f"{route:<8} {row['requests']:>7} {row['rps']:>8} {row['p50_ms']:>8} {row['p95_ms']:>8} "
+            f"{row['p99_ms']:>8} {row['errors']:>5} {row['rejected']:>5}"
+        )
+    if rss_samples:
+        print(f"server RSS: start {rss_samples[0][1]} KiB, peak {max(r for _t, r in rss_samples)} KiB, end {rss_samples[-1][1]} KiB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# metrics.py
+# 서버 계측: 라우트별 요청 수, 상태 코드 수, 지연시간 히스토그램, 락 대기/보유 시간, 연결 수
+# GET /metrics에서 Prometheus 텍스트 형식으로 내보낸다
+#
+# 기록은 스레드마다 자기 dict에만 더한다 (락 없음), 수집(scrape)할 때 모든 스레드 것을 합친다
+# 연결 스레드가 끝나면 retire_thread()로 자기 값을 공용 dict에 합치고 목록에서 빠진다
+# (연결마다 스레드를 만들어도 스레드별 dict가 계속 쌓이지 않게)
+import threading
+import time
+from bisect import bisect_left
+
+# 히스토그램 구간 (초), 마지막은 +Inf
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HELP = {
+    "omok_requests_total": ("counter", "HTTP requests handled, by route and status code"),
+    "omok_request_seconds": ("histogram", "Time from parsed request to response built, by route"),
+    "omok_lock_wait_seconds": ("histogram", "Time spent waiting to acquire a lock"),
+    "omok_lock_hold_seconds": ("histogram", "Time a lock was held"),
+    "omok_connections_active": ("gauge", "Open client connections"),
+    "omok_connections_total": ("counter", "Accepted client connections"),
+    "omok_admission_total": ("counter", "Rate limiter decisions, by route (allowed, token_limited, ip_limited, overloaded)"),
+    "omok_handoffs_total": ("counter", "Connections handed to the worker process that owns the room (--workers)"),
+    "omok_feed_datagrams_total": ("counter", "UDP spectator feed datagrams sent (one per target)"),
+    "omok_feed_bytes_total": ("counter", "UDP spectator feed bytes sent"),
+    "omok_feed_errors_total": ("counter", "UDP spectator feed sends that failed"),
+}
+
+
+class Metrics:
+    def __init__(self):
+        self._local = threading.local()
+        self._stores = [] # 살아있는 스레드들의 store
+        self._retired = {"counters": {}, "histograms": {}} # 끝난 스레드들의 합
+        self._lock = threading.Lock() # store 목록을 바꿀 때와 scrape 할 때만
+        self.collectors = [] # scrape 때 호출, [(이름, 종류, 설명, [(labels, 값), ...])] 를 돌려주는 함수들
+
+    def _store(self):
+        store = getattr(self._local, "store", None)
+        if store is None:
+            store = self._local.store = {"counters": {}, "histograms": {}}
+            with self._lock:
+                self._stores.append(store)
+        return store
+
+    def inc(self, name, labels=(), amount=1): # labels: (("route", "/move"), ...) 튜플
+        counters = self._store()["counters"]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, labels, seconds):
+        histograms = self._store()["histograms"]
+        key = (name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0] # 구간별 개수 + 합
+        histogram[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+
+    def retire_thread(self): # 스레드가 끝날 때 호출
+        store = getattr(self._local, "store", None)
+        if store is None:
+            return
+        self._local.store = None
+        with self._lock:
+            self._stores.remove(store)
+            _merge(self._retired, store)
+
+    def snapshot(self): # 모든 스레드의 값을 합친 (counters, histograms)
+        total = {"counters": {}, "histograms": {}}
+        with self._lock:
+            _merge(total, self._retired)
+            stores = list(self._stores)
+        for store in stores:
+            _merge(total, store)
+        return total["counters"], total["histograms"]
+
+    def render(self): # Prometheus text exposition format
+        counters, histograms = self.snapshot()
+        families = {}
+        for (name, labels), value in counters.items():
+            families.setdefault(name, []).append((labels, value))
+        lines = []
+        for name in sorted(families):
+            _add_header(lines, name)
+            for labels, value in sorted(families[name]):
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        by_name = {}
+        for (name, labels), histogram in histograms.items():
+            by_name.setdefault(name, []).append((labels, histogram))
+        for name in sorted(by_name):
+            _add_header(lines, name)
+            for labels, histogram in sorted(by_name[name], key=lambda item: item[0]):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), histogram[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram[-1]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+
+        for collect in self.collectors:
+            for name, kind, description, samples in collect():
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge(into, store):
+    # 다른 스레드가 기록 중인 dict를 읽으므로 복사해서 돈다 (크기가 바뀌면 다시 시도)
+    for kind in ("counters", "histograms"):
+        while True:
+            try:
+                items = list(store[kind].items())
+                break
+            except RuntimeError:
+                continue
+        target = into[kind]
+        for key, value in items:
+            if kind == "counters":
+                target[key] = target.get(key, 0) + value
+            else:
+                current = target.get(key)
+                target[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+
+
+def _add_header(lines, name):
+    kind, description = HELP.get(name, ("untyped", name))
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{str(value)}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+class TimedLock:
+    # threading.Lock 대신 쓰는 락, 얼마나 기다렸고 얼마나 잡고 있었는지 metrics에 기록한다
+    # threading.Condition(TimedLock(...))로도 쓸 수 있다
+    def __init__(self, metrics, name):
+        self._lock = threading.Lock()
+        self._metrics = metrics
+        self._labels = (("lock", name),)
+        self._acquired_at = None
+
+    def acquire(self, blocking=True, timeout=-1):
+        if not blocking: # Condition이 소유 여부를 확인할 때 등, 기록하지 않는다
+            return self._lock.acquire(False)
+        start = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        if acquired:
+            now = time.perf_counter()
+            self._metrics.observe("omok_lock_wait_seconds", self._labels, now - start)
+            self._acquired_at = now
+        return acquired
+
+    def release(self):
+        acquired_at, self._acquired_at = self._acquired_at, None
+        self._lock.release()
+        if acquired_at is not None:
+            self._metrics.observe("omok_lock_hold_seconds", self._labels, time.perf_counter() - acquired_at)
+
+    def locked(self):
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+metrics = Metrics() # 서버 전체에서 하나
@@ -3,28 +3,68 @@
 # client 과 Server가 통신할 수 있게 하는 역할
 import json
 import socket
+import threading
+from urllib.parse import parse_qsl, urlencode
+
+import wire
+from httpbuf import RecvBuffer
 
 SERVER_HOST = "172.16.100.87" #기본값, 학교
 SERVER_PORT = 6000
 TIMEOUT = 5
 USER_AGENT = "OmokHTTPClient/1.0"
+MAX_IDLE_CONNECTIONS = 4 # 서버별로 재사용을 위해 보관하는 유휴 소켓 수
+RESPONSE_BUFFER_SIZE = 4096 # 응답 하나를 읽는 버퍼의 처음 크기, 큰 응답이면 알아서 늘어난다
+MAX_RESPONSE_HEADER = 64 * 1024
+EVENT_TIMEOUT = 30 # 이벤트 스트림에서 heartbeat조차 오지 않으면 끊긴 것으로 보는 시간(초)
+WIRE_FORMAT = "json" # "binary"면 응답을 wire 형식으로 달라고 하고, 서버가 지원하면 요청 body도 wire 형식으로 보낸다
 
+# keep-alive 연결 풀: (host, port) -> 재사용 가능한 소켓 목록
+_pool = {}
+_pool_lock = threading.Lock()
+
+# ETag 캐시: 자원 -> (etag, 응답 body, Content-Type), 서버가 304를 주면 저장해 둔 body를 쓴다
+# 자원은 host, port, 경로, 방/토큰, 형식, delta 요청인지로 정한다 (since 같은 위치 값은 요청마다 바뀌므로 빼고)
+# ETag는 방 버전이라서 304면 버전이 그대로 = 저장한 body를 다시 적용해도 같은 state (delta도 다시 합쳐도 같다)
+MAX_ETAG_CACHE = 64
+CURSOR_PARAMS = ("since", "timeout", "moves_since", "game", "chat_since")
+DELTA_PARAMS = ("moves_since", "chat_since")
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+# 바이너리로 답한 적이 있는 서버 (host, port), 이런 서버에만 바이너리 body를 보낸다 (예전 서버는 JSON만 읽는다)
+_binary_servers = set()
+
+
+class IdleConnectionClosed(ConnectionResetError):
+    # 요청을 보냈는데 응답을 한 바이트도 받기 전에 연결이 정상 종료됨
+    # 서버가 keep-alive 유휴 소켓을 먼저 닫은 경우라서 요청은 처리되지 않았다 (다시 보내도 된다)
+    pass
 
-def _read_until(sock, marker):
-    data = b""
-    while marker not in data: #marker(예를들어 \r\n\r\n)가 나올 때 까지 데이터 읽기
-        chunk = sock.recv(4096)
-        if not chunk:
-            break
-        data += chunk
-    return data
 
 # 응답을 해석한다
-def _read_http_response(sock): #이부분은 server부분과 동일하게 작동
-    data = _read_until(sock, b"\r\n\r\n")
-    if b"\r\n\r\n" not in data:
-        raise RuntimeError("INVALID_HTTP_RESPONSE")
-    header_part, body = data.split(b"\r\n\r\n", 1)
+def _read_http_response(sock): #이부분은 server부분과 동일하게 작동 (httpbuf.RecvBuffer)
+    reader = RecvBuffer(sock, size=RESPONSE_BUFFER_SIZE)
+    try:
+        header_part = reader.read_head(MAX_RESPONSE_HEADER)
+        if header_part is None: # 한 바이트도 못 받음 = 서버가 keep-alive 연결을 이미 닫음
+            raise IdleConnectionClosed("CONNECTION_CLOSED")
+        status_code, headers = _parse_response_head(header_part)
+        body = reader.read_body(int(headers.get("content-length", "0") or "0"))
+    except ValueError as exc:
+        raise RuntimeError("INVALID_HTTP_RESPONSE") from exc
+    if len(reader): # 요청하지 않은 bytes가 더 왔으면 이 연결은 재사용하지 않는다
+        headers["connection"] = "close"
+    return status_code, headers, body
+#200,
+# {
+#   'content-type': 'application/json',
+#   'content-length': '27'
+# },
+# b'{"ok": true, "msg": "hi"}'
+
+
+def _parse_response_head(header_part): # 상태줄과 헤더 -> (상태코드, 헤더 dict)
     header_lines = header_part.decode("iso-8859-1").split("\r\n")
     status_line = header_lines[0] #프로토콜 버전 + 상태 코드 + 상태 메시지로 이루어져 있다
     parts = status_line.split(" ", 2)
@@ -41,58 +81,130 @@ def _read_http_response(sock): #이부분은 server부분과 동일하게 작동
             continue
         key, value = line.split(":", 1)
         headers[key.strip().lower()] = value.strip()
+    return status_code, headers
 
-    content_length = int(headers.get("content-length", "0") or "0")
-    while len(body) < content_length:
-        chunk = sock.recv(4096)
-        if not chunk:
-            break
-        body += chunk
-    return status_code, headers, body[:content_length]
-#200,
-# {
-#   'content-type': 'application/json',
-#   'content-length': '27'
-# },
-# b'{"ok": true, "msg": "hi"}'
+def _checkout_connection(): # 풀에서 소켓을 꺼내거나 새로 연결한다. (소켓, 재사용 여부)
+    key = (SERVER_HOST, SERVER_PORT)
+    with _pool_lock:
+        idle = _pool.get(key)
+        if idle:
+            return idle.pop(), True
+    return socket.create_connection(key, timeout=TIMEOUT), False #TCP 연결
+
+
+def _checkin_connection(sock): # 다 쓴 소켓을 풀에 돌려놓는다
+    key = (SERVER_HOST, SERVER_PORT)
+    with _pool_lock:
+        idle = _pool.setdefault(key, [])
+        if len(idle) < MAX_IDLE_CONNECTIONS:
+            idle.append(sock)
+            return
+    sock.close()
 
-def _http_request(method, path, body_bytes):
+
+def close_connections(): # 풀에 남은 모든 소켓 닫기 (클라이언트 종료 시)
+    with _pool_lock:
+        sockets = [sock for idle in _pool.values() for sock in idle]
+        _pool.clear()
+    for sock in sockets:
+        sock.close()
+
+
+def _build_request(
+    method, path, body_bytes, accept="application/json", connection="keep-alive", extra_headers=None,
+    content_type="application/json",
+):
     lines = [ #http 메시지 만들기
         f"{method} {path} HTTP/1.1",
         f"Host: {SERVER_HOST}:{SERVER_PORT}",
         f"User-Agent: {USER_AGENT}",
-        "Accept: application/json",
+        f"Accept: {accept}",
         f"Content-Length: {len(body_bytes)}",
-        "Connection: close",
+        f"Connection: {connection}",
     ]
+    for key, value in (extra_headers or {}).items():
+        lines.append(f"{key}: {value}")
     if body_bytes:
-        lines.insert(4, "Content-Type: application/json")
-    request_data = "\r\n".join(lines + ["", ""]).encode("utf-8") + body_bytes #최종적으로 이거를 보낼거임
+        lines.insert(4, f"Content-Type: {content_type}")
+    return "\r\n".join(lines + ["", ""]).encode("utf-8") + body_bytes #최종적으로 이거를 보낼거임
 
-    sock = socket.create_connection((SERVER_HOST, SERVER_PORT), timeout=TIMEOUT) #TCP 연결
-    try:
-        sock.sendall(request_data) #http요청보내기
-        return _read_http_response(sock) #응답받기
-    finally:
-        sock.close()
 
+def _http_request(method, path, body_bytes, wait=0, extra_headers=None, accept="application/json", content_type="application/json"):
+    request_data = _build_request(
+        method, path, body_bytes, accept, extra_headers=extra_headers, content_type=content_type
+    )
 
-def http_json(method, path, payload=None):
+    while True:
+        sock, reused = _checkout_connection()
+        sock.settimeout(TIMEOUT + wait) # long-poll이면 서버가 기다리는 시간만큼 더 기다린다
+        sent = False
+        try:
+            sock.sendall(request_data) #http요청보내기
+            sent = True
+            status, headers, body = _read_http_response(sock) #응답받기
+        except ConnectionError as exc:
+            sock.close()
+            # 서버가 닫아버린 유휴 소켓이었다면 (보내기 실패, 또는 응답 없이 정상 종료) 새 연결로 다시 보낸다
+            # 응답을 기다리다 끊긴 경우(reset 등)는 서버가 이미 처리했을 수 있으므로 GET만 (POST /chat이 두 번 올라가지 않게)
+            if reused and (not sent or isinstance(exc, IdleConnectionClosed) or method == "GET"):
+                continue
+            raise
+        except BaseException:
+            sock.close()
+            raise
+        if headers.get("connection", "").lower() == "close":
+            sock.close()
+        else:
+            sock.settimeout(TIMEOUT)
+            _checkin_connection(sock)
+        return status, headers, body
+
+
+def _cache_key(path, binary): # 요청 경로 -> ETag 캐시 키 (위치 값은 빼고 같은 자원이면 같은 키)
+    base, _, query = path.partition("?")
+    params = parse_qsl(query)
+    resource = tuple(sorted((k, v) for k, v in params if k not in CURSOR_PARAMS))
+    delta = any(k in DELTA_PARAMS for k, _v in params) # 전체 상태 요청에 delta body를 돌려주지 않게
+    return (SERVER_HOST, SERVER_PORT, base, resource, delta, binary)
+
+
+# cache=True면 같은 GET 요청에 If-None-Match를 붙이고, 304면 예전에 받은 body를 다시 쓴다
+# WIRE_FORMAT이 "binary"여도 돌려주는 값은 똑같은 dict (응답의 Content-Type을 보고 디코딩한다)
+def http_json(method, path, payload=None, wait=0, cache=False):
+    binary = WIRE_FORMAT == "binary"
+    accept = wire.ACCEPT_BINARY if binary else "application/json"
+    content_type = "application/json"
     body_bytes = b""
     if payload is not None:
-        body_bytes = json.dumps(payload).encode("utf-8")
+        if binary and (SERVER_HOST, SERVER_PORT) in _binary_servers:
+            body_bytes = wire.encode(payload)
+            content_type = wire.BINARY_TYPE
+        else:
+            body_bytes = json.dumps(payload).encode("utf-8")
+    cache_key = _cache_key(path, binary)
+    cached = None
+    extra_headers = None
+    if cache:
+        with _etag_lock:
+            cached = _etag_cache.get(cache_key)
+        if cached:
+            extra_headers = {"If-None-Match": cached[0]}
     try:
-        status, _headers, resp_body = _http_request(method, path, body_bytes)
+        status, headers, resp_body = _http_request(method, path, body_bytes, wait, extra_headers, accept, content_type)
     except (OSError, RuntimeError) as exc:
         return {"ok": False, "msg": f"NETWORK_ERROR: {exc}", "status": None}
 
-    if resp_body:
-        try:
-            data = json.loads(resp_body.decode("utf-8"))
-        except json.JSONDecodeError:
-            data = {"ok": False, "msg": "INVALID_SERVER_JSON"}
-    else:
-        data = {}
+    resp_type = headers.get("content-type")
+    if status == 304 and cached: # 바뀐 게 없음, 저장해 둔 body 사용
+        resp_body, resp_type = cached[1], cached[2]
+    elif cache and status == 200 and headers.get("etag"):
+        with _etag_lock:
+            _etag_cache.pop(cache_key, None)
+            if len(_etag_cache) >= MAX_ETAG_CACHE: # 가장 오래 갱신되지 않은 자원부터
+                _etag_cache.pop(next(iter(_etag_cache)))
+            _etag_cache[cache_key] = (headers["etag"], resp_body, resp_type)
+
+    data = _decode_body(resp_body, resp_type)
 
     if status >= 400 and data.get("ok", True): #400번대이상이면 ok여도 false로 바꿔주, http 상태코드를 따르기 (json보다 http를 신뢰)
         data["ok"] = False
@@ -100,30 +212,152 @@ def http_json(method, path, payload=None):
     return data
 
 
+# GET /events 스트림(Server-Sent Events)을 열고 이벤트를 하나씩 돌려주는 iterator
+# {"id": 번호, "event": "move"/"chat"/..., "data": dict} 형태, 서버가 연결을 닫으면 끝난다
+# 끊긴 뒤 마지막으로 받은 id를 since로 주면 그 다음 이벤트부터 이어서 받는다
+# token을 주면 스트림이 열려 있는 동안 서버가 그 세션을 살아있는 것으로 본다 (만료되지 않음)
+def iter_events(since=None, room=None, token=None):
+    params = {k: v for k, v in (("room", room), ("since", since), ("token", token)) if v is not None}
+    path = "/events?" + urlencode(params) if params else "/events"
+    request_data = _build_request("GET", path, b"", accept="text/event-stream", connection="close")
+    sock = socket.create_connection((SERVER_HOST, SERVER_PORT), timeout=TIMEOUT) # 스트림 전용 연결 (풀 사용 X)
+    try:
+        sock.sendall(request_data)
+        sock.settimeout(EVENT_TIMEOUT)
+        stream = sock.makefile("rb")
+        head = b""
+        for raw in stream: # 빈 줄이 나올 때까지 헤더
+            if raw in (b"\r\n", b"\n"):
+                break
+            head += raw
+        status, _headers = _parse_response_head(head.rstrip(b"\r\n"))
+        if status != 200:
+            raise RuntimeError(f"EVENTS_HTTP_{status}")
+
+        fields = {}
+        for raw in stream:
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if not line: # 빈 줄 = 이벤트 하나 끝
+                if "data" in fields:
+                    yield {
+                        "id": int(fields.get("id", 0)),
+                        "event": fields.get("event", "message"),
+                        "data": json.loads(fields["data"]),
+                    }
+                fields = {}
+                continue
+            if line.startswith(":"): # heartbeat 주석
+                continue
+            name, _, value = line.partition(":")
+            fields[name] = value[1:] if value.startswith(" ") else value
+    finally:
+        sock.close()
+
+
+def _decode_body(body, content_type): # 응답 body -> dict, Content-Type에 따라 JSON 또는 wire 형식
+    if not body:
+        return {}
+    if wire.is_binary(content_type):
+        _binary_servers.add((SERVER_HOST, SERVER_PORT))
+        try:
+            return wire.decode(body)
+        except ValueError:
+            return {"ok": False, "msg": "INVALID_SERVER_BINARY"}
+    try:
+        return json.loads(body.decode("utf-8"))
+    except json.JSONDecodeError:
+        return {"ok": False, "msg": "INVALID_SERVER_JSON"}
+
+
 #여기 밑에 함수들 "명령 버튼 함수들", 게임에서 하는 행동을 서버에 전달하는 인터페이스
 
-def join_server(name="pygame-client"):#게임방에 입장하기
-    return http_json("POST", "/join", {"name": name})
+def join_server(name="pygame-client", room=None):#게임방에 입장하기 (room이 없으면 기본 방)
+    payload = {"name": name}
+    if room is not None:
+        payload["room"] = room
+    return http_json("POST", "/join", payload)
+
+
+def create_room(name=None):#새 방 만들기
+    return http_json("POST", "/rooms", {"name": name} if name else {})
+
+
+def list_rooms():#방 목록
+    return http_json("GET", "/rooms")
+
+
+def add_bot(room=None, level=None, depth=None, time_limit=None):#빈 자리에 서버 봇 앉히기
+    payload = {k: v for k, v in (("room", room), ("level", level), ("depth", depth), ("time", time_limit)) if v is not None}
+    return http_json("POST", "/bot", payload)
+
 
+def _delta_params(have): # 클라이언트가 가진 state -> 서버에 알려줄 위치 (바뀐 부분만 받기 위해)
+    if not have:
+        return {}
+    return {
+        "moves_since": have.get("move_count"),
+        "game": have.get("game_id"),
+        "chat_since": have.get("chat_count"),
+    }
 
-def request_state(): #전체 상태 요청
-    return http_json("GET", "/state")
 
+def request_state(since=None, timeout=None, have=None, room=None, token=None): #전체 상태 요청
+    # since(버전)를 주면 서버가 그보다 새 상태가 생길 때까지 최대 timeout초 기다렸다 응답한다 (long-poll)
+    # have(지금 가진 state)를 주면 서버는 그 이후 바뀐 부분만 보낸다 (apply_state_delta로 합치기)
+    # token을 주면 그 토큰의 방 상태를 받고, 서버는 그 세션을 살아있는 것으로 본다
+    params = {k: v for k, v in _delta_params(have).items() if v is not None}
+    if token is not None:
+        params["token"] = token
+    elif room is not None:
+        params["room"] = room
+    if since is not None:
+        params["since"] = since
+    if timeout is not None:
+        params["timeout"] = timeout
+    path = "/state?" + urlencode(params) if params else "/state"
+    return http_json("GET", path, wait=timeout or 0, cache=True)
 
-def submit_move(token, x, y):#돌 놓기
-    return http_json("POST", "/move", {"token": token, "x": x, "y": y})
+
+def submit_move(token, x, y, have=None):#돌 놓기
+    return http_json("POST", "/move", dict(_delta_params(have), token=token, x=x, y=y))
 
 
 def quit_game(token):#게임 종료
     return http_json("POST", "/quit", {"token": token})
 
 
-def send_chat(token, msg):#채팅메시지 보내기
-    return http_json("POST", "/chat", {"token": token, "msg": msg})
+def send_chat(token, msg, have=None):#채팅메시지 보내기, have를 주면 그 이후 새 채팅만 돌려받는다
+    payload = {"token": token, "msg": msg}
+    if have and have.get("chat_count") is not None:
+        payload["chat_since"] = have["chat_count"]
+    return http_json("POST", "/chat", payload)
+
+
+def restart_game(token, have=None):#게임 재시작
+    return http_json("POST", "/restart", dict(_delta_params(have), token=token))
+
 
+# 서버가 보낸 state(전체 또는 delta)를 가진 state와 합쳐 새 state를 만든다
+def apply_state_delta(have, incoming, chat_limit=100):
+    state = dict(incoming)
+    if incoming.get("delta"):
+        if have is None or have.get("game_id") != incoming.get("game_id"):
+            return None # 합칠 기준이 없음, 전체 상태를 다시 받아야 한다
+        board = [row[:] for row in have["board"]]
+        for x, y, color in state.pop("moves"):
+            board[y][x] = color
+        state["board"] = board
+    if incoming.get("chat_delta") and have is not None:
+        state["chat"] = merge_chat(have.get("chat", []), incoming.get("chat", []), chat_limit)
+    return state
 
-def restart_game(token):#게임 재시작
-    return http_json("POST", "/restart", {"token": token})
+
+def merge_chat(history, messages, limit=100): # id 기준으로 새 채팅만 이어 붙이고 최근 limit개만 남긴다
+    last_id = history[-1].get("id", 0) if history else 0
+    fresh = [message for message in messages if message.get("id", 0) > last_id] # 이미 받은 채팅은 건너뜀
+    if not fresh:
+        return history
+    return (history + fresh)[-limit:]
 
 
 def set_server(host=None, port=None):#서버 주소/포트 변경하는 설정 함수
@@ -132,3 +366,10 @@ def set_server(host=None, port=None):#서버 주소/포트 변경하는 설정 
         SERVER_HOST = host
     if port:
         SERVER_PORT = port
+
+
+def set_wire_format(fmt):#"json" 또는 "binary"
+    global WIRE_FORMAT
+    if fmt not in ("json", "binary"):
+        raise ValueError(f"unknown wire format: {fmt}")
+    WIRE_FORMAT = fmt
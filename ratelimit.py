@@ -0,0 +1,111 @@
+# ratelimit.py
+# 요청 수 제한 (admission control)
+# - 토큰별, IP별 토큰 버킷: 라우트마다 (초당 요청 수, 버스트)를 따로 줄 수 있다 ("*"는 나머지 라우트)
+# - 전역 동시 처리 요청 수 상한: 넘으면 새 요청은 기다리게 하지 않고 바로 거절 (load shedding)
+# 서버는 방 락을 잡기 전에 admit을 불러서, 넘은 요청에 429/503 + Retry-After를 돌려준다
+# 한 클라이언트가 /chat, /state를 쉬지 않고 보내도 다른 방의 지연시간이 같이 나빠지지 않게
+import math
+import threading
+import time
+
+MAX_BUCKETS = 100000 # 버킷이 이보다 많아지면 다 찬(한동안 조용한) 버킷을 정리한다
+
+ALLOWED = "allowed"
+TOKEN_LIMITED = "token_limited"
+IP_LIMITED = "ip_limited"
+OVERLOADED = "overloaded"
+
+
+def parse_limit(text): # "/chat=2/5" -> ("/chat", 2.0, 5.0), 버스트를 생략하면 초당 개수와 같다
+    route, sep, spec = text.partition("=")
+    if not sep or not route:
+        raise ValueError(f"expected ROUTE=RATE[/BURST], got {text!r}")
+    rate, _, burst = spec.partition("/")
+    rate = float(rate)
+    burst = float(burst) if burst else max(1.0, rate)
+    if rate <= 0 or burst < 1:
+        raise ValueError(f"rate must be > 0 and burst >= 1, got {text!r}")
+    return route, rate, burst
+
+
+class TokenBuckets:
+    # 키(토큰 또는 IP)마다 버킷 하나, [남은 개수, 마지막으로 채운 시각] 리스트로 보관
+    def __init__(self, limits, clock=time.monotonic):
+        self.limits = dict(limits) # 라우트 -> (초당 개수, 버스트)
+        self.clock = clock
+        self.lock = threading.Lock() # 버킷 하나 갱신하는 동안만
+        self.buckets = {} # (라우트, 키) -> [남은 개수, 시각]
+        self.prune_at = MAX_BUCKETS # 버킷 수가 이만큼 되면 정리, 정리 후에도 많으면 두 배로 (매번 전체를 훑지 않게)
+
+    def limit_for(self, route):
+        return self.limits.get(route) or self.limits.get("*")
+
+    def take(self, route, key): # 하나 쓸 수 있으면 0, 아니면 다음 하나가 찰 때까지 남은 시간(초)
+        limit = self.limit_for(route)
+        if limit is None:
+            return 0
+        rate, burst = limit
+        now = self.clock()
+        with self.lock:
+            bucket = self.buckets.get((route, key))
+            if bucket is None:
+                if len(self.buckets) >= self.prune_at:
+                    self._prune_locked(now)
+                    self.prune_at = max(MAX_BUCKETS, 2 * len(self.buckets))
+                bucket = self.buckets[(route, key)] = [burst, now]
+            level = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if level >= 1:
+                bucket[0] = level - 1
+                return 0
+            bucket[0] = level
+            return (1 - level) / rate
+
+    def _prune_locked(self, now): # 다 찬 버킷은 없는 것과 같으므로 버린다
+        for key, (level, stamp) in list(self.buckets.items()):
+            rate, burst = self.limit_for(key[0])
+            if level + (now - stamp) * rate >= burst:
+                del self.buckets[key]
+
+
+class RateLimiter:
+    def __init__(self, token_limits=(), ip_limits=(), max_in_flight=0, clock=time.monotonic):
+        self.tokens = TokenBuckets(token_limits, clock)
+        self.ips = TokenBuckets(ip_limits, clock)
+        self.max_in_flight = max_in_flight # 0이면 제한 없음
+        self.in_flight = 0
+        self.in_flight_lock = threading.Lock()
+
+    def wants_token(self, route): # 이 라우트에 토큰별 제한이 있는지 (없으면 body에서 토큰을 꺼낼 필요가 없다)
+        return self.tokens.limit_for(route) is not None
+
+    # 요청 하나를 받아도 되는지 -> (결정, Retry-After 초)
+    # token: 서버가 발급한(세션이 살아있는) 토큰만, 모르는 토큰은 None으로 (지어낸 토큰마다 버킷이 생기지 않게)
+    # 동시 처리 상한을 먼저 보므로 503으로 거절된 요청은 버킷을 쓰지 않는다
+    # ALLOWED면 처리가 끝난 뒤 release()를 불러야 한다
+    def admit(self, route, token, ip):
+        with self.in_flight_lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                return OVERLOADED, 1
+            self.in_flight += 1
+        decision, wait = ALLOWED, 0
+        if token:
+            wait = self.tokens.take(route, token)
+            if wait:
+                decision = TOKEN_LIMITED
+        if ip and not wait:
+            wait = self.ips.take(route, ip)
+            if wait:
+                decision = IP_LIMITED
+        if wait:
+            self.release()
+            return decision, retry_after(wait)
+        return ALLOWED, 0
+
+    def release(self):
+        with self.in_flight_lock:
+            self.in_flight -= 1
+
+
+def retry_after(seconds): # Retry-After 헤더는 정수 초
+    return max(1, math.ceil(seconds))
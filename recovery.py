@@ -0,0 +1,225 @@
+# recovery.py
+# 서버가 죽었다 다시 켜져도 진행 중인 방들을 같은 토큰 그대로 이어가기 위한 스냅샷 + WAL(write-ahead log)
+#
+# - WAL: 방 상태를 바꾸는 요청(입장, 수, 퇴장, 채팅, 재시작, 봇)을 한 줄짜리 JSON으로 바로 파일에 쓴다
+#   방 락 안에서 os.write 한 번 (커널 버퍼까지), 프로세스가 죽어도 남는다
+# - 스냅샷: 백그라운드 스레드가 주기적으로 방 상태를 복사해서 snapshot.json으로 저장
+#   복사만 방 락 안에서 하고 (수순/채팅 리스트 복사 정도), 인코딩/디스크 쓰기는 락 밖에서 한다
+#   스냅샷을 찍기 전에 WAL을 새 파일로 넘기므로, 그 이전 WAL 파일은 스냅샷에 다 들어가 있어 지운다
+# - 복구: 스냅샷을 읽고, 그 뒤 WAL에서 방 버전보다 새 기록만 다시 적용한다
+import json
+import os
+import threading
+import time
+
+from game import BLACK, WHITE, OmokGame
+from room import Room
+
+SNAPSHOT_FILE = "snapshot.json"
+WAL_PATTERN = "wal-{:06d}.log"
+CHECKPOINT_INTERVAL = 5.0 # 스냅샷 주기(초)
+
+
+def wal_segments(directory): # [(번호, 경로)], 번호 순서대로
+    segments = []
+    for name in os.listdir(directory):
+        if name.startswith("wal-") and name.endswith(".log"):
+            segments.append((int(name[4:-4]), os.path.join(directory, name)))
+    return sorted(segments)
+
+
+class WriteAheadLog:
+    def __init__(self, directory, segment, sync=False):
+        self.directory = directory
+        self.sync = sync # True면 기록마다 fsync (OS가 죽어도 남게, 대신 느림)
+        self.lock = threading.Lock()
+        self.segment = None
+        self.fd = None
+        self._open(segment)
+
+    def _open(self, segment):
+        path = os.path.join(self.directory, WAL_PATTERN.format(segment))
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = fd
+        self.segment = segment
+
+    def append(self, record):
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self.lock:
+            os.write(self.fd, line)
+            if self.sync:
+                os.fsync(self.fd)
+
+    def on_mutation(self, room, version, mutation): # room.wal_listeners에 등록하는 콜백
+        self.append(dict(mutation, room=room.room_id, v=version))
+
+    def rotate(self): # 새 WAL 파일로 넘어가고 그 번호를 돌려준다
+        with self.lock:
+            self._open(self.segment + 1)
+            return self.segment
+
+    def remove_before(self, segment): # 스냅샷에 다 들어간 예전 WAL 파일 지우기
+        for number, path in wal_segments(self.directory):
+            if number < segment:
+                os.remove(path)
+
+    def close(self):
+        with self.lock:
+            os.close(self.fd)
+
+
+def copy_room_locked(room): # 방 락 안에서 호출, 나중에 락 밖에서 JSON으로 쓸 수 있는 복사본
+    game = room.game
+    return {
+        "id": room.room_id,
+        "name": room.name,
+        "version": room.state_version,
+        "rules": game.rules,
+        "game_id": game.game_id,
+        "moves": [[x, y] for x, y, _color in game.moves],
+        "slots": {str(color): token for color, token in room.player_slots.items()},
+        "colors": dict(room.token_colors),
+        "names": dict(room.token_names),
+        "chat": list(room.chat_messages),
+        "chat_count": room.chat_count,
+        "votes": sorted(room.restart_votes),
+        "bots": {token: list(settings) for token, settings in room.bots.items()},
+    }
+
+
+def restore_room(data, game_class=OmokGame): # copy_room_locked의 결과 -> Room
+    room = Room(data["id"], data["name"], game_class, data["rules"])
+    room.game.game_id = data["game_id"]
+    for x, y in data["moves"]:
+        room.game.place_stone(x, y)
+    room.player_slots = {int(color): token for color, token in data["slots"].items()}
+    room.token_colors = dict(data["colors"])
+    room.token_names = dict(data["names"])
+    room.chat_messages.extend(data["chat"])
+    room.chat_count = data["chat_count"]
+    room.restart_votes = set(data["votes"])
+    room.bots = {token: tuple(settings) for token, settings in data["bots"].items()}
+    room.state_version = data["version"]
+    return room
+
+
+def apply_mutation_locked(room, record): # WAL 기록 하나를 방에 다시 적용 (handle_* 함수가 바꾸는 것과 같게)
+    op = record["op"]
+    if op == "join":
+        token, color = record["token"], record["color"]
+        room.token_colors[token] = color
+        room.token_names[token] = record["name"]
+        if color in (BLACK, WHITE):
+            room.player_slots[color] = token
+        if record.get("bot"):
+            room.bots[token] = tuple(record["bot"])
+    elif op == "move":
+        room.game.place_stone(record["x"], record["y"])
+    elif op == "quit":
+        token = record["token"]
+        color = room.token_colors.pop(token, None)
+        room.token_names.pop(token, None)
+        room.restart_votes.discard(token)
+        room.bots.pop(token, None)
+        if color in (BLACK, WHITE) and room.player_slots[color] == token:
+            room.player_slots[color] = None
+    elif op == "chat":
+        room.add_chat_locked(record["name"], record["msg"])
+    elif op == "restart":
+        room.restart_votes = set(record["votes"])
+        if record["reset"]:
+            room.game.reset()
+            room.restart_votes.clear()
+    # "win": 승패는 앞의 move를 다시 두면서 정해진다, 버전만 맞춘다
+    room.state_version = record["v"]
+
+
+def load_state(directory, rooms, game_class=OmokGame):
+    """Rebuild rooms in place from the last snapshot plus the WAL after it; returns (restored count, next WAL segment)."""
+    # rooms에는 서버가 처음부터 만드는 방(기본 방)이 들어있고, 스냅샷에 있는 방은 그걸로 바꾼다
+    restored = 0
+    first_segment = 1
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+        first_segment = snapshot["wal_segment"]
+        for data in snapshot["rooms"]:
+            room = restore_room(data, game_class)
+            rooms[room.room_id] = room
+            restored += 1
+
+    last_segment = first_segment - 1
+    for number, wal_path in wal_segments(directory):
+        if number < first_segment:
+            continue
+        last_segment = number
+        with open(wal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError: # 쓰다가 죽은 마지막 줄
+                    break
+                if record["op"] == "room":
+                    if record["room"] not in rooms:
+                        rooms[record["room"]] = Room(record["room"], record["name"], game_class, record["rules"])
+                        restored += 1
+                    continue
+                if record["op"] == "close_room": # 오래 비어서 정리된 방
+                    if rooms.pop(record["room"], None) is not None:
+                        restored -= 1
+                    continue
+                room = rooms.get(record["room"])
+                if room is not None and record["v"] > room.state_version:
+                    apply_mutation_locked(room, record)
+    return restored, last_segment + 1
+
+
+class Checkpointer:
+    # 주기적으로 모든 방을 스냅샷으로 저장하는 백그라운드 스레드
+    # 버전이 그대로인 방은 지난번 복사본을 다시 쓴다 (락을 잡지 않음)
+    def __init__(self, directory, rooms, wal, interval=CHECKPOINT_INTERVAL):
+        self.directory = directory
+        self.rooms = rooms
+        self.wal = wal
+        self.interval = interval
+        self.copies = {} # 방 번호 -> 마지막 복사본
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _loop(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.checkpoint()
+            except OSError as exc:
+                print(f"[SERVER] checkpoint failed: {exc}")
+
+    def checkpoint(self):
+        segment = self.wal.rotate() # 이 시점 이전의 WAL 기록은 아래 복사본에 모두 들어간다
+        for room_id in [room_id for room_id in self.copies if room_id not in self.rooms]: # 정리된 방
+            del self.copies[room_id]
+        for room in list(self.rooms.values()):
+            previous = self.copies.get(room.room_id)
+            if previous is not None and previous["version"] == room.state_version:
+                continue
+            with room.lock:
+                self.copies[room.room_id] = copy_room_locked(room)
+        snapshot = {"wal_segment": segment, "saved_at": time.time(), "rooms": list(self.copies.values())}
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path) # 중간에 죽어도 예전 스냅샷이나 새 스냅샷 중 하나는 온전히 남는다
+        self.wal.remove_before(segment)
+        return segment
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,196 @@
+# room.py
+# 방 하나 = 오목 한 판
+# 게임, 흑백 자리, 토큰, 채팅, 재시작 투표, 이벤트 기록과 그 방 전용 락을 가진다
+# 서로 다른 방의 요청은 서로의 락을 기다리지 않는다
+
+import json
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+
+import wire
+from game import OmokGame, BLACK, WHITE
+from metrics import TimedLock, metrics
+
+DEFAULT_ROOM_ID = 1 # 방을 지정하지 않은 요청이 들어가는 기본 방
+MAX_CHAT = 100 # 방마다 보관하는 채팅 개수 (링 버퍼 크기)
+MAX_DELTA_MOVES = 60 # 이보다 많이 뒤쳐진 클라이언트에게는 수순 대신 보드 전체를 보낸다
+MAX_EVENTS = 500 # 재접속한 클라이언트가 이어 받을 수 있도록 보관하는 최근 이벤트 수
+ROOM_ID_HEX = 8 # 토큰 앞 8글자(16진수)가 방 번호
+
+version_listeners = [] # 어떤 방의 버전이 오를 때마다 (그 방 락 안에서) room을 인자로 호출된다
+event_listeners = [] # 이벤트가 생길 때마다 (그 방 락 안에서) (room, seq, kind, data)로 호출된다 (journal 등)
+wal_listeners = [] # 방 상태를 바꾼 요청마다 (그 방 락 안에서) (room, version, mutation)으로 호출된다 (recovery)
+
+
+def notify_listeners(listeners, *args): # 리스너 하나가 실패해도 나머지와 요청은 계속 (상태는 이미 바뀌었다)
+    for listener in listeners:
+        try:
+            listener(*args)
+        except Exception as exc:
+            print(f"[SERVER] listener {getattr(listener, '__qualname__', listener)} failed: {exc!r}")
+
+
+def new_token(room_id): # 방 번호를 앞에 붙인 토큰, 토큰만 보고 어느 방인지 알 수 있다
+    return f"{room_id:0{ROOM_ID_HEX}x}{uuid.uuid4().hex[ROOM_ID_HEX:]}"
+
+
+def room_id_from_token(token): # 토큰 형식이 아니면 None
+    if not isinstance(token, str) or len(token) != 32:
+        return None
+    try:
+        return int(token[:ROOM_ID_HEX], 16)
+    except ValueError:
+        return None
+
+
+class Room:
+    # rules: {"size", "win_length", "exact"} 중 필요한 것만, 없으면 15x15 5목
+    def __init__(self, room_id, name=None, game_class=OmokGame, rules=None):
+        self.room_id = room_id
+        self.name = name or f"room-{room_id}"
+        self.game = game_class(**(rules or {})) # 보드 구현 (game.ENGINES)
+        self.lock = TimedLock(metrics, "room") # 이 방의 상태는 이 락 안에서만 바꾼다 (대기/보유 시간을 /metrics로)
+        self.state_changed = threading.Condition(self.lock) # 버전이 바뀌면 long-poll/이벤트 대기자를 깨운다
+        self.player_slots = { #흑백 자리에 누가 앉을지
+            BLACK: None,
+            WHITE: None,
+        }
+        self.token_colors = {} #black, white, none
+        self.token_names = {} # 이름
+        self.chat_messages = deque(maxlen=MAX_CHAT) # 이 방의 최근 채팅, 꽉 차면 오래된 것부터 밀려난다
+        self.chat_count = 0 # 지금까지 들어온 채팅 총 개수 = 마지막 채팅 id (id는 1부터 1씩 증가)
+        self.restart_votes = set() # 다시하기 누른 플레이어 들의 토큰 목록
+        self.bots = {} # 봇 토큰 -> (탐색 깊이, 한 수 시간), 봇은 HTTP 요청 없이 서버 안에서 둔다
+        self.bot_thinking = False # 이 방의 봇 탐색이 프로세스 풀에서 돌고 있는지
+        self.closed = False # 오래 비어 있어서 rooms에서 빠진 방, 더 들어올 수 없다
+        self.state_version = 0 # 상태가 바뀔 때마다 1씩 증가하는 버전 번호
+        self.event_log = deque(maxlen=MAX_EVENTS) # (seq, type, data), seq는 이벤트가 만든 state_version
+        self._state_bodies = {} # 형식(json/binary) -> 전체 상태 응답을 미리 인코딩해 둔 bytes
+        self._state_body_version = None # _state_bodies를 만든 시점의 state_version
+
+    def assign_color_locked(self): #자리가 비어있으면 자리 지정해주기
+        for color in (BLACK, WHITE): #흑을 먼저 지정해준다
+            if self.player_slots[color] is None:
+                return color
+        return None #만약 둘다 차있으면 관전자로 배정해준다.
+
+    def bump_version_locked(self): # 상태를 바꾼 뒤 호출, 버전을 올리고 기다리는 요청을 깨운다
+        self.state_version += 1
+        self.state_changed.notify_all()
+        notify_listeners(version_listeners, self)
+
+    # 상태 변경을 이벤트로 기록, 이벤트 하나당 버전이 1 오른다
+    # mutation: 복구할 때 다시 적용할 수 있는 변경 내용 (토큰 포함, 이벤트와 달리 클라이언트에게는 보내지 않는다)
+    # 기록(event_log, journal, WAL)을 먼저 하고 버전을 올린다, 클라이언트가 본 버전은 항상 WAL에 남아 있다
+    def emit_event_locked(self, kind, data, mutation=None):
+        version = self.state_version + 1
+        self.event_log.append((version, kind, data))
+        notify_listeners(event_listeners, self, version, kind, data)
+        if mutation is not None:
+            notify_listeners(wal_listeners, self, version, mutation)
+        self.bump_version_locked()
+
+    def missed_events_locked(self, cursor): # cursor 다음 이벤트가 이미 event_log에서 밀려났는지
+        if cursor > self.state_version:
+            return True
+        return cursor < self.state_version and (
+            not self.event_log or self.event_log[0][0] > cursor + 1
+        )
+
+    def occupied_locked(self): # 사람(플레이어/관전자)이 있는지, 봇만 남은 방은 빈 방
+        return any(token not in self.bots for token in self.token_colors)
+
+    def players_ready_locked(self): # 플레이어 2명이면 시작
+        return self.player_slots[BLACK] is not None and self.player_slots[WHITE] is not None
+
+    def players_info_locked(self): #흑백 들어와있는지 확인
+        return {
+            "black": self.player_slots[BLACK] is not None,
+            "white": self.player_slots[WHITE] is not None,
+            "ready": self.players_ready_locked(),
+        }
+
+    def restart_info_locked(self): #다시 시작 하기 누가 눌렀는 확인하기 위한 함수
+        black_token = self.player_slots.get(BLACK)
+        white_token = self.player_slots.get(WHITE)
+        return {
+            "black": black_token in self.restart_votes if black_token else False,
+            "white": white_token in self.restart_votes if white_token else False,
+        }
+
+    def add_chat_locked(self, name, msg): # 저장한 채팅 dict, 빈 채팅이면 None
+        if not msg: #빈 채팅 입력시 무시
+            return None
+        self.chat_count += 1
+        message = {"id": self.chat_count, "name": name, "msg": msg}
+        self.chat_messages.append(message)
+        return message
+
+    # 게임 상태 저장, 플레이어, 채팅, 재시작
+    # since(moves_since/game/chat_since)를 주면 클라이언트가 이미 가진 수/채팅은 빼고 새로 생긴 것만 담는다
+    def build_state_locked(self, since=None):
+        since = since or {}
+        state = self.build_game_state_locked(since.get("moves_since"), since.get("game"))
+        state["players"] = self.players_info_locked()
+        state.update(self.build_chat_state_locked(since.get("chat_since")))
+        state["restart"] = self.restart_info_locked()
+        state["version"] = self.state_version
+        state["room"] = self.room_id
+        return state
+
+    # 전체 /state 응답 bytes (binary면 wire 형식), 버전이 바뀌었을 때만 다시 인코딩한다
+    def state_body_locked(self, binary=False):
+        if self._state_body_version != self.state_version:
+            self._state_bodies.clear()
+            self._state_body_version = self.state_version
+        body = self._state_bodies.get(binary)
+        if body is None:
+            payload = {"ok": True, "state": self.build_state_locked()}
+            body = wire.encode(payload) if binary else json.dumps(payload).encode("utf-8")
+            self._state_bodies[binary] = body
+        return body
+
+    def build_game_state_locked(self, moves_since, game_id):
+        game = self.game
+        behind = game.move_count - moves_since if moves_since is not None else None
+        if game_id != game.game_id or behind is None or not 0 <= behind <= MAX_DELTA_MOVES:
+            # 처음 받거나, 판이 바뀌었거나(reset), 너무 뒤쳐졌으면 보드 전체
+            state = game.get_state()
+            state["delta"] = False
+            return state
+        return {
+            "delta": True,
+            "moves": game.moves_since(moves_since), # 클라이언트가 보드에 이어서 놓을 수들
+            "turn": game.current_turn,
+            "winner": game.winner,
+            "move_count": game.move_count,
+            "game_id": game.game_id,
+            "rules": game.rules,
+        }
+
+    # chat_since: 클라이언트가 마지막으로 받은 채팅 id, 그보다 새 채팅만 보낸다
+    # 그 사이 채팅이 링 버퍼에서 밀려났으면 (또는 처음이면) 보관 중인 채팅 전체 (chat_delta False)
+    def build_chat_state_locked(self, chat_since):
+        chat = self.chat_messages
+        new_count = self.chat_count - chat_since if chat_since is not None else None
+        if new_count is None or not 0 <= new_count <= len(chat):
+            return {"chat": list(chat), "chat_delta": False, "chat_count": self.chat_count}
+        return {
+            "chat": list(islice(chat, len(chat) - new_count, None)),
+            "chat_delta": True,
+            "chat_count": self.chat_count,
+        }
+
+    def info_locked(self): # /rooms 목록에 보여줄 요약
+        spectators = sum(1 for color in self.token_colors.values() if color is None)
+        return {
+            "id": self.room_id,
+            "name": self.name,
+            "players": self.players_info_locked(),
+            "rules": self.game.rules,
+            "spectators": spectators,
+            "move_count": self.game.move_count,
+            "winner": self.game.winner,
+        }
@@ -0,0 +1,82 @@
+# sessions.py
+# 토큰별 마지막 요청 시각을 기록하고, 오래 조용한 토큰(세션)을 만료시키는 저장소
+# 클라이언트가 /quit 없이 꺼져도(크래시, 와이파이 끊김) 자리와 토큰이 영원히 남지 않게 한다
+#
+# 만료 시각은 힙(heapq)에 토큰당 하나만 넣어 둔다
+# touch는 last_seen만 갱신하고(힙은 건드리지 않음), 힙에서 꺼낼 때 그 사이 요청이 있었으면 새 만료 시각으로 다시 넣는다
+# 그래서 힙 크기 = 살아있는 세션 수 (+ 만료 시각이 안 된 제거된 세션), 요청이 많아도 커지지 않는다
+import heapq
+import threading
+import time
+
+SESSION_TIMEOUT = 120.0 # 이 시간(초) 동안 요청이 없으면 세션 만료
+REAP_INTERVAL = 5.0 # 만료 검사 주기(초)
+
+
+class SessionStore:
+    def __init__(self, timeout=SESSION_TIMEOUT, on_expire=None, clock=time.monotonic, on_sweep=None):
+        self.timeout = timeout
+        self.on_expire = on_expire # 만료된 토큰마다 락 밖에서 호출
+        self.on_sweep = on_sweep # 주기적인 reap이 끝날 때마다 호출 (빈 방 정리 등)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.last_seen = {} # 토큰 -> 마지막 요청 시각
+        self.scheduled = set() # 힙에 들어있는 토큰
+        self.deadlines = [] # (만료 예정 시각, 토큰) 힙
+        self.reaped = 0 # 지금까지 만료시킨 세션 수
+        self.running = False
+
+    # 요청마다 호출, 보통은 락 안에서 dict 대입 한 번
+    # reap이 만료를 확인하고 지우는 사이에 끼어들면 갱신이 사라지거나 힙 항목 없는 토큰이 남으므로 락을 잡는다
+    def touch(self, token):
+        with self.lock:
+            seen = self.last_seen[token] = self.clock()
+            if token not in self.scheduled:
+                self.scheduled.add(token)
+                heapq.heappush(self.deadlines, (seen + self.timeout, token))
+
+    def remove(self, token): # /quit 등으로 직접 나간 세션, 힙 항목은 만료 시각에 버려진다
+        with self.lock:
+            self.last_seen.pop(token, None)
+
+    def is_live(self, token): # 서버가 발급했고 아직 만료되지 않은 토큰인지
+        return token in self.last_seen
+
+    def live_count(self):
+        return len(self.last_seen)
+
+    def reap(self): # 만료된 토큰 목록 (on_expire도 호출)
+        now = self.clock()
+        expired = []
+        with self.lock:
+            while self.deadlines and self.deadlines[0][0] <= now:
+                _deadline, token = heapq.heappop(self.deadlines)
+                seen = self.last_seen.get(token)
+                if seen is None: # 이미 나간 세션
+                    self.scheduled.discard(token)
+                elif seen + self.timeout > now: # 그 사이 요청이 있었음, 다음 만료 시각으로
+                    heapq.heappush(self.deadlines, (seen + self.timeout, token))
+                else:
+                    del self.last_seen[token]
+                    self.scheduled.discard(token)
+                    expired.append(token)
+            self.reaped += len(expired)
+        if self.on_expire is not None:
+            for token in expired:
+                self.on_expire(token)
+        return expired
+
+    def start(self, interval=REAP_INTERVAL): # 주기적으로 reap 하는 백그라운드 스레드
+        self.running = True
+
+        def loop():
+            while self.running:
+                time.sleep(interval)
+                self.reap()
+                if self.on_sweep is not None:
+                    self.on_sweep()
+
+        threading.Thread(target=loop, daemon=True).start()
+
+    def stats(self):
+        return {"live": self.live_count(), "reaped": self.reaped, "scheduled": len(self.deadlines)}
@@ -0,0 +1,5 @@
+# 테스트에서 저장소 최상위 모듈(game, wire, httpbuf ...)을 그대로 import 할 수 있게
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
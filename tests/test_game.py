@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from game import ENGINES, BitboardOmokGame, OmokGame
+
+
+def play_both(size, win_length, exact, seed):
+    rng = random.Random(seed)
+    games = [OmokGame(size, win_length, exact), BitboardOmokGame(size, win_length, exact)]
+    for _ in range(min(size * size * 3, 500)):
+        roll = rng.random()
+        if roll < 0.1:
+            results = [game.undo() for game in games]
+        elif roll < 0.15:
+            results = [game.redo() for game in games]
+        elif roll < 0.17 and games[0].winner is not None:
+            for game in games:
+                game.reset()
+            continue
+        else:
+            x, y = rng.randrange(-1, size + 1), rng.randrange(size)
+            results = [game.place_stone(x, y) for game in games]
+        assert results[0] == results[1]
+        list_game, bit_game = games
+        assert bit_game.board == list_game.board
+        assert bit_game.get_state() == list_game.get_state()
+        assert (bit_game.hash, bit_game.moves) == (list_game.hash, list_game.moves)
+
+
+@pytest.mark.parametrize("size, win_length, exact", [
+    (15, 5, False), (15, 5, True), (5, 3, False), (6, 6, False), (9, 4, True), (25, 7, False),
+])
+def test_bitboard_matches_list_engine(size, win_length, exact):
+    for seed in range(20):
+        play_both(size, win_length, exact, seed)
+
+
+@pytest.mark.parametrize("exact, expected", [(False, 1), (True, None)])
+def test_overline(exact, expected):
+    # 4개를 놓고 사이를 채워 6목을 만든다
+    for game_class in ENGINES.values():
+        game = game_class(9, 5, exact)
+        for x in (0, 1, 2, 4, 5):
+            game.place_stone(x, 0)
+            game.place_stone(x, 8)
+        game.place_stone(3, 0)
+        assert game.winner == expected
+
+
+def test_diagonal_edges():
+    for game_class in ENGINES.values():
+        for cells in ([(4 - i, i) for i in range(5)], [(i + 4, i) for i in range(5)], [(i, 4 + i) for i in range(5)]):
+            game = game_class(9)
+            for x, y in cells:
+                game.place_stone(x, y)
+                if game.winner is None:
+                    game.place_stone(8, y if y != 8 else 0)
+            assert game.winner == 1
+
+
+def test_batch_engine_matches_every_engine():
+    pytest.importorskip("numpy")
+    import batch_game
+    for game_class in ENGINES.values():
+        assert batch_game.cross_check(50, 1, game_class) == 50
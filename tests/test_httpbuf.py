@@ -0,0 +1,86 @@
+import pytest
+
+import httpbuf
+from httpbuf import RecvBuffer
+
+
+def request(path, body=b""):
+    return f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+
+
+def read_all(buffer):
+    messages = []
+    while True:
+        head = buffer.read_head(8192)
+        if head is None:
+            return messages
+        length = int(head.rsplit(b": ", 1)[1])
+        messages.append((head.split(b" ")[1], buffer.read_body(length)))
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 4096])
+def test_pipelined_requests(chunk):
+    data = request("/a", b"{}") + request("/b") + request("/c", b"x" * 5000)
+    buffer = RecvBuffer(httpbuf._ReplaySocket(data, chunk), size=16)
+    assert read_all(buffer) == [(b"/a", b"{}"), (b"/b", b""), (b"/c", b"x" * 5000)]
+    assert len(buffer) == 0
+
+
+def test_header_split_across_end_marker():
+    # \r\n\r\n이 recv 경계에 걸쳐도 찾는다
+    data = request("/a", b"1")
+    for split in range(1, len(data)):
+        buffer = RecvBuffer(httpbuf._ReplaySocket(data[split:]), initial=data[:split])
+        assert read_all(buffer) == [(b"/a", b"1")]
+
+
+def test_initial_bytes_and_pending():
+    data = request("/a", b"12") + request("/b", b"34")
+    buffer = RecvBuffer(httpbuf._ReplaySocket(b""), initial=data)
+    assert buffer.read_head(8192).startswith(b"POST /a")
+    assert buffer.read_body(2) == b"12"
+    assert buffer.pending() == request("/b", b"34")
+
+
+def test_errors():
+    with pytest.raises(ValueError, match="HEADER_TOO_LARGE"):
+        RecvBuffer(httpbuf._ReplaySocket(b"GET / HTTP/1.1\r\n" + b"X: y\r\n" * 100)).read_head(100)
+    with pytest.raises(ValueError, match="INCOMPLETE_HEADER"):
+        RecvBuffer(httpbuf._ReplaySocket(b"GET / HTTP/1.1\r\n")).read_head(8192)
+    buffer = RecvBuffer(httpbuf._ReplaySocket(request("/a", b"abc")[:-1]))
+    buffer.read_head(8192)
+    with pytest.raises(ValueError, match="INCOMPLETE_BODY"):
+        buffer.read_body(3)
+
+
+def test_closed_between_messages():
+    assert RecvBuffer(httpbuf._ReplaySocket(b"")).read_head(8192) is None
+
+
+def feed(buffer, data): # asyncio 쪽처럼 writable()/commit()으로 직접 채운다
+    with buffer.writable() as view:
+        view[:len(data)] = data
+    buffer.commit(len(data))
+
+
+def test_take_without_socket():
+    buffer = RecvBuffer(None, size=4)
+    data = request("/a", b"body")
+    head_size = data.index(b"\r\n\r\n")
+    for offset in range(head_size + 3):
+        feed(buffer, data[offset:offset + 1])
+        assert buffer.take_head(8192) is None
+    feed(buffer, data[head_size + 3:-1])
+    assert buffer.take_head(8192) == data[:head_size]
+    assert buffer.take_body(4) is None
+    feed(buffer, data[-1:])
+    assert buffer.take_body(4) == b"body"
+    assert len(buffer) == 0
+
+
+def test_buffer_shrinks_after_large_body():
+    body = b"z" * (httpbuf.IDLE_SIZE * 2)
+    buffer = RecvBuffer(httpbuf._ReplaySocket(request("/big", body) + request("/small")))
+    assert read_all(buffer) == [(b"/big", body), (b"/small", b"")]
+    buffer.writable().release()
+    assert len(buffer.buffer) == httpbuf.INITIAL_SIZE
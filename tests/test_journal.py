@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import journal
+from game import BitboardOmokGame
+from room import Room, event_listeners
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writers = []
+
+    def open_writer(**options):
+        w = journal.JournalWriter(str(tmp_path), flush_interval=60, **options)
+        writers.append(w)
+        event_listeners.append(w.on_event)
+        return w
+
+    yield open_writer
+    for w in writers:
+        event_listeners.remove(w.on_event)
+        w.close()
+
+
+def play(room, x, y): # Server.play_move_locked와 같은 이벤트
+    game = room.game
+    with room.lock:
+        ok, msg = game.place_stone(x, y)
+        assert ok, msg
+        room.emit_event_locked("move", {"x": x, "y": y, "color": game.moves[-1][2], "turn": game.current_turn,
+                                        "winner": game.winner, "move_count": game.move_count})
+        if game.winner is not None:
+            room.emit_event_locked("win", {"winner": game.winner, "result": msg})
+
+
+def play_game(room, after_move=lambda: None): # 흑이 (0..L-1, 0)으로 이긴다
+    for i in range(room.game.win_length):
+        play(room, i, 0)
+        after_move()
+        if room.game.winner is None:
+            play(room, i, 2)
+            after_move()
+
+
+def test_record_roundtrip():
+    for kind, data in [
+        ("move", {"x": 3, "y": 4, "color": 2, "move_count": 300}),
+        ("win", {"winner": 1}),
+        ("chat", {"name": "철수", "msg": "안녕"}),
+        ("room", {"rules": {"size": 9, "win_length": 4, "exact": True}}),
+    ]:
+        data_bytes = journal.encode_record(kind, 7, 11, 2, data)
+        record, end = journal.decode_record(data_bytes, 0)
+        assert end == len(data_bytes)
+        assert (record.kind, record.room, record.seq, record.game_id, record.data) == (kind, 7, 11, 2, data)
+    assert journal.encode_record("restart", 1, 1, 1, {"status": "PENDING"}) is None
+    assert journal.encode_record("unknown", 1, 1, 1, {}) is None
+
+
+def test_long_text_is_capped():
+    data = journal.encode_record("chat", 1, 1, 1, {"name": "n" * 100000, "msg": "한" * 100000})
+    record, _end = journal.decode_record(data, 0)
+    assert record.data == {"name": "n" * journal.MAX_TEXT, "msg": "한" * journal.MAX_TEXT}
+    too_many = {str(i): "x" * journal.MAX_TEXT for i in range(100)}
+    assert journal.encode_record("chat", 1, 1, 1, too_many) is None
+
+
+def test_reader_skips_corrupt_payload(writer, tmp_path):
+    w = writer()
+    room = Room(1, rules={"size": 9, "win_length": 4})
+    play_game(room)
+    w.flush()
+    path = journal.journal_files(str(tmp_path))[0]
+    good = journal.encode_record("chat", 1, 100, 1, {"name": "a", "msg": "b"})
+    broken = bytearray(good)
+    broken[journal.VAR_HEADER.size] = 0xFF # JSON이 아닌 바이트, 길이는 그대로
+    with open(path, "ab") as f:
+        f.write(bytes(broken) + good + good[:5]) # 끝은 덜 써진 레코드
+    with journal.JournalReader(path) as reader:
+        kinds = [record.kind for record in reader]
+    assert kinds == ["room"] + ["move"] * 7 + ["win", "chat"]
+    assert journal.replay(str(tmp_path), 1, 1).winner == 1
+
+
+def test_replay_across_files(writer, tmp_path):
+    w = writer(max_file_bytes=120) # 몇 수마다 다음 파일로 넘어간다
+    room = Room(3, rules={"size": 9, "win_length": 4, "exact": True})
+    play_game(room, w.flush)
+    with room.lock:
+        room.game.reset()
+    play_game(room, w.flush)
+    directory = str(tmp_path)
+    assert len(journal.journal_files(directory)) > 2
+    assert journal.room_rules(directory, 3) == {"size": 9, "win_length": 4, "exact": True}
+    for game_id in (1, 2):
+        game = journal.replay(directory, 3, game_id, BitboardOmokGame)
+        assert (game.winner, game.move_count, game.size, game.exact) == (1, 7, 9, True)
+        assert game.board == room.game.board
+
+    os.remove(journal.journal_files(directory)[0])
+    with pytest.raises(ValueError, match="GAME_START_MISSING"):
+        journal.replay(directory, 3, 1, size=9, win_length=4)
@@ -0,0 +1,85 @@
+import pytest
+
+import ratelimit
+from ratelimit import RateLimiter, TokenBuckets
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_limit():
+    assert ratelimit.parse_limit("/chat=2/5") == ("/chat", 2.0, 5.0)
+    assert ratelimit.parse_limit("*=10") == ("*", 10.0, 10.0)
+    assert ratelimit.parse_limit("/state=0.5") == ("/state", 0.5, 1.0)
+    for text in ["/chat", "=2", "/chat=0", "/chat=1/0.5", "/chat=abc"]:
+        with pytest.raises(ValueError):
+            ratelimit.parse_limit(text)
+
+
+def test_burst_then_refill():
+    clock = FakeClock()
+    buckets = TokenBuckets({"/chat": (2.0, 3.0)}, clock)
+    assert [buckets.take("/chat", "a") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("/chat", "a") == pytest.approx(0.5)
+    assert buckets.take("/chat", "b") == 0 # 키마다 따로
+    clock.now += 0.5
+    assert buckets.take("/chat", "a") == 0
+    clock.now += 100 # 버스트보다 많이 쌓이지 않는다
+    assert [buckets.take("/chat", "a") for _ in range(4)][-1] > 0
+
+
+def test_unlimited_route_and_fallback():
+    buckets = TokenBuckets({"*": (1.0, 1.0), "/state": (100.0, 100.0)}, FakeClock())
+    assert buckets.take("/move", "a") == 0
+    assert buckets.take("/move", "a") > 0
+    assert buckets.take("/state", "a") == 0
+    assert TokenBuckets({}, FakeClock()).take("/move", "a") == 0
+
+
+def test_prune_drops_full_buckets(monkeypatch):
+    monkeypatch.setattr(ratelimit, "MAX_BUCKETS", 4)
+    clock = FakeClock()
+    buckets = TokenBuckets({"*": (1.0, 1.0)}, clock)
+    buckets.prune_at = 4
+    for key in range(4):
+        buckets.take("/move", key)
+    clock.now += 10
+    buckets.take("/move", "new")
+    assert list(buckets.buckets) == [("/move", "new")]
+
+
+def test_retry_after():
+    assert ratelimit.retry_after(0.01) == 1
+    assert ratelimit.retry_after(1.0) == 1
+    assert ratelimit.retry_after(1.2) == 2
+
+
+def test_limiter_decisions():
+    clock = FakeClock()
+    limiter = RateLimiter({"/chat": (1.0, 1.0)}, {"*": (1.0, 2.0)}, clock=clock)
+    assert limiter.wants_token("/chat") and not limiter.wants_token("/move")
+    assert limiter.admit("/chat", "t", "1.2.3.4") == (ratelimit.ALLOWED, 0)
+    limiter.release()
+    assert limiter.admit("/chat", "t", "1.2.3.4") == (ratelimit.TOKEN_LIMITED, 1)
+    # 토큰에서 걸린 요청은 IP 버킷을 쓰지 않았으므로 IP 버킷(버스트 2)에는 하나 남아 있다
+    assert limiter.admit("/chat", None, "1.2.3.4") == (ratelimit.ALLOWED, 0)
+    limiter.release()
+    assert limiter.admit("/chat", None, "1.2.3.4") == (ratelimit.IP_LIMITED, 1)
+    assert limiter.admit("/chat", None, "5.6.7.8") == (ratelimit.ALLOWED, 0)
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+def test_overload_rejects_without_using_buckets():
+    limiter = RateLimiter({"*": (1.0, 1.0)}, max_in_flight=1, clock=FakeClock())
+    assert limiter.admit("/move", "t", None) == (ratelimit.ALLOWED, 0)
+    assert limiter.admit("/move", "u", None) == (ratelimit.OVERLOADED, 1)
+    limiter.release()
+    assert limiter.admit("/move", "u", None) == (ratelimit.ALLOWED, 0) # 503 때 버킷을 쓰지 않았다
+    limiter.release()
+    assert limiter.in_flight == 0
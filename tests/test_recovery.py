@@ -0,0 +1,134 @@
+import json
+import os
+
+import pytest
+
+import recovery
+from game import BLACK, WHITE, BitboardOmokGame, OmokGame
+from room import Room, wal_listeners
+
+
+@pytest.fixture
+def wal(tmp_path):
+    log = recovery.WriteAheadLog(str(tmp_path), 1)
+    wal_listeners.append(log.on_mutation)
+    yield log
+    wal_listeners.remove(log.on_mutation)
+    log.close()
+
+
+def new_room(wal, room_id, rules=None): # Server.handle_create_room처럼 방 생성도 WAL에
+    room = Room(room_id, f"room-{room_id}", rules=rules)
+    wal.append({"op": "room", "room": room_id, "name": room.name, "rules": room.game.rules})
+    return room
+
+
+def join(room, token, name, color, bot=None):
+    with room.lock:
+        room.token_colors[token] = color
+        room.token_names[token] = name
+        if color in (BLACK, WHITE):
+            room.player_slots[color] = token
+        mutation = {"op": "join", "token": token, "name": name, "color": color}
+        if bot:
+            room.bots[token] = bot
+            mutation["bot"] = list(bot)
+        room.emit_event_locked("join", {"name": name}, mutation)
+
+
+def play(room, x, y): # Server.play_move_locked와 같은 이벤트/WAL 기록
+    with room.lock:
+        ok, msg = room.game.place_stone(x, y)
+        assert ok, msg
+        room.emit_event_locked("move", {"x": x, "y": y}, {"op": "move", "x": x, "y": y})
+        if room.game.winner is not None:
+            room.emit_event_locked("win", {"winner": room.game.winner}, {"op": "win"})
+
+
+def chat(room, name, msg):
+    with room.lock:
+        message = room.add_chat_locked(name, msg)
+        room.emit_event_locked("chat", message, {"op": "chat", "name": name, "msg": msg})
+
+
+def snapshot(room):
+    with room.lock:
+        return recovery.copy_room_locked(room)
+
+
+def reload(directory, game_class=OmokGame):
+    rooms = {1: Room(1, "lobby")}
+    restored, segment = recovery.load_state(directory, rooms, game_class)
+    return rooms, restored, segment
+
+
+def setup_game(wal):
+    room = new_room(wal, 2, {"size": 9, "win_length": 4})
+    join(room, "a" * 32, "흑", BLACK)
+    join(room, "b" * 32, "백", WHITE)
+    join(room, "c" * 32, "봇", None, bot=(2, 0.5))
+    chat(room, "흑", "안녕")
+    for i in range(3):
+        play(room, i, 0)
+        play(room, i, 1)
+    return room
+
+
+def test_wal_replay_restores_room(wal, tmp_path):
+    room = setup_game(wal)
+    play(room, 3, 0) # 흑 승리, win 이벤트도 버전을 올린다
+    assert room.game.winner == BLACK
+    rooms, restored, segment = reload(str(tmp_path))
+    assert (restored, segment) == (1, 2)
+    assert snapshot(rooms[2]) == snapshot(room)
+    assert rooms[2].state_version == room.state_version
+
+
+def test_torn_last_line_is_ignored(wal, tmp_path):
+    room = setup_game(wal)
+    expected = snapshot(room)
+    with open(os.path.join(str(tmp_path), recovery.WAL_PATTERN.format(1)), "a") as f:
+        f.write('{"op":"move","x":5,"y":5,"ro')
+    rooms, _restored, _segment = reload(str(tmp_path))
+    assert snapshot(rooms[2]) == expected
+
+
+def test_checkpoint_then_wal(wal, tmp_path):
+    room = setup_game(wal)
+    checkpointer = recovery.Checkpointer(str(tmp_path), {2: room}, wal)
+    assert checkpointer.checkpoint() == 2
+    assert [number for number, _path in recovery.wal_segments(str(tmp_path))] == [2]
+    play(room, 8, 8)
+    with room.lock:
+        room.game.reset()
+        room.emit_event_locked("restart", {}, {"op": "restart", "votes": [], "reset": True})
+    play(room, 4, 4)
+    rooms, restored, segment = reload(str(tmp_path), BitboardOmokGame)
+    assert (restored, segment) == (1, 3)
+    assert isinstance(rooms[2].game, BitboardOmokGame)
+    assert snapshot(rooms[2]) == snapshot(room)
+    with open(os.path.join(str(tmp_path), recovery.SNAPSHOT_FILE)) as f:
+        assert json.load(f)["wal_segment"] == 2
+
+
+def test_closed_room_is_not_restored(wal, tmp_path):
+    room = setup_game(wal)
+    rooms = {2: room}
+    checkpointer = recovery.Checkpointer(str(tmp_path), rooms, wal)
+    checkpointer.checkpoint()
+    del rooms[2]
+    wal.append({"op": "close_room", "room": 2})
+    restored_rooms, restored, _segment = reload(str(tmp_path))
+    assert restored == 0 and list(restored_rooms) == [1]
+    checkpointer.checkpoint() # 정리된 방은 다음 스냅샷에서도 빠진다
+    restored_rooms, restored, _segment = reload(str(tmp_path))
+    assert restored == 0 and list(restored_rooms) == [1]
+
+
+def test_copy_and_restore_room(wal):
+    room = setup_game(wal)
+    data = json.loads(json.dumps(snapshot(room))) # 스냅샷 파일처럼 JSON을 거친다
+    restored = recovery.restore_room(data)
+    assert snapshot(restored) == snapshot(room)
+    assert restored.bots == {"c" * 32: (2, 0.5)}
+    assert restored.player_slots == {BLACK: "a" * 32, WHITE: "b" * 32}
@@ -0,0 +1,67 @@
+from sessions import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_store(timeout=10.0):
+    clock = FakeClock()
+    expired = []
+    return SessionStore(timeout, expired.append, clock), clock, expired
+
+
+def test_expires_after_timeout():
+    store, clock, expired = make_store()
+    store.touch("a")
+    store.touch("b")
+    clock.now = 9.9
+    assert store.reap() == []
+    clock.now = 10.0
+    assert sorted(store.reap()) == ["a", "b"]
+    assert expired == ["a", "b"] or expired == ["b", "a"]
+    assert not store.is_live("a")
+    assert store.stats() == {"live": 0, "reaped": 2, "scheduled": 0}
+
+
+def test_touch_extends_session():
+    store, clock, expired = make_store()
+    store.touch("a")
+    for _ in range(5):
+        clock.now += 6
+        store.touch("a")
+        assert store.reap() == []
+        assert store.stats()["scheduled"] == 1 # 요청이 많아도 힙은 토큰당 하나
+    clock.now += 10
+    assert store.reap() == ["a"]
+    assert expired == ["a"]
+
+
+def test_removed_session_is_not_expired():
+    store, clock, expired = make_store()
+    store.touch("a")
+    store.remove("a")
+    assert not store.is_live("a")
+    clock.now = 20
+    assert store.reap() == []
+    assert expired == []
+    assert store.stats() == {"live": 0, "reaped": 0, "scheduled": 0}
+    store.touch("a") # 나갔다가 다시 들어온 토큰도 다시 만료 대상이 된다
+    clock.now = 40
+    assert store.reap() == ["a"]
+
+
+def test_every_live_token_is_scheduled():
+    store, clock, _expired = make_store()
+    for step in range(200):
+        clock.now = step * 0.5
+        store.touch(f"t{step % 17}")
+        if step % 7 == 0:
+            store.remove(f"t{step % 5}")
+        store.reap()
+        assert set(store.last_seen) <= store.scheduled
+        assert len(store.deadlines) == len(store.scheduled)
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import wire
+
+
+def roundtrip(value):
+    return wire.decode(wire.encode(value))
+
+
+def test_state_roundtrip():
+    board = [[(x * 7 + y) % 3 for x in range(15)] for y in range(15)]
+    state = {
+        "board": board,
+        "moves": [[7, 7, 1], [8, 7, 2], [14, 0, 1]],
+        "token": "0123456789abcdef" * 2,
+        "current_turn": 2,
+        "winner": None,
+        "version": 123456,
+        "players": {"1": "철수", "2": "bot"},
+        "game_over": False,
+    }
+    assert roundtrip(state) == state
+
+
+def test_board_and_moves_are_packed():
+    board = [[0] * 15 for _ in range(15)]
+    state = {"board": board, "moves": [[x, x, 1 + x % 2] for x in range(15)]}
+    assert len(wire.encode(state)) < len(json.dumps(state)) // 4
+
+
+@pytest.mark.parametrize("value", [
+    0, 63, 64, -1, -2 ** 40, 2 ** 70, 1.5, -0.25, True, False, None, "", "한글 ✓",
+    [], {}, [1, [2, [3, None]]], {"unknown_key": {"nested": [1.0, "x"]}},
+    "ABCDEF0123456789abcdef0123456789", # 대문자가 섞이면 토큰 형식이 아니다
+    [[0, 1], [2]], # 직사각형이 아닌 보드
+    [[1, 2, 300]], # 한 바이트를 넘는 수
+])
+def test_value_roundtrip(value):
+    result = roundtrip(value)
+    assert result == value
+    assert type(result) is type(value)
+
+
+def test_rejects_broken_data():
+    data = wire.encode({"board": [[1, 2], [0, 0]], "name": "abc"})
+    with pytest.raises(ValueError, match="UNSUPPORTED_WIRE_VERSION"):
+        wire.decode(b"")
+    with pytest.raises(ValueError, match="UNSUPPORTED_WIRE_VERSION"):
+        wire.decode(bytes([wire.VERSION + 1]) + data[1:])
+    with pytest.raises(ValueError, match="TRAILING_WIRE_DATA"):
+        wire.decode(data + b"\x00")
+    for end in range(1, len(data)):
+        with pytest.raises(ValueError):
+            wire.decode(data[:end])
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", False),
+    ("application/json", False),
+    (wire.BINARY_TYPE, True),
+    (wire.ACCEPT_BINARY, True),
+    ("Application/X-Omok;q=0.8", True),
+    (f"{wire.BINARY_TYPE};q=0", False),
+    (f"{wire.BINARY_TYPE};q=abc", False),
+])
+def test_accepts_binary(accept, expected):
+    assert wire.accepts_binary({"accept": accept}) is expected
+
+
+def test_is_binary():
+    assert wire.is_binary(wire.BINARY_TYPE)
+    assert wire.is_binary("application/x-omok; charset=binary")
+    assert not wire.is_binary(wire.JSON_TYPE)
+    assert not wire.is_binary(None)
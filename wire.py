@@ -0,0 +1,259 @@
+# wire.py
+# JSON 대신 쓸 수 있는 작은 바이너리 인코딩 (서버/클라이언트 공용)
+# Content-Type / Accept 가 BINARY_TYPE 이면 이 형식, 아니면 지금처럼 JSON (예전 클라이언트는 그대로 JSON)
+#
+# 메시지 = 버전 1바이트 + 값 하나, 값은 앞 1바이트(태그)가 종류
+#   None/False/True, 작은 정수(0~63)는 태그 1바이트로 끝
+#   정수: zigzag varint, 실수: 8바이트, 문자열: varint 길이 + utf-8, 리스트/dict: varint 개수 + 항목들
+#   dict 키는 KEYS에 있으면 번호 1바이트, 없으면 0xFF + 문자열
+#   토큰(32자리 16진수 문자열): 16바이트 그대로
+#   보드("board" 키): 행 수, 열 수 + 칸마다 2비트 (15x15 = 57바이트)
+#   수순("moves" 키): 개수 + 수마다 (x, y, 색) 3바이트
+import struct
+from itertools import chain
+
+BINARY_TYPE = "application/x-omok"
+JSON_TYPE = "application/json"
+ACCEPT_BINARY = f"{BINARY_TYPE}, {JSON_TYPE};q=0.5" # 바이너리를 모르는 서버는 JSON으로 답한다
+VERSION = 1
+
+NONE = 0x00
+FALSE = 0x01
+TRUE = 0x02
+INT = 0x03
+FLOAT = 0x04
+STR = 0x05
+LIST = 0x06
+DICT = 0x07
+TOKEN = 0x08
+BOARD = 0x09
+MOVES = 0x0A
+SMALL_INT = 0x40 # 0x40 + n (0 <= n < 64)
+INLINE_KEY = 0xFF
+
+# 자주 쓰는 dict 키, 순서가 곧 번호이므로 뒤에만 추가한다
+KEYS = (
+    "ok", "msg", "status", "state", "board", "turn", "winner", "move_count",
+    "game_id", "rules", "size", "win_length", "exact", "delta", "moves", "players",
+    "black", "white", "ready", "chat", "chat_delta", "chat_count", "restart", "version",
+    "room", "token", "color", "name", "id", "x", "y", "moves_since",
+    "game", "chat_since", "rooms", "spectators", "param", "min", "max", "since",
+    "level", "depth", "time", "live", "reaped", "scheduled", "result", "reason",
+)
+KEY_CODES = {key: code for code, key in enumerate(KEYS)}
+
+FLOAT_STRUCT = struct.Struct("<d")
+TOKEN_LENGTH = 32
+HEX_CHARS = frozenset("0123456789abcdef")
+UNPACK_CELLS = [(b & 3, b >> 2 & 3, b >> 4 & 3, b >> 6) for b in range(256)] # 1바이트 -> 4칸
+
+
+def encode(value): # dict/list/... -> bytes
+    out = bytearray((VERSION,))
+    _encode(out, value)
+    return bytes(out)
+
+
+def decode(data): # bytes -> dict/list/..., 형식이 깨졌으면 ValueError
+    data = memoryview(data)
+    if not data or data[0] != VERSION:
+        raise ValueError("UNSUPPORTED_WIRE_VERSION")
+    try:
+        value, offset = _decode(data, 1)
+    except (IndexError, struct.error, UnicodeDecodeError) as exc:
+        raise ValueError("TRUNCATED_WIRE_DATA") from exc
+    if offset != len(data):
+        raise ValueError("TRAILING_WIRE_DATA")
+    return value
+
+
+def is_binary(content_type): # Content-Type 헤더 값이 바이너리 형식인지
+    return bool(content_type) and content_type.split(";", 1)[0].strip().lower() == BINARY_TYPE
+
+
+def accepts_binary(headers): # 요청의 Accept에 바이너리가 있고 q가 0이 아닌지
+    for item in headers.get("accept", "").split(","):
+        media, _, params = item.partition(";")
+        if media.strip().lower() != BINARY_TYPE:
+            continue
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, offset):
+    result = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+
+def _write_str(out, text):
+    raw = text.encode("utf-8")
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _encode(out, value, key=None):
+    if value is None:
+        out.append(NONE)
+    elif value is True:
+        out.append(TRUE)
+    elif value is False:
+        out.append(FALSE)
+    elif isinstance(value, int):
+        if 0 <= value < 64:
+            out.append(SMALL_INT + value)
+        else:
+            out.append(INT)
+            _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1) # zigzag
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += FLOAT_STRUCT.pack(value)
+    elif isinstance(value, str):
+        if len(value) == TOKEN_LENGTH and HEX_CHARS.issuperset(value):
+            out.append(TOKEN)
+            out += bytes.fromhex(value)
+        else:
+            out.append(STR)
+            _write_str(out, value)
+    elif isinstance(value, dict):
+        out.append(DICT)
+        _write_varint(out, len(value))
+        for name, item in value.items():
+            code = KEY_CODES.get(name)
+            if code is None:
+                out.append(INLINE_KEY)
+                _write_str(out, str(name))
+            else:
+                out.append(code)
+            _encode(out, item, name)
+    elif isinstance(value, (list, tuple)):
+        if key == "board" and _encode_board(out, value):
+            return
+        if key == "moves" and _encode_moves(out, value):
+            return
+        out.append(LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _encode(out, item)
+    else:
+        raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def _encode_board(out, board): # 칸 값이 0~3인 직사각형 보드만, 아니면 False (일반 리스트로)
+    rows = len(board)
+    cols = len(board[0]) if rows else 0
+    if rows > 255 or cols > 255 or any(len(row) != cols for row in board):
+        return False
+    flat = list(chain.from_iterable(board))
+    if flat and (min(flat) < 0 or max(flat) > 3):
+        return False
+    flat += [0] * (-len(flat) % 4)
+    cells = iter(flat)
+    out.append(BOARD)
+    out.append(rows)
+    out.append(cols)
+    out += bytes(a | b << 2 | c << 4 | d << 6 for a, b, c, d in zip(cells, cells, cells, cells))
+    return True
+
+
+def _encode_moves(out, moves): # [(x, y, 색), ...], 값이 한 바이트를 넘으면 False
+    if any(len(move) != 3 for move in moves):
+        return False
+    try:
+        packed = bytes(chain.from_iterable(moves))
+    except (TypeError, ValueError):
+        return False
+    out.append(MOVES)
+    _write_varint(out, len(moves))
+    out += packed
+    return True
+
+
+def _decode(data, offset):
+    tag = data[offset]
+    offset += 1
+    if tag >= SMALL_INT and tag < SMALL_INT + 64:
+        return tag - SMALL_INT, offset
+    if tag == NONE:
+        return None, offset
+    if tag == TRUE:
+        return True, offset
+    if tag == FALSE:
+        return False, offset
+    if tag == INT:
+        n, offset = _read_varint(data, offset)
+        return (n >> 1) ^ -(n & 1), offset
+    if tag == FLOAT:
+        return FLOAT_STRUCT.unpack_from(data, offset)[0], offset + FLOAT_STRUCT.size
+    if tag == STR:
+        return _read_str(data, offset)
+    if tag == TOKEN:
+        end = offset + TOKEN_LENGTH // 2
+        _check_length(data, end)
+        return data[offset:end].hex(), end
+    if tag == DICT:
+        count, offset = _read_varint(data, offset)
+        result = {}
+        for _ in range(count):
+            code = data[offset]
+            offset += 1
+            if code == INLINE_KEY:
+                name, offset = _read_str(data, offset)
+            elif code < len(KEYS):
+                name = KEYS[code]
+            else:
+                raise ValueError(f"UNKNOWN_WIRE_KEY {code}")
+            result[name], offset = _decode(data, offset)
+        return result, offset
+    if tag == LIST:
+        count, offset = _read_varint(data, offset)
+        result = []
+        for _ in range(count):
+            item, offset = _decode(data, offset)
+            result.append(item)
+        return result, offset
+    if tag == BOARD:
+        rows, cols = data[offset], data[offset + 1]
+        offset += 2
+        end = offset + (rows * cols + 3) // 4
+        _check_length(data, end)
+        flat = list(chain.from_iterable(UNPACK_CELLS[b] for b in data[offset:end]))
+        return [flat[row * cols:(row + 1) * cols] for row in range(rows)], end
+    if tag == MOVES:
+        count, offset = _read_varint(data, offset)
+        end = offset + count * 3
+        _check_length(data, end)
+        raw = data[offset:end]
+        return [list(raw[i:i + 3]) for i in range(0, len(raw), 3)], end
+    raise ValueError(f"UNKNOWN_WIRE_TAG {tag}")
+
+
+def _read_str(data, offset):
+    length, offset = _read_varint(data, offset)
+    end = offset + length
+    _check_length(data, end)
+    return str(data[offset:end], "utf-8"), end
+
+
+def _check_length(data, end):
+    if end > len(data):
+        raise ValueError("TRUNCATED_WIRE_DATA")